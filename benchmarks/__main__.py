@@ -0,0 +1,85 @@
+"""
+Run the benchmark suite.
+
+    python -m benchmarks                      # run and print
+    python -m benchmarks --save               # store benchmarks/baseline.json
+    python -m benchmarks --compare            # fail on regressions against it
+    python -m benchmarks --only simulation    # benchmarks whose name contains any given string
+    python -m benchmarks --pdf paper.pdf      # benchmark ingestion of real papers
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import contextlib
+
+# headless rendering, before anything imports pyplot
+os.environ.setdefault('MPLBACKEND', 'Agg')
+os.environ.setdefault('BIOSIM_PROVIDER', 'fake')
+
+from benchmarks.harness import (  # noqa: E402
+    DEFAULT_BASELINE,
+    DEFAULT_TOLERANCE,
+    compare,
+    format_comparison,
+    format_results,
+    load_baseline,
+    log,
+    run_benchmark,
+    save_baseline,
+)
+from benchmarks.suites import get_benchmarks, write_sample_pdf  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='BioSim benchmark suite')
+    parser.add_argument('--only', nargs='+', help='Run benchmarks whose name contains any of these')
+    parser.add_argument('--quick', action='store_true', help='One call per benchmark, for smoke testing')
+    parser.add_argument('--pdf', nargs='+', default=[], help='PDFs to benchmark, a synthetic one by default')
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, help='Write results as the baseline')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help='Compare with a baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Relative slowdown counted as a regression')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='biosim-bench-') as directory:
+        pdf_paths = args.pdf
+        if not pdf_paths:
+            pdf_paths = [os.path.join(directory, 'sample.pdf')]
+            write_sample_pdf(pdf_paths[0])
+
+        benchmarks = get_benchmarks(pdf_paths)
+        if args.only:
+            benchmarks = [b for b in benchmarks if any(pattern in b.name for pattern in args.only)]
+
+        results = {}
+        for benchmark in benchmarks:
+            log(f'running {benchmark.name}...')
+            # the simulator logs with print, keep the report readable
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results[benchmark.name] = run_benchmark(benchmark, quick=args.quick)
+
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    status = 0
+    if args.compare:
+        rows = compare(results, load_baseline(args.compare), tolerance=args.tolerance)
+        print()
+        print(format_comparison(rows))
+        if any(row['status'] == 'regressed' for row in rows):
+            status = 1
+
+    if args.save:
+        save_baseline(results, args.save)
+        log(f'baseline saved to {args.save}')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import os
+import gc
+import sys
+import json
+import time
+import asyncio
+import inspect
+import platform
+import statistics
+
+BASELINE_VERSION = 1
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+
+
+class Benchmark(object):
+    """
+    A named hot path to time.
+
+    ``setup`` runs once and returns the state passed to ``run``, which is
+    timed ``number`` times per repeat. Async callables are run to
+    completion on a fresh event loop for each call.
+
+    Args:
+        name: Unique benchmark name, the key in baselines
+        run: Callable timed, takes the setup state
+        setup: Callable preparing the state, untimed
+        teardown: Callable releasing the state, untimed
+        number: Calls per repeat
+        repeat: Repeats, the median is the headline number
+        ops: Operations per call, e.g. simulation steps, for the rate
+        unit: Name of one operation
+    """
+
+    def __init__(self, name, run, setup=None, teardown=None, number=1, repeat=5, ops=1, unit='call'):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+        self.number = number
+        self.repeat = repeat
+        self.ops = ops
+        self.unit = unit
+
+
+def _call(fn, *args):
+    result = fn(*args)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def run_benchmark(benchmark: Benchmark, quick: bool = False) -> dict:
+    """
+    Time one benchmark.
+
+    Returns:
+        seconds per operation (median, min, mean, stdev over repeats),
+        operations per second from the median, and the run counts.
+    """
+    state = _call(benchmark.setup) if benchmark.setup else None
+    repeat = 1 if quick else benchmark.repeat
+    number = 1 if quick else benchmark.number
+    try:
+        # warm up caches and lazy imports
+        _call(benchmark.run, state)
+
+        samples = []
+        for _ in range(repeat):
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                for _ in range(number):
+                    _call(benchmark.run, state)
+                elapsed = time.perf_counter() - start
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            samples.append(elapsed / (number * benchmark.ops))
+    finally:
+        if benchmark.teardown:
+            _call(benchmark.teardown, state)
+
+    median = statistics.median(samples)
+    return {
+        'unit': benchmark.unit,
+        'median': median,
+        'min': min(samples),
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'per_second': 1 / median if median > 0 else None,
+        'repeat': repeat,
+        'number': number,
+        'ops': benchmark.ops,
+    }
+
+
+def machine_info() -> dict:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_baseline(results: dict, path: str = DEFAULT_BASELINE):
+    data = {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'machine': machine_info(),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def load_baseline(path: str = DEFAULT_BASELINE) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version', BASELINE_VERSION) > BASELINE_VERSION:
+        raise ValueError(f"Unsupported baseline version: {data['version']}")
+    return data
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """
+    Compare median times with a baseline.
+
+    A benchmark regressed when its median is more than ``tolerance``
+    (relative) slower than the baseline median. Benchmarks missing from
+    either side are reported with status 'new' or 'missing'.
+    """
+    baseline_results = baseline['results']
+    rows = []
+    for name in sorted(results.keys() | baseline_results.keys()):
+        current = results.get(name)
+        previous = baseline_results.get(name)
+        if current is None or previous is None:
+            rows.append({'name': name, 'status': 'missing' if current is None else 'new', 'ratio': None})
+            continue
+        ratio = current['median'] / previous['median'] if previous['median'] > 0 else None
+        if ratio is None:
+            status = 'ok'
+        elif ratio > 1 + tolerance:
+            status = 'regressed'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({'name': name, 'status': status, 'ratio': ratio})
+    return rows
+
+
+def format_results(results: dict) -> str:
+    lines = [f"{'benchmark':<32} {'median':>12} {'min':>12} {'rate':>16}"]
+    for name, result in results.items():
+        rate = f"{result['per_second']:.1f} {result['unit']}/s" if result['per_second'] else '-'
+        lines.append(
+            f"{name:<32} {_format_seconds(result['median']):>12} {_format_seconds(result['min']):>12} {rate:>16}"
+        )
+    return '\n'.join(lines)
+
+
+def format_comparison(rows: list[dict]) -> str:
+    lines = [f"{'benchmark':<32} {'vs baseline':>12} {'status':>10}"]
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else '-'
+        lines.append(f"{row['name']:<32} {ratio:>12} {row['status']:>10}")
+    return '\n'.join(lines)
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3f} {unit}'
+    return f'{seconds / 1e-9:.1f} ns'
+
+
+def log(message: str):
+    print(message, file=sys.stderr)
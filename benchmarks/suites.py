@@ -0,0 +1,346 @@
+import os
+import random
+import shutil
+import tempfile
+
+from benchmarks.harness import Benchmark
+
+TIME_STEPS = 10
+SETTING_ID = 'setting-1'
+
+SAMPLE_PARAGRAPH = (
+    "The zebra mussel (Dreissena polymorpha) was introduced to the Great Lakes in ballast water and spread "
+    "rapidly through the basin. Native unionid mussel populations declined by 10 to 15 percent per month at "
+    "invaded sites while zebra mussel densities grew by 15 to 25 percent per month during the warm season. "
+    "Water temperature, calcium concentration and substrate availability were recorded at every site."
+)
+
+
+def write_sample_pdf(path: str, pages: int = 8, paragraphs_per_page: int = 6):
+    """
+    Write a plain text PDF with a standard font, so text extraction can be
+    benchmarked without shipping sample papers.
+    """
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # page tree, written once the page objects are numbered
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = []
+        for paragraph in range(paragraphs_per_page):
+            text = f'{page + 1}.{paragraph + 1} {SAMPLE_PARAGRAPH}'
+            # wrap at ~90 characters per line
+            words, line = text.split(), ''
+            for word in words:
+                if len(line) + len(word) > 90:
+                    lines.append(line)
+                    line = ''
+                line = f'{line} {word}' if line else word
+            lines.append(line)
+            lines.append('')
+        stream = ['BT', '/F1 9 Tf', '11 TL', '50 790 Td']
+        for line in lines[:68]:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            stream.append(f'({escaped}) Tj T*')
+        stream.append('ET')
+        content = '\n'.join(stream).encode('latin-1')
+
+        objects.append(b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+        content_id = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids).encode()
+    objects[1] = b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(page_ids)
+
+    data = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        data += b'%010d 00000 n \n' % offset
+    data += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+
+    with open(path, 'wb') as f:
+        f.write(bytes(data))
+
+
+def _fake_provider():
+    from simulator.providers import FakeProvider
+    return FakeProvider(seed=0)
+
+
+def _case():
+    from simulator.simulation import cases
+    from simulator.types import CaseModel
+    return CaseModel(**cases[SETTING_ID])
+
+
+# simulation throughput
+
+def _simulation(mode):
+    async def run(state):
+        from simulator.simulation import run_simulation
+        async for _ in run_simulation(
+                time_steps=TIME_STEPS,
+                setting_id=SETTING_ID,
+                provider=_fake_provider(),
+                render=False,
+                mode=mode
+        ):
+            pass
+    return run
+
+
+# prompt construction
+
+def _setup_bio_prompt():
+    from simulator.agents import BioAgent
+    from simulator.providers.fake_provider import bio_rule
+
+    case = _case()
+    agent = BioAgent(provider=_fake_provider())
+    agent.initialize_life(
+        bio_name=case.native_specie_name,
+        bio_role='native specie',
+        bio_num=case.native_specie_initial_number,
+        bio_density=case.native_specie_initial_density
+    )
+    competitor = BioAgent(provider=_fake_provider())
+    competitor.initialize_life(
+        bio_name=case.invasive_specie_name,
+        bio_role='invasive specie',
+        bio_num=case.invasive_specie_initial_number,
+        bio_density=case.invasive_specie_initial_density
+    )
+    rng = random.Random(0)
+    for _ in range(agent.max_memory_records):
+        for bio_agent in (agent, competitor):
+            messages = bio_agent.build_life_messages(
+                competitor_name='', competitor_num=0, competitor_density=0,
+                competitor_status_list=[], current_environment={}
+            )
+            bio_agent.life_memory.append(bio_rule(messages, rng))
+
+    env_agent = _setup_environment_agent()
+    return {
+        'agent': agent,
+        'competitor': competitor,
+        'environment': env_agent.get_current_environment_status(),
+    }
+
+
+def _run_bio_prompt(state):
+    competitor = state['competitor']
+    current = competitor.life_memory[-1]
+    state['agent'].build_life_messages(
+        competitor_name=competitor.bio_name,
+        competitor_num=current['specie_num'],
+        competitor_density=current['specie_density'],
+        competitor_status_list=competitor.get_current_bio_status_list(),
+        current_environment=state['environment'],
+    )
+
+
+def _setup_environment_agent():
+    from simulator.agents import EnvAgent
+    from simulator.types import EnvironmentModel
+    from simulator.providers.fake_provider import fill_model
+
+    env_agent = EnvAgent(provider=_fake_provider())
+    env_agent.initialize_environment(case_model=_case())
+    rng = random.Random(0)
+    for _ in range(env_agent.max_memory_records):
+        env_agent.environment_memory.append(fill_model(EnvironmentModel, rng))
+    return env_agent
+
+
+def _setup_environment_prompt():
+    bio_state = _setup_bio_prompt()
+    agent_status_list = []
+    for bio_agent in (bio_state['agent'], bio_state['competitor']):
+        current = bio_agent.life_memory[-1]
+        agent_status_list.append({
+            "bio_name": bio_agent.bio_name,
+            "bio_num": current['specie_num'],
+            "bio_density": current['specie_density'],
+            "bio_status_list": bio_agent.get_current_bio_status_list(),
+            "characteristics": bio_agent.bio_role,
+        })
+    return {
+        'agent': _setup_environment_agent(),
+        'agent_status_list': agent_status_list,
+        'condition': _case().weather_changing_description,
+    }
+
+
+def _run_environment_prompt(state):
+    state['agent'].build_environment_messages(
+        agent_status_list=state['agent_status_list'],
+        env_change_condition=state['condition'],
+    )
+
+
+# pydantic parsing
+
+def _setup_environment_json():
+    from simulator.types import EnvironmentModel
+    from simulator.providers.fake_provider import fill_model
+    return EnvironmentModel(**fill_model(EnvironmentModel, random.Random(0))).model_dump_json()
+
+
+def _run_environment_parse(payload):
+    from simulator.types import EnvironmentModel
+    EnvironmentModel.model_validate_json(payload)
+
+
+def _setup_environment_dict():
+    import json
+    return json.loads(_setup_environment_json())
+
+
+def _run_environment_validate(payload):
+    from simulator.types import EnvironmentModel
+    EnvironmentModel.model_validate(payload).model_dump()
+
+
+# rendering
+
+def _setup_final_plots():
+    from simulator.simulation import ENV_CHANGE_STEP
+
+    rng = random.Random(0)
+    native, invasive = [1000], [100]
+    native_densities, invasive_densities = [50], [5]
+    for _ in range(TIME_STEPS):
+        native.append(int(native[-1] * rng.uniform(0.85, 0.99)))
+        invasive.append(int(invasive[-1] * rng.uniform(1.05, 1.25)))
+        native_densities.append(max(1, int(native_densities[-1] * rng.uniform(0.85, 0.99))))
+        invasive_densities.append(int(invasive_densities[-1] * rng.uniform(1.05, 1.25)) + 1)
+    return {
+        'case': _case(),
+        'time_steps_x': list(range(1, TIME_STEPS + 1)),
+        'native': native[1:],
+        'invasive': invasive[1:],
+        'native_densities': native_densities,
+        'invasive_densities': invasive_densities,
+        'env_changes': [1 if i == ENV_CHANGE_STEP else 0 for i in range(TIME_STEPS)],
+        'output_dir': tempfile.mkdtemp(prefix='biosim-bench-'),
+    }
+
+
+def _run_final_plots(state):
+    from simulator.rendering import save_result_plots
+    save_result_plots(
+        state['case'],
+        state['time_steps_x'],
+        state['native'],
+        state['invasive'],
+        state['native_densities'],
+        state['invasive_densities'],
+        state['env_changes'],
+        output_dir=state['output_dir'],
+    )
+
+
+def _remove_output_dir(state):
+    shutil.rmtree(state['output_dir'], ignore_errors=True)
+
+
+class _Upload(object):
+    # stands in for the file object gradio passes to handlers
+    def __init__(self, name):
+        self.name = name
+
+
+async def _setup_gradio_redraws():
+    from simulator.simulation import run_simulation
+
+    directory = tempfile.mkdtemp(prefix='biosim-bench-')
+    trace_path = os.path.join(directory, 'trace.jsonl')
+    async for _ in run_simulation(
+            time_steps=TIME_STEPS,
+            setting_id=SETTING_ID,
+            provider=_fake_provider(),
+            trace_path=trace_path,
+            render=False
+    ):
+        pass
+    return {'output_dir': directory, 'upload': _Upload(trace_path)}
+
+
+async def _run_gradio_redraws(state):
+    # replaying a trace leaves only the per-step chart updates
+    from gradio_demo import run_simulation_with_plots
+    async for _ in run_simulation_with_plots(SETTING_ID, replay_file=state['upload']):
+        pass
+
+
+# pdf ingestion
+
+def _pdf_benchmarks(pdf_paths):
+    benchmarks = []
+    for path in pdf_paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        def run_extract(_, path=path):
+            from simulator.pdf_digest import extract_pdf_text
+            extract_pdf_text(path)
+
+        def run_extract_ranked(_, path=path):
+            from simulator.pdf_digest import extract_pdf_text
+            extract_pdf_text(path, ranked=True)
+
+        async def run_process(_, path=path):
+            from simulator.pdf_digest import process_pdf_file
+            success, message, _ = await process_pdf_file(path, provider=_fake_provider(), cache=False)
+            if not success:
+                raise RuntimeError(message)
+
+        benchmarks.append(Benchmark(f'pdf_extract_text[{name}]', run_extract, repeat=5, unit='pdf'))
+        benchmarks.append(Benchmark(f'pdf_extract_ranked[{name}]', run_extract_ranked, repeat=5, unit='pdf'))
+        benchmarks.append(Benchmark(f'pdf_process_file[{name}]', run_process, repeat=5, unit='pdf'))
+    return benchmarks
+
+
+def get_benchmarks(pdf_paths: list[str]) -> list[Benchmark]:
+    """
+    All benchmarks, run against FakeProvider so no network or API key is used.
+
+    Args:
+        pdf_paths: PDFs for the ingestion benchmarks
+    """
+    return [
+        Benchmark('simulation_llm', _simulation('llm'), repeat=5, ops=TIME_STEPS, unit='step'),
+        Benchmark('simulation_hybrid', _simulation('hybrid'), repeat=5, ops=TIME_STEPS, unit='step'),
+        Benchmark('simulation_numeric', _simulation('numeric'), repeat=5, ops=TIME_STEPS, unit='step'),
+        Benchmark('prompt_bio_life', _run_bio_prompt, setup=_setup_bio_prompt, number=200, unit='prompt'),
+        Benchmark(
+            'prompt_environment', _run_environment_prompt, setup=_setup_environment_prompt,
+            number=200, unit='prompt'
+        ),
+        Benchmark(
+            'pydantic_environment_json', _run_environment_parse, setup=_setup_environment_json,
+            number=2000, unit='parse'
+        ),
+        Benchmark(
+            'pydantic_environment_dict', _run_environment_validate, setup=_setup_environment_dict,
+            number=2000, unit='parse'
+        ),
+        Benchmark(
+            'render_final_plots', _run_final_plots, setup=_setup_final_plots, teardown=_remove_output_dir,
+            repeat=3, unit='run'
+        ),
+        Benchmark(
+            'gradio_step_redraws', _run_gradio_redraws, setup=_setup_gradio_redraws,
+            teardown=_remove_output_dir, repeat=3, ops=TIME_STEPS, unit='step'
+        ),
+    ] + _pdf_benchmarks(pdf_paths)
@@ -1,8 +1,11 @@
 import gradio as gr
 import os
-import asyncio
-import matplotlib.pyplot as plt
+from collections import deque
+import pandas as pd
 from simulator.simulation import run_simulation
+from simulator.metrics import get_metrics
+from simulator.rendering import new_run_id, result_paths
+from simulator.runs import get_run_registry
 from simulator.utils import get_project_root
 from simulator.pdf_digest import process_pdf_file
 import json
@@ -26,100 +29,198 @@ SETTING_IDS = {
 }
 
 async def process_step1(upload_choice, uploaded_file, existing_choice):
+    """
+    Returns the status message and the case extracted from an uploaded paper, if any
+    """
     if upload_choice:
         if uploaded_file is None:
-            return "Please upload a PDF file"
+            return "Please upload a PDF file", None
         
         # Process the uploaded PDF
         success, message, case_data = await process_pdf_file(uploaded_file.name)
         
         if not success:
-            return f"Error: {message}"
+            return f"Error: {message}", None
         
-        # Store the case data for later use
-        global current_case_data
-        current_case_data = case_data
-        
-        return f"Successfully processed file: {uploaded_file.name}\nFound valid biology invasion case study."
+        return f"Successfully processed file: {uploaded_file.name}\nFound valid biology invasion case study.", case_data
     else:
         if existing_choice is None:
-            return "Please select an existing simulation"
-        return f"Using existing simulation option: {existing_choice}"
+            return "Please select an existing simulation", None
+        return f"Using existing simulation option: {existing_choice}", None
+
+def get_trace_path(setting_id, run_id):
+    """
+    Trace file for a demo run, if BIOSIM_TRACE_DIR is set. Named after the
+    run id, so concurrent runs of a setting never share a file.
+    """
+    trace_dir = os.getenv('BIOSIM_TRACE_DIR')
+    if not trace_dir:
+        return None
+    return os.path.join(trace_dir, f"{setting_id}-{run_id}.jsonl")
+
+POPULATION_COLUMNS = ['Month', 'Population', 'Species']
+GROWTH_COLUMNS = ['Month', 'Growth Rate (%)', 'Species']
+
+# months shown while a run streams, so every update sends a bounded number of points
+CHART_WINDOW = 24
+
+
+def _chart_frame(rows, columns):
+    return pd.DataFrame(rows, columns=columns)
+
+
+def add_chart_rows(step_data, population_rows, growth_rows, previous):
+    """
+    Append the chart points of one step, ``previous`` holds the last population of each species
+    """
+    current_step = step_data['step'] + 1
+    for role in ('native', 'invasive'):
+        name = f"{role.capitalize()} ({step_data[f'{role}_name']})"
+        population = step_data[f'{role}_population']
+        population_rows.append((current_step, population, name))
+        if previous.get(role):
+            growth = (population - previous[role]) / previous[role] * 100
+            growth_rows.append((current_step, growth, f'{role.capitalize()} Growth Rate'))
+        previous[role] = population
+
 
-async def run_simulation_with_plots(setting_id="setting-1", progress=gr.Progress()):
+def chart_frames(population_rows, growth_rows, env_change_months):
+    """
+    Data of both line plots. Each environment change is a vertical marker
+    series of its own on the population plot, spanning the plotted range.
+    """
+    population_rows = list(population_rows)
+    if population_rows:
+        first_month = population_rows[0][0]
+        top = max(row[1] for row in population_rows)
+        for month in env_change_months:
+            if month >= first_month:
+                series = f'Environment Change (month {month})'
+                population_rows += [(month, 0, series), (month, top, series)]
+    return (
+        _chart_frame(population_rows, POPULATION_COLUMNS),
+        _chart_frame(list(growth_rows), GROWTH_COLUMNS),
+    )
+
+
+async def run_simulation_with_plots(
+        setting_id="setting-1",
+        case=None,
+        replay_file=None,
+        mode="llm",
+        request: gr.Request = None,
+        progress=gr.Progress()
+):
+    """
+    Stream the simulation into the two line plots.
+
+    Each step only appends its new points to the chart rows and the browser
+    draws the charts, so nothing is re-rendered on the server per step.
+    Updates carry the last ``CHART_WINDOW`` months only, so their size does
+    not grow with the run; the whole run is in the final plots and under
+    "Past Runs". Every click gets a run id of its own, returned with each
+    update so the session can find the final plots of its run, and the run
+    is stored in the run registry under the session.
+    """
     print("Starting simulation with plots...")
+    run_id = new_run_id()
+    replay_path = replay_file.name if replay_file is not None else None
+    # numeric runs make no agent calls to trace
+    trace_path = None if replay_path or mode == "numeric" else get_trace_path(setting_id, run_id)
+    time_steps = 10
+    # two species per month
+    population_rows = deque(maxlen=2 * CHART_WINDOW)
+    growth_rows = deque(maxlen=2 * CHART_WINDOW)
+    previous = {}
+    env_change_months = []
     try:
-        # Create figures once
-        fig1, ax1 = plt.subplots(figsize=(12, 6))
-        fig2, ax2 = plt.subplots(figsize=(12, 6))
-        time_steps = 10
-        
-        # Data storage
-        time_steps_x = []
-        native_population = []
-        invasive_population = []
-        native_growth_rates = []
-        invasive_growth_rates = []
-        env_changes = []
-        
-        async for step_data in run_simulation(time_steps=time_steps, setting_id=setting_id):
+        if setting_id == "uploaded" and case is None and replay_path is None:
+            raise ValueError("No processed paper in this session, upload one in Step 1")
+        async for step_data in run_simulation(
+                time_steps=time_steps,
+                setting_id=setting_id,
+                trace_path=trace_path,
+                replay_path=replay_path,
+                mode=mode,
+                run_id=run_id,
+                case=case if setting_id == "uploaded" else None,
+                registry=get_run_registry(),
+                session_id=request.session_hash if request is not None else None
+        ):
             current_step = step_data['step'] + 1
-            
-            # Update data
-            time_steps_x.append(current_step)
-            native_population.append(step_data['native_population'])
-            invasive_population.append(step_data['invasive_population'])
-            env_changes.append(step_data['env_change'])
-            
-            # Calculate growth rates
-            if len(native_population) > 1:
-                native_growth = ((native_population[-1] - native_population[-2]) / native_population[-2]) * 100
-                native_growth_rates.append(native_growth)
-                invasive_growth = ((invasive_population[-1] - invasive_population[-2]) / invasive_population[-2]) * 100
-                invasive_growth_rates.append(invasive_growth)
-            
-            # Update population plot
-            ax1.clear()
-            ax1.plot(time_steps_x, native_population, 'g-', label=f'Native ({step_data["native_name"]})')
-            ax1.plot(time_steps_x, invasive_population, 'r-', label=f'Invasive ({step_data["invasive_name"]})')
-            
-            # Add environmental markers
-            for i, change in enumerate(env_changes):
-                if change:
-                    ax1.axvline(time_steps_x[i], color='b', linestyle='--', alpha=0.5)
-            
-            ax1.set_title('Population Trends')
-            ax1.set_xlabel('Time Steps (Months)')
-            ax1.set_ylabel('Population')
-            ax1.legend()
-            ax1.grid(True)
-            
-            # Update growth rate plot
-            ax2.clear()
-            if native_growth_rates:
-                ax2.plot(time_steps_x[1:], native_growth_rates, 'g--', label=f'Native Growth Rate')
-                ax2.plot(time_steps_x[1:], invasive_growth_rates, 'r--', label=f'Invasive Growth Rate')
-                ax2.axhline(0, color='k', linestyle='--', alpha=0.3)
-                ax2.set_title('Growth Rate Trends')
-                ax2.set_xlabel('Time Steps (Months)')
-                ax2.set_ylabel('Growth Rate (%)')
-                ax2.legend()
-                ax2.grid(True)
-
-            # Draw and yield the current state of the plots
-            fig1.canvas.draw()
-            fig2.canvas.draw()
-            yield fig1, fig2, f"Step {current_step}/{time_steps}: Processing..."
-        
-        yield fig1, fig2, "Simulation complete!"
+            add_chart_rows(step_data, population_rows, growth_rows, previous)
+            if step_data['env_change']:
+                env_change_months.append(current_step)
+
+            status = f"Step {current_step}/{time_steps}: Processing..."
+            if env_change_months:
+                status += f" (environment change at month {', '.join(map(str, env_change_months))})"
+            yield (
+                *chart_frames(population_rows, growth_rows, env_change_months),
+                status,
+                run_id
+            )
+
+        yield (
+            *chart_frames(population_rows, growth_rows, env_change_months),
+            "Simulation complete!",
+            run_id
+        )
     except Exception as e:
         print(f"Error: {str(e)}")
-        yield None, None, f"Error: {str(e)}"
-    finally:
-        plt.close(fig1)
-        plt.close(fig2)
+        yield None, None, f"Error: {str(e)}", run_id
+
+
+PAST_RUN_COLUMNS = ['Run', 'Setting', 'Invasive', 'Native', 'Mode', 'Status', 'Wall Time (s)']
+
+
+def list_past_runs(request: gr.Request = None):
+    """
+    Runs of the current session, most recent first
+    """
+    session_id = request.session_hash if request is not None else None
+    rows = []
+    for run in get_run_registry().list_runs(session_id=session_id):
+        rows.append((
+            run['run_id'],
+            run['setting_id'],
+            run['case']['invasive_specie_name'],
+            run['case']['native_specie_name'],
+            run['params'].get('mode'),
+            run['status'],
+            round(run['wall_time'], 2) if run['wall_time'] is not None else None,
+        ))
+    return (
+        pd.DataFrame(rows, columns=PAST_RUN_COLUMNS),
+        gr.Dropdown(choices=[row[0] for row in rows], value=rows[0][0] if rows else None)
+    )
+
+
+def show_past_run(run_id, request: gr.Request = None):
+    """
+    Charts of a stored run of the current session, read from the registry
+    instead of re-simulating. Runs of other sessions are reported as unknown.
+    """
+    if not run_id:
+        return None, None, "Select a past run first", None
+    run = get_run_registry().get_run(run_id)
+    session_id = request.session_hash if request is not None else None
+    if run is None or run['session_id'] != session_id:
+        return None, None, f"Unknown run: {run_id}", None
+    population_rows = []
+    growth_rows = []
+    previous = {}
+    env_change_months = []
+    for step_data in get_run_registry().get_steps(run_id):
+        add_chart_rows(step_data, population_rows, growth_rows, previous)
+        if step_data.get('env_change'):
+            env_change_months.append(step_data['step'] + 1)
+    return (
+        *chart_frames(population_rows, growth_rows, env_change_months),
+        f"Run {run_id} ({run['status']}, {len(population_rows) // 2} steps)",
+        run_id
+    )
 
-# Create the Gradio interface
 with gr.Blocks() as demo:
     gr.Markdown("# BioSim Demo (EcoHack)")
     
@@ -153,16 +254,63 @@ with gr.Blocks() as demo:
                 gr.Markdown("### Simulation Progress")
                 with gr.Row():
                     with gr.Column():
-                        plot_pop = gr.Plot(label="Population Trend", every=1)
+                        plot_pop = gr.LinePlot(
+                            x="Month",
+                            y="Population",
+                            color="Species",
+                            title="Population Trends",
+                            x_title="Time Steps (Months)",
+                            y_title="Population",
+                            label="Population Trend"
+                        )
                     with gr.Column():
-                        plot_growth = gr.Plot(label="Growth Rate Trend", every=1)
+                        plot_growth = gr.LinePlot(
+                            x="Month",
+                            y="Growth Rate (%)",
+                            color="Species",
+                            title="Growth Rate Trends",
+                            x_title="Time Steps (Months)",
+                            y_title="Growth Rate (%)",
+                            label="Growth Rate Trend"
+                        )
                 with gr.Row():
                     status_output = gr.Textbox(label="Simulation Status")
                     start_sim_btn = gr.Button("Start Simulation", variant="primary")
+                    replay_upload = gr.File(label="Replay Trace (optional)", file_types=[".jsonl", ".gz"])
                     view_results_btn = gr.Button("View Final Results", variant="secondary", visible=False)
+                simulation_mode = gr.Radio(
+                    choices=[
+                        ("LLM agents", "llm"),
+                        ("Hybrid (LLM keyframes every 3 months)", "hybrid"),
+                        ("Numerical model (fast preview)", "numeric"),
+                    ],
+                    value="llm",
+                    label="Simulation Mode"
+                )
+
+                with gr.Accordion("Performance Metrics", open=False):
+                    with gr.Row():
+                        metrics_format = gr.Radio(
+                            choices=["JSON", "Prometheus"],
+                            value="JSON",
+                            label="Format"
+                        )
+                        refresh_metrics_btn = gr.Button("Refresh Metrics", variant="secondary")
+                    metrics_output = gr.Code(label="Metrics", language="json")
+
+                with gr.Accordion("Past Runs", open=False):
+                    past_runs = gr.Dataframe(headers=PAST_RUN_COLUMNS, interactive=False, label="Runs of this session")
+                    with gr.Row():
+                        past_run_choice = gr.Dropdown(choices=[], label="Run")
+                        refresh_runs_btn = gr.Button("Refresh Runs", variant="secondary")
+                        show_run_btn = gr.Button("Show Run", variant="secondary")
                 
                 # Store the current setting in a Gradio state
                 current_setting = gr.State("setting-1")
+                # case extracted from the paper uploaded in this session
+                current_case = gr.State(None)
+                # run id of the last simulation of this session
+                current_run = gr.State(None)
                 
                 def update_current_setting(upload_choice, existing_choice):
                     if upload_choice:
@@ -171,20 +319,45 @@ with gr.Blocks() as demo:
                         return "setting-1"  # default setting
                     return SETTING_IDS[existing_choice]
                 
-                def on_simulation_complete(pop_plot, growth_plot, status):
+                def show_metrics(metrics_format):
+                    metrics = get_metrics()
+                    if metrics_format == "Prometheus":
+                        return gr.Code(value=metrics.to_prometheus(), language=None)
+                    return gr.Code(value=metrics.to_json(), language="json")
+
+                def on_simulation_complete(status):
                     if "complete" in status.lower():
                         return gr.Button(visible=True)
                     return gr.Button(visible=False)
                 
                 start_sim_btn.click(
                     run_simulation_with_plots,
-                    inputs=[current_setting],
-                    outputs=[plot_pop, plot_growth, status_output]
+                    inputs=[current_setting, current_case, replay_upload, simulation_mode],
+                    outputs=[plot_pop, plot_growth, status_output, current_run]
+                ).then(
+                    on_simulation_complete,
+                    inputs=[status_output],
+                    outputs=[view_results_btn]
+                ).then(
+                    show_metrics,
+                    inputs=[metrics_format],
+                    outputs=[metrics_output]
+                ).then(
+                    list_past_runs,
+                    outputs=[past_runs, past_run_choice]
+                )
+                refresh_runs_btn.click(list_past_runs, outputs=[past_runs, past_run_choice])
+                show_run_btn.click(
+                    show_past_run,
+                    inputs=[past_run_choice],
+                    outputs=[plot_pop, plot_growth, status_output, current_run]
                 ).then(
                     on_simulation_complete,
-                    inputs=[plot_pop, plot_growth, status_output],
+                    inputs=[status_output],
                     outputs=[view_results_btn]
                 )
+                refresh_metrics_btn.click(show_metrics, inputs=[metrics_format], outputs=[metrics_output])
+                metrics_format.change(show_metrics, inputs=[metrics_format], outputs=[metrics_output])
 
                 # Update current_setting when selection changes
                 upload_choice.change(
@@ -209,31 +382,35 @@ with gr.Blocks() as demo:
                         gr.Markdown("#### Monthly Growth Rates")
                         growth_image = gr.Image(label="Growth Rates", interactive=False)
                 
-                def load_final_results():
-                    output_dir = os.path.join(get_project_root(), 'output')
-                    population_plot = os.path.join(output_dir, 'simulation_results.png')
-                    growth_plot = os.path.join(output_dir, 'monthly_growth_rates.png')
+                def load_final_results(run_id):
+                    # only the plots of this session's run, never another user's
+                    paths = result_paths(run_id) if run_id else {}
+                    population_plot = paths.get('population')
+                    growth_plot = paths.get('growth')
                     return [
-                        population_plot if os.path.exists(population_plot) else None,
-                        growth_plot if os.path.exists(growth_plot) else None,
+                        population_plot if population_plot and os.path.exists(population_plot) else None,
+                        growth_plot if growth_plot and os.path.exists(growth_plot) else None,
                         gr.Tabs(selected="results")
                     ]
 
                 view_results_btn.click(
                     load_final_results,
+                    inputs=[current_run],
                     outputs=[results_image, growth_image, tabs]
                 )
 
-    async def process_and_switch_to_confirm(upload_choice, uploaded_file, existing_choice):
-        status = await process_step1(upload_choice, uploaded_file, existing_choice)
+    async def process_and_switch_to_confirm(upload_choice, uploaded_file, existing_choice, uploaded_case):
+        status, case_data = await process_step1(upload_choice, uploaded_file, existing_choice)
+        # the session keeps its last processed paper until a new one is processed
+        uploaded_case = case_data or uploaded_case
         
         if "Successfully processed" in status or "Using existing" in status:
             if upload_choice:
                 confirmation_message = (
                     "### Please confirm your selection:\n\n"
                     f"- Using uploaded file: {uploaded_file.name}\n"
-                    f"- Invasive Species: {current_case_data.invasive_specie_name}\n"
-                    f"- Native Species: {current_case_data.native_specie_name}\n"
+                    f"- Invasive Species: {uploaded_case.invasive_specie_name}\n"
+                    f"- Native Species: {uploaded_case.native_specie_name}\n"
                     "\nClick 'Proceed to Simulation' to continue or 'Back to Selection' to make changes."
                 )
             else:
@@ -245,8 +422,8 @@ with gr.Blocks() as demo:
                     f"- Native Species: {case_data.native_specie_name}\n"
                     "\nClick 'Proceed to Simulation' to continue or 'Back to Selection' to make changes."
                 )
-            return [status, confirmation_message, gr.Tabs(selected="confirm")]
-        return [status, "", gr.Tabs(selected="step1")]
+            return [status, confirmation_message, gr.Tabs(selected="confirm"), uploaded_case]
+        return [status, "", gr.Tabs(selected="step1"), uploaded_case]
 
     def go_back_to_step1():
         return gr.Tabs(selected="step1")
@@ -257,8 +434,8 @@ with gr.Blocks() as demo:
     # Connect the buttons to their actions
     submit_btn.click(
         process_and_switch_to_confirm,
-        inputs=[upload_choice, file_upload, existing_choice],
-        outputs=[output, confirmation_text, tabs],
+        inputs=[upload_choice, file_upload, existing_choice, current_case],
+        outputs=[output, confirmation_text, tabs, current_case],
         api_name="process_and_confirm"
     ).then()
 
@@ -1,3 +1,4 @@
 from .base import BaseAgent
 from .bio_agent import BioAgent
 from .env_agent import EnvAgent
+from .joint_agent import JointAgent
@@ -1,18 +1,50 @@
-from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
+from simulator.metrics import track_call
+from simulator.providers import BaseProvider, get_provider
+from simulator.prompts import DEFAULT_PROMPT_TOKEN_BUDGET
+
 load_dotenv()
 
 
 class BaseAgent(object):
+    # label of this agent's calls in simulator.metrics
+    agent_type = 'agent'
+
     def __init__(
             self,
             model_name: str = "gpt-4o-mini",
-            max_memory_records: int = 10
+            max_memory_records: int = 10,
+            provider: BaseProvider = None,
+            prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
     ):
         self.model_name = model_name
         self.max_memory_records = max_memory_records
 
-        self.client = OpenAI()
-        self.async_client = AsyncOpenAI()
+        # backend for structured LLM calls, see simulator.providers
+        self.provider = provider if provider is not None else get_provider()
+        # estimated input tokens per call, older history is trimmed to fit. None disables it
+        self.prompt_token_budget = prompt_token_budget
+
+    def _parse(self, messages: list[dict], response_format):
+        """
+        Structured call through the provider, recorded in simulator.metrics
+        """
+        with track_call(self.agent_type, self.model_name, response_format, messages) as record:
+            output = self.provider.parse(
+                messages=messages,
+                model=self.model_name,
+                response_format=response_format
+            )
+            record.set_output(output)
+        return output
 
+    async def _aparse(self, messages: list[dict], response_format):
+        with track_call(self.agent_type, self.model_name, response_format, messages) as record:
+            output = await self.provider.aparse(
+                messages=messages,
+                model=self.model_name,
+                response_format=response_format
+            )
+            record.set_output(output)
+        return output
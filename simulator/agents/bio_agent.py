@@ -1,19 +1,88 @@
 from simulator.agents import BaseAgent
 
 from simulator.types import BioModel
+from simulator.memory import HistoryStore
+from simulator.prompts import (
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    DELTA_TABLE_LEGEND,
+    PromptTemplate,
+    compact_json,
+    delta_table,
+    fit_to_budget,
+)
+
+LIFE_PROMPT = PromptTemplate("""
+    The current bio status:
+    Bio Role: {{bio_role}}
+    Bio Name: {{bio_name}}
+    Bio Num: {{bio_num}}
+    Bio Density: {{bio_density}}
+    Previous status ({{legend}}):
+    {{history}}
+
+    Current environment status:
+    {{environment}}
+
+    Competitor Name: {{competitor_name}}
+    Competitor Num: {{competitor_num}}
+    Competitor Density: {{competitor_density}}
+    Competitor previous status:
+    {{competitor_history}}
+
+    Environment and competitor will increase/decrease bio num and bio density.
+
+    You should consider bio competition, environment change, and **reproduction**
+
+    However, the invasive bio will suppress the native bio and even kill large numbers of native bio.
+    If the environment is favorable for the invasive bio, the invasive bio will grow rapidly.
+
+    Predict the **bio status** in the next month non-linearly.
+""")
+
+COMMUNITY_PROMPT = PromptTemplate("""
+    The current bio status:
+    Bio Role: {{bio_role}}
+    Bio Name: {{bio_name}}
+    Bio Num: {{bio_num}}
+    Bio Density: {{bio_density}}
+    Previous status (month,num,density):
+    {{history}}
+
+    Current environment status:
+    {{environment}}
+
+    All species in the ecosystem (name|role|num|density|monthly change %):
+    {{community_table}}
+
+    Environment and the other species will increase/decrease bio num and bio density.
+
+    You should consider bio competition, predation, environment change, and **reproduction**
+
+    Invasive bio will suppress native bio and even kill large numbers of native bio.
+    If the environment is favorable for an invasive bio, it will grow rapidly.
+
+    Predict the **bio status** of {{bio_name}} in the next month non-linearly.
+""")
 
 
 class BioAgent(BaseAgent):
+    agent_type = 'bio'
+
     def __init__(self,
                  model_name='gpt-4o-mini',
                  max_memory_records=10,
+                 provider=None,
+                 prompt_token_budget=DEFAULT_PROMPT_TOKEN_BUDGET,
                  ):
         super().__init__(
             model_name=model_name,
-            max_memory_records=max_memory_records
+            max_memory_records=max_memory_records,
+            provider=provider,
+            prompt_token_budget=prompt_token_budget
         )
 
-        self.life_memory = []
+        # recent window for prompts, older records are archived column-wise
+        self.life_memory = HistoryStore(window=max_memory_records)
         self.bio_name = None
         self.bio_role = None
         self.bio_num = 0
@@ -21,7 +90,7 @@ class BioAgent(BaseAgent):
 
 
     def get_current_bio_status_list(self):
-        return self.life_memory[-self.max_memory_records:]
+        return self.life_memory.recent(self.max_memory_records)
 
     def initialize_life(
             self,
@@ -40,6 +109,54 @@ class BioAgent(BaseAgent):
 
         self.life_memory.append(init_bio_model.model_dump())
 
+    def build_life_messages(
+            self,
+            competitor_name: str,
+            competitor_num: int,
+            competitor_density: int,
+            competitor_status_list: list[dict],
+            current_environment: dict,
+    ) -> list[dict]:
+        """
+        Messages for the next-month prediction, trimmed to the token budget
+        by dropping the oldest history rows first.
+        """
+        current = self.life_memory[-1]
+        month = len(self.life_memory) - 1
+        environment = compact_json(current_environment)
+
+        def render(histories):
+            return LIFE_PROMPT.render(
+                bio_role=self.bio_role,
+                bio_name=self.bio_name,
+                bio_num=current['specie_num'],
+                bio_density=current['specie_density'],
+                legend=DELTA_TABLE_LEGEND,
+                history=delta_table(histories['own'], start=month - len(histories['own']) + 1),
+                environment=environment,
+                competitor_name=competitor_name,
+                competitor_num=competitor_num,
+                competitor_density=competitor_density,
+                competitor_history=delta_table(
+                    histories['competitor'], start=month - len(histories['competitor']) + 1
+                ),
+            )
+
+        user_prompt = fit_to_budget(
+            render,
+            {
+                'own': self.life_memory.recent(self.max_memory_records),
+                'competitor': competitor_status_list,
+            },
+            budget=self.prompt_token_budget
+        )
+        return [
+            {
+                "role": "user",
+                "content": user_prompt
+            }
+        ]
+
     async def predict_life(
             self,
             competitor_name: str,
@@ -48,47 +165,66 @@ class BioAgent(BaseAgent):
             competitor_status_list: list[dict],
             current_environment: dict,
     ):
-        user_prompt = f"""
-            The current bio status:
-            Bio Role: {self.bio_role}
-            Bio Name: {self.bio_name}
-            Bio Num: {self.life_memory[-1]['specie_num']}
-            Bio Density: {self.life_memory[-1]['specie_density']}
-            Previous status: {str(self.life_memory[-self.max_memory_records:])},
-            
-            Current environment status:
-            {current_environment}
-            
-            Competitor Name: {competitor_name}
-            Competitor Num: {competitor_num}
-            Competitor Density: {competitor_density}
-            Competitor previous status:
-            {competitor_status_list}
-            
-            Environment and competitor will increase/decrease bio num and bio density.
-            
-            You should consider bio competition, environment change, and **reproduction**
-    
-            However, the invasive bio will suppress the native bio and even kill large numbers of native bio.
-            If the environment is favorable for the invasive bio, the invasive bio will grow rapidly.
-            
-            Predict the **bio status** in the next month non-linearly.
+        output = await self._aparse(
+            messages=self.build_life_messages(
+                competitor_name=competitor_name,
+                competitor_num=competitor_num,
+                competitor_density=competitor_density,
+                competitor_status_list=competitor_status_list,
+                current_environment=current_environment,
+            ),
+            response_format=BioModel
+        )
+        self.record_life(output)
+
+        return output
+
+    def record_life(self, output: BioModel):
+        """
+        Store the prediction for the next month, however it was obtained
         """
+        output_json = output.model_dump()
+        print(f'predicting bio status: {output_json} for {self.bio_name}')
+        # store life data
+        self.life_memory.append(output_json)
 
-        response = await self.async_client.beta.chat.completions.parse(
+    async def predict_in_community(
+            self,
+            bio_num: int,
+            bio_density: int,
+            status_history: str,
+            community_table: str,
+            current_environment: dict,
+    ) -> BioModel:
+        """
+        Predict the next month of this specie inside a community of many species.
+
+        The community keeps the state in its own arrays, so nothing is stored
+        in ``life_memory``.
+
+        Args:
+            bio_num: Current number of this specie
+            bio_density: Current density of this specie
+            status_history: Recent states of this specie as a compact table
+            community_table: Current state of every specie in the community
+            current_environment: Current environment data
+        """
+        user_prompt = COMMUNITY_PROMPT.render(
+            bio_role=self.bio_role,
+            bio_name=self.bio_name,
+            bio_num=bio_num,
+            bio_density=bio_density,
+            history=status_history,
+            environment=compact_json(current_environment),
+            community_table=community_table,
+        )
+
+        return await self._aparse(
             messages=[
                 {
                     "role": "user",
                     "content": user_prompt
                 }
             ],
-            model=self.model_name,
             response_format=BioModel
         )
-        output = response.choices[0].message.parsed
-        output_json = output.model_dump()
-        print(f'predicting bio status: {output_json} for {self.bio_name}')
-        # store life data
-        self.life_memory.append(output_json)
-
-        return output
\ No newline at end of file
@@ -1,25 +1,69 @@
 from simulator.agents import BaseAgent
 
 from simulator.types import EnvironmentModel, CaseModel
+from simulator.memory import HistoryStore
+from simulator.prompts import (
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    DELTA_TABLE_LEGEND,
+    PromptTemplate,
+    compact_json,
+    delta_table,
+    fit_to_budget,
+)
+
+ENVIRONMENT_PROMPT = PromptTemplate("""
+    Environment history data in the past months ({{legend}}):
+    {{environment_memory}}
+
+    The current bio status (latest values, then history):
+    {{agent_status_list}}
+
+    The environment original changing regular pattern:
+    {{env_change_condition}}
+""")
+
+ENVIRONMENT_INSTRUCTION_PROMPT = PromptTemplate(ENVIRONMENT_PROMPT.text + """
+
+External factors:
+{{user_instruction}}
+""")
 
 
 class EnvAgent(BaseAgent):
+    agent_type = 'environment'
+
     def __init__(self,
                  model_name='gpt-4o-mini',
                  max_memory_records=10,
+                 provider=None,
+                 prompt_token_budget=DEFAULT_PROMPT_TOKEN_BUDGET,
                  ):
         super().__init__(
             model_name=model_name,
-            max_memory_records=max_memory_records
+            max_memory_records=max_memory_records,
+            provider=provider,
+            prompt_token_budget=prompt_token_budget
         )
 
-        self.environment_memory = []
+        # recent window for prompts, older records are archived column-wise
+        self.environment_memory = HistoryStore(window=max_memory_records)
         self.case = None
 
     def get_current_environment_status(self):
         return self.environment_memory[-1]
 
 
+    @staticmethod
+    def build_initialize_messages(case_model: CaseModel) -> list[dict]:
+        return [
+            {
+                "role": "user",
+                "content": f"Initialize the environment data model with case description for biology invasion experiment."
+                           f"The environment initialization will be the time when invasion happens and if no external factors, the invasion will expand."
+                           f"Use a environment that fits for invasion specie {case_model.invasive_specie_name}  but not for native specie {case_model.native_specie_name}."
+            }
+        ]
+
     def initialize_environment(
             self,
             case_model: CaseModel
@@ -28,106 +72,116 @@ class EnvAgent(BaseAgent):
         self.case = case_model
 
         # generate initialize environment data using case and environment model
-        response_init = self.client.beta.chat.completions.parse(
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"Initialize the environment data model with case description for biology invasion experiment."
-                               f"The environment initialization will be the time when invasion happens and if no external factors, the invasion will expand."
-                               f"Use a environment that fits for invasion specie {case_model.invasive_specie_name}  but not for native specie {case_model.native_specie_name}."
-                }
-            ],
-            model=self.model_name,
+        output_init = self._parse(
+            messages=self.build_initialize_messages(case_model),
             response_format=EnvironmentModel
         )
 
-        # change to json using pydantic
-        output_init = response_init.choices[0].message.parsed
-        output_json = output_init.model_dump()
-
-        # store environment data
-        self.environment_memory.append(output_json)
+        self.record_environment(output_init)
 
         return output_init
 
-    async def predict_environment(
+    async def ainitialize_environment(
             self,
-            agent_status_list: list[dict],
-            env_change_condition: str,
-            user_instruction: str = None
+            case_model: CaseModel
     ):
-        # last self.max_memory_records records
-        if user_instruction:
-            user_prompt = """
-            Environment history data in the past month:
-            {{environment_memory}}
-            
-            The current bio status:
-            {{agent_status_list}}
-            
-            The environment original changing regular pattern:
-            {{env_change_condition}}
-            
-            External factors:
-            {{user_instruction}}
-            """
-            user_prompt = user_prompt.replace(
-                '{{user_instruction}}', user_instruction,
-            ).replace(
-                '{{agent_status_list}}', str(agent_status_list),
-            ).replace(
-                '{{env_change_condition}}', env_change_condition,
-            ).replace(
-                '{{environment_memory}}', str(self.environment_memory[-self.max_memory_records:]),
-            )
+        """
+        Same as ``initialize_environment`` without blocking the event loop
+        """
+        self.case = case_model
 
-        else:
-            user_prompt = """
-                        Environment history data in the past month:
-                        {{environment_memory}}
+        output_init = await self._aparse(
+            messages=self.build_initialize_messages(case_model),
+            response_format=EnvironmentModel
+        )
 
-                        The current bio status:
-                        {{agent_status_list}}
+        self.record_environment(output_init)
 
-                        The environment original changing regular pattern:
-                        {{env_change_condition}}
-                        """
+        return output_init
 
-            user_prompt = user_prompt.replace(
-                '{{agent_status_list}}', str(agent_status_list),
-            ).replace(
-                '{{env_change_condition}}', env_change_condition,
-            ).replace(
-                '{{environment_memory}}', str(self.environment_memory[-self.max_memory_records:]),
+    def build_environment_messages(
+            self,
+            agent_status_list: list[dict],
+            env_change_condition: str,
+            user_instruction: str = None
+    ) -> list[dict]:
+        """
+        Messages for the next-month environment prediction, trimmed to the
+        token budget by dropping the oldest history rows first.
+        """
+        month = len(self.environment_memory) - 1
+        template = ENVIRONMENT_INSTRUCTION_PROMPT if user_instruction else ENVIRONMENT_PROMPT
+
+        # per-agent histories are trimmed together with the environment history
+        histories = {'environment': self.environment_memory.recent(self.max_memory_records)}
+        for index, agent_status in enumerate(agent_status_list):
+            if agent_status.get('bio_status_list') is not None:
+                histories[f'agent_{index}'] = agent_status['bio_status_list']
+
+        def render(trimmed):
+            agent_lines = []
+            for index, agent_status in enumerate(agent_status_list):
+                summary = {key: value for key, value in agent_status.items() if key != 'bio_status_list'}
+                agent_lines.append(compact_json(summary))
+                records = trimmed.get(f'agent_{index}')
+                if records is not None:
+                    agent_lines.append(delta_table(records, start=month - len(records) + 1))
+
+            environment_history = trimmed['environment']
+            return template.render(
+                legend=DELTA_TABLE_LEGEND,
+                environment_memory=delta_table(
+                    environment_history, start=month - len(environment_history) + 1
+                ),
+                agent_status_list='\n'.join(agent_lines),
+                env_change_condition=env_change_condition,
+                user_instruction=user_instruction or '',
             )
 
+        user_prompt = fit_to_budget(render, histories, budget=self.prompt_token_budget)
+        return [
+            {
+                "role": "system",
+                "content": "Predict the environment data model in the next month with the current environment data, the bio status, "
+                           "environment original changing regular pattern."
+                           "Keep irrelevant factors unchanged."
+            },
+            {
+                "role": "user",
+                "content": user_prompt
+            },
+        ]
+
+    async def predict_environment(
+            self,
+            agent_status_list: list[dict],
+            env_change_condition: str,
+            user_instruction: str = None
+    ):
         # generate predict environment data using case and environment model
-        response_predict = await self.async_client.beta.chat.completions.parse(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Predict the environment data model in the next month with the current environment data, the bio status, "
-                               "environment original changing regular pattern."
-                               "Keep irrelevant factors unchanged."
-                },
-                {
-                    "role": "user",
-                    "content": env_change_condition
-                },
-            ],
-            model=self.model_name,
+        output_predict = await self._aparse(
+            messages=self.build_environment_messages(
+                agent_status_list=agent_status_list,
+                env_change_condition=env_change_condition,
+                user_instruction=user_instruction
+            ),
             response_format=EnvironmentModel
         )
 
+        self.record_environment(output_predict)
+
+        return output_predict
+
+    def record_environment(self, output: EnvironmentModel):
+        """
+        Store an initial or predicted environment, however it was obtained
+        """
         # change to json using pydantic
-        output_predict = response_predict.choices[0].message.parsed
-        output_json = output_predict.model_dump()
+        output_json = output.model_dump()
 
         # store environment data
         self.environment_memory.append(output_json)
 
-        return output_predict
-
 if __name__ == '__main__':
     env_agent = EnvAgent()
     import os
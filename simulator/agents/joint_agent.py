@@ -0,0 +1,149 @@
+from simulator.agents import BaseAgent, BioAgent, EnvAgent
+
+from simulator.types import JointStepModel
+from simulator.prompts import (
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    DELTA_TABLE_LEGEND,
+    PromptTemplate,
+    delta_table,
+    fit_to_budget,
+)
+
+JOINT_PROMPT = PromptTemplate("""
+    Environment history data in the past months ({{legend}}):
+    {{environment_history}}
+
+    The current invasive bio status:
+    Bio Role: {{invasive_role}}
+    Bio Name: {{invasive_name}}
+    Bio Num: {{invasive_num}}
+    Bio Density: {{invasive_density}}
+    Previous status:
+    {{invasive_history}}
+
+    The current native bio status:
+    Bio Role: {{native_role}}
+    Bio Name: {{native_name}}
+    Bio Num: {{native_num}}
+    Bio Density: {{native_density}}
+    Previous status:
+    {{native_history}}
+
+    The environment original changing regular pattern:
+    {{env_change_condition}}
+    {{external_factors}}
+    Environment and competitor will increase/decrease bio num and bio density.
+
+    You should consider bio competition, environment change, and **reproduction**
+
+    However, the invasive bio will suppress the native bio and even kill large numbers of native bio.
+    If the environment is favorable for the invasive bio, the invasive bio will grow rapidly.
+    Keep irrelevant environment factors unchanged.
+
+    Predict the **bio status** of both species and the environment data in the next month non-linearly.
+""")
+
+
+class JointAgent(BaseAgent):
+    """
+    Predicts the next month of both species and the environment in one
+    structured call, sharing the context the three separate agents would
+    each be sent, and stores each part in the memory of its agent.
+
+    Args:
+        env_agent: Environment agent, already initialized
+        bio_agent_native: Native bio agent, already initialized
+        bio_agent_invasive: Invasive bio agent, already initialized
+    """
+    agent_type = 'joint'
+
+    def __init__(self,
+                 env_agent: EnvAgent,
+                 bio_agent_native: BioAgent,
+                 bio_agent_invasive: BioAgent,
+                 model_name='gpt-4o-mini',
+                 max_memory_records=10,
+                 provider=None,
+                 prompt_token_budget=DEFAULT_PROMPT_TOKEN_BUDGET,
+                 ):
+        super().__init__(
+            model_name=model_name,
+            max_memory_records=max_memory_records,
+            provider=provider,
+            prompt_token_budget=prompt_token_budget
+        )
+        self.env_agent = env_agent
+        self.bio_agent_native = bio_agent_native
+        self.bio_agent_invasive = bio_agent_invasive
+
+    def build_joint_messages(self, env_change_condition: str, user_instruction: str = None) -> list[dict]:
+        """
+        Messages for the joint next-month prediction, trimmed to the token
+        budget by dropping the oldest history rows first.
+        """
+        native = self.bio_agent_native
+        invasive = self.bio_agent_invasive
+        month = len(self.env_agent.environment_memory) - 1
+
+        def history(records):
+            return delta_table(records, start=month - len(records) + 1)
+
+        def render(histories):
+            return JOINT_PROMPT.render(
+                legend=DELTA_TABLE_LEGEND,
+                environment_history=history(histories['environment']),
+                invasive_role=invasive.bio_role,
+                invasive_name=invasive.bio_name,
+                invasive_num=invasive.life_memory[-1]['specie_num'],
+                invasive_density=invasive.life_memory[-1]['specie_density'],
+                invasive_history=history(histories['invasive']),
+                native_role=native.bio_role,
+                native_name=native.bio_name,
+                native_num=native.life_memory[-1]['specie_num'],
+                native_density=native.life_memory[-1]['specie_density'],
+                native_history=history(histories['native']),
+                env_change_condition=env_change_condition,
+                external_factors=f'\nExternal factors:\n{user_instruction}\n' if user_instruction else '',
+            )
+
+        user_prompt = fit_to_budget(
+            render,
+            {
+                'environment': self.env_agent.environment_memory.recent(self.max_memory_records),
+                'invasive': invasive.life_memory.recent(self.max_memory_records),
+                'native': native.life_memory.recent(self.max_memory_records),
+            },
+            budget=self.prompt_token_budget
+        )
+        return [
+            {
+                "role": "system",
+                "content": "Predict the next month of an ecosystem: the status of the invasive and the native specie "
+                           "and the environment data model, from the current status, their history and the "
+                           "environment original changing regular pattern."
+            },
+            {
+                "role": "user",
+                "content": user_prompt
+            },
+        ]
+
+    async def predict_joint(self, env_change_condition: str, user_instruction: str = None) -> JointStepModel:
+        output = await self._aparse(
+            messages=self.build_joint_messages(
+                env_change_condition=env_change_condition,
+                user_instruction=user_instruction
+            ),
+            response_format=JointStepModel
+        )
+        self.record_joint(output)
+
+        return output
+
+    def record_joint(self, output: JointStepModel):
+        """
+        Dispatch a joint prediction into the memories of the three agents
+        """
+        self.bio_agent_invasive.record_life(output.invasive)
+        self.bio_agent_native.record_life(output.native)
+        self.env_agent.record_environment(output.environment)
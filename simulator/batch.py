@@ -0,0 +1,477 @@
+import os
+import json
+import time
+import asyncio
+from typing import AsyncIterator
+
+from pydantic import BaseModel
+from openai import pydantic_function_tool
+
+from simulator.agents import BioAgent, EnvAgent
+from simulator.cache import get_cache_dir
+from simulator.metrics import track_step
+from simulator.providers import BaseProvider, FakeProvider, ProviderError, get_client_registry
+from simulator.providers.base import current_replica
+from simulator.simulation import (
+    cases,
+    agent_status_list,
+    environment_instruction,
+    life_prediction_inputs,
+    make_step_data,
+)
+from simulator.trajectories import TrajectoryStore
+from simulator.types import CaseModel, BioModel, EnvironmentModel
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+# batch replicas issue the three separate predictions, joint steps are not batched
+DEFAULT_SCHEMAS = {schema.__name__: schema for schema in (BioModel, EnvironmentModel)}
+
+
+def response_format_param(schema: type[BaseModel]) -> dict:
+    """
+    Structured output ``response_format`` of a chat completion request body
+    """
+    return {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': schema.__name__,
+            # the strict schema the SDK builds for tools, the same one structured outputs use
+            'schema': pydantic_function_tool(schema)['function']['parameters'],
+            'strict': True,
+        },
+    }
+
+
+def make_batch_request(
+        custom_id: str,
+        model: str,
+        messages: list[dict],
+        schema: type[BaseModel],
+        seed: int = None
+) -> dict:
+    """
+    One line of a batch input file, in the OpenAI Batch API format
+
+    Args:
+        custom_id: Identifier used to match the result to the request
+        model: Model name
+        messages: Chat messages
+        schema: Pydantic model of the response
+        seed: Sampling seed, the replica index, so replicas can differ
+    """
+    body = {
+        'model': model,
+        'messages': messages,
+        'response_format': response_format_param(schema),
+    }
+    if seed is not None:
+        body['seed'] = seed
+    return {'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': body}
+
+
+def write_jsonl(path: str, records):
+    # write to a temporary file first, a half written file must never look finished
+    partial = f'{path}.partial'
+    with open(partial, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+    os.replace(partial, path)
+
+
+def read_jsonl(path: str) -> list[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def parse_batch_result(result: dict, schema: type[BaseModel]) -> BaseModel:
+    """
+    Parsed output of one line of a batch output file.
+
+    Raises:
+        ProviderError: The request failed or returned no parsable output
+    """
+    if result.get('error'):
+        raise ProviderError(f"Batch request {result.get('custom_id')} failed: {result['error']}")
+    response = result.get('response') or {}
+    if response.get('status_code') != 200:
+        raise ProviderError(
+            f"Batch request {result.get('custom_id')} returned status {response.get('status_code')}"
+        )
+    message = response['body']['choices'][0]['message']
+    if not message.get('content'):
+        raise ProviderError(f"Batch request {result.get('custom_id')} returned no output: {message.get('refusal')}")
+    return schema.model_validate_json(message['content'])
+
+
+class BatchBackend(object):
+    """
+    Executes batch input files and writes the matching output files.
+
+    ``submit`` starts a batch and returns an id that stays valid across
+    processes, ``poll`` writes the output file and returns True once the
+    batch is finished. Both are blocking.
+    """
+
+    def submit(self, input_path: str) -> str:
+        raise NotImplementedError
+
+    def poll(self, batch_id: str, output_path: str) -> bool:
+        raise NotImplementedError
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based stand-in for a batch API: every request is answered by a
+    provider (a FakeProvider by default) when the batch is polled.
+
+    Args:
+        provider: Provider answering the requests
+        schemas: Response schemas by name, as referenced by the requests
+    """
+
+    def __init__(self, provider: BaseProvider = None, schemas: dict[str, type[BaseModel]] = None):
+        self.provider = provider or FakeProvider()
+        self.schemas = dict(DEFAULT_SCHEMAS)
+        if schemas:
+            self.schemas.update(schemas)
+
+    def submit(self, input_path: str) -> str:
+        return os.path.abspath(input_path)
+
+    def _answer(self, request: dict) -> dict:
+        body = request['body']
+        schema = self.schemas[body['response_format']['json_schema']['name']]
+        # seeds stand for replicas, so a FakeProvider answers each replica differently
+        token = current_replica.set(body.get('seed'))
+        try:
+            output = self.provider.parse(body['messages'], body['model'], schema)
+        except Exception as e:
+            return {
+                'id': f"local-{request['custom_id']}",
+                'custom_id': request['custom_id'],
+                'response': None,
+                'error': {'code': type(e).__name__, 'message': str(e)},
+            }
+        finally:
+            current_replica.reset(token)
+        return {
+            'id': f"local-{request['custom_id']}",
+            'custom_id': request['custom_id'],
+            'response': {
+                'status_code': 200,
+                'body': {
+                    'model': body['model'],
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': output.model_dump_json(), 'refusal': None},
+                        'finish_reason': 'stop',
+                    }],
+                },
+            },
+            'error': None,
+        }
+
+    def poll(self, batch_id: str, output_path: str) -> bool:
+        write_jsonl(output_path, (self._answer(request) for request in read_jsonl(batch_id)))
+        return True
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """
+    OpenAI Batch API backend. Batches are priced lower than synchronous calls
+    and may take up to ``completion_window`` to finish.
+
+    Args:
+        client: Sync OpenAI client, defaults to the process-wide registry's
+        completion_window: Completion window of the batches
+    """
+
+    def __init__(self, client=None, completion_window: str = '24h'):
+        self._client = client
+        self.completion_window = completion_window
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        return get_client_registry().get_client()
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def poll(self, batch_id: str, output_path: str) -> bool:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in ('failed', 'expired', 'cancelled'):
+            raise ProviderError(f"Batch {batch_id} {batch.status}: {batch.errors}")
+        if batch.status != 'completed':
+            return False
+
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(
+                    json.loads(line) for line in self.client.files.content(file_id).text.splitlines() if line.strip()
+                )
+        write_jsonl(output_path, lines)
+        return True
+
+
+async def execute_batch(
+        backend: BatchBackend,
+        requests: list[dict],
+        work_dir: str,
+        name: str,
+        poll_interval: float = 30.0
+) -> dict[str, dict]:
+    """
+    Run one batch through a backend and return its results by custom id.
+
+    Every stage is kept in ``work_dir``: the input file, the batch id once
+    submitted and the output file once finished. Calling this again with
+    the same name resumes from the last stage reached, so an interrupted
+    campaign neither resubmits nor pays twice for finished batches.
+    """
+    input_path = os.path.join(work_dir, f'{name}.requests.jsonl')
+    id_path = os.path.join(work_dir, f'{name}.batch_id')
+    output_path = os.path.join(work_dir, f'{name}.results.jsonl')
+
+    if not os.path.exists(output_path):
+        if os.path.exists(id_path):
+            with open(id_path, 'r', encoding='utf-8') as f:
+                batch_id = f.read().strip()
+        else:
+            await asyncio.to_thread(write_jsonl, input_path, requests)
+            batch_id = await asyncio.to_thread(backend.submit, input_path)
+            with open(id_path, 'w', encoding='utf-8') as f:
+                f.write(batch_id)
+            print(f'submitted batch {name} ({len(requests)} requests): {batch_id}')
+
+        while not await asyncio.to_thread(backend.poll, batch_id, output_path):
+            await asyncio.sleep(poll_interval)
+
+    results = await asyncio.to_thread(read_jsonl, output_path)
+    return {result['custom_id']: result for result in results}
+
+
+class _NoProvider(BaseProvider):
+    # batch replicas must never call a provider directly
+    def parse(self, messages, model, response_format):
+        raise RuntimeError("Batch replicas do not make direct LLM calls")
+
+
+_NO_PROVIDER = _NoProvider()
+
+
+class _Replica(object):
+    def __init__(self, index: int, case: CaseModel, model_name: str):
+        self.index = index
+        self.failed = None
+        self.trajectory = None
+        # agents are only used to build prompts and keep memories here, never called
+        self.env_agent = EnvAgent(model_name=model_name, provider=_NO_PROVIDER)
+        self.env_agent.case = case
+        self.native = BioAgent(model_name=model_name, provider=_NO_PROVIDER)
+        self.native.initialize_life(
+            bio_name=case.native_specie_name,
+            bio_role='native specie',
+            bio_num=case.native_specie_initial_number,
+            bio_density=case.native_specie_initial_density
+        )
+        self.invasive = BioAgent(model_name=model_name, provider=_NO_PROVIDER)
+        self.invasive.initialize_life(
+            bio_name=case.invasive_specie_name,
+            bio_role='invasive specie',
+            bio_num=case.invasive_specie_initial_number,
+            bio_density=case.invasive_specie_initial_density
+        )
+
+    def step_requests(self, step: int, case: CaseModel) -> dict[str, tuple[list[dict], type[BaseModel]]]:
+        """
+        Messages of the three predictions of ``step``, like ``predict_step``
+        """
+        environment = self.env_agent.get_current_environment_status()
+        return {
+            'invasive': (
+                self.invasive.build_life_messages(**life_prediction_inputs(self.invasive, self.native, environment)),
+                BioModel,
+            ),
+            'native': (
+                self.native.build_life_messages(**life_prediction_inputs(self.native, self.invasive, environment)),
+                BioModel,
+            ),
+            'environment': (
+                self.env_agent.build_environment_messages(
+                    agent_status_list=agent_status_list(self.native, self.invasive),
+                    env_change_condition=case.weather_changing_description,
+                    user_instruction=environment_instruction(step)
+                ),
+                EnvironmentModel,
+            ),
+        }
+
+    def record(self, outputs: dict[str, BaseModel]):
+        self.invasive.record_life(outputs['invasive'])
+        self.native.record_life(outputs['native'])
+        self.env_agent.record_environment(outputs['environment'])
+
+    def fail(self, error: Exception, step: int):
+        """
+        Drop the replica, its trajectory is NaN from ``step`` on like a failed ensemble replica
+        """
+        print(f'replica {self.index} failed: {error}')
+        self.failed = error
+        if self.trajectory is not None:
+            self.trajectory.clear(step)
+
+    def record_trajectory(self, step: int):
+        if self.trajectory is not None:
+            self.trajectory.record(
+                step, self.native.life_memory[-1], self.invasive.life_memory[-1], self.env_agent.environment_memory[-1]
+            )
+
+
+async def _run_batch_round(
+        replicas: list[_Replica],
+        requests_by_replica: dict[int, dict[str, tuple[list[dict], type[BaseModel]]]],
+        backend: BatchBackend,
+        model_name: str,
+        work_dir: str,
+        name: str,
+        poll_interval: float,
+        trajectory_step: int
+) -> dict[int, dict[str, BaseModel]]:
+    lines = [
+        make_batch_request(f'{name}-r{index}-{agent}', model_name, messages, schema, seed=index)
+        for index, agent_requests in requests_by_replica.items()
+        for agent, (messages, schema) in agent_requests.items()
+    ]
+    results = await execute_batch(backend, lines, work_dir, name, poll_interval)
+
+    outputs = {}
+    for replica in replicas:
+        if replica.index not in requests_by_replica:
+            continue
+        try:
+            outputs[replica.index] = {
+                agent: parse_batch_result(results.get(f'{name}-r{replica.index}-{agent}', {}), schema)
+                for agent, (_, schema) in requests_by_replica[replica.index].items()
+            }
+        except (ProviderError, ValueError) as e:
+            # one failed request drops its replica, like a failed ensemble replica
+            replica.fail(e, trajectory_step)
+    return outputs
+
+
+async def run_batch_simulation(
+        n_replicas: int,
+        time_steps: int = 10,
+        setting_id: str = "setting-1",
+        backend: BatchBackend = None,
+        model_name: str = 'gpt-4o-mini',
+        work_dir: str = None,
+        poll_interval: float = 30.0,
+        case: CaseModel = None,
+        trajectory_path: str = None,
+) -> AsyncIterator[list[dict]]:
+    """
+    Advance many replicas of a setting together, one batch job per step.
+
+    Every step, the requests of all agents of all live replicas are written
+    to one JSONL file and submitted through ``backend``; once its results
+    are in, each prediction is stored in its agent's memory and all
+    replicas move to the next step. The environment initialization is a
+    batch of its own. A replica whose request failed is dropped.
+
+    Args:
+        n_replicas: Number of replicas
+        time_steps: Number of time steps to simulate
+        setting_id: ID of the case setting to use
+        backend: Batch backend, defaults to ``OpenAIBatchBackend``
+        model_name: Model of all agents
+        work_dir: Directory of the batch files. Reusing it resumes an
+            interrupted campaign. Defaults to a new directory in the cache dir.
+        poll_interval: Seconds between two polls of an unfinished batch
+        case: Case to simulate instead of ``setting_id``
+        trajectory_path: TrajectoryStore directory receiving every replica's
+            trajectory, one run per replica
+
+    Yields:
+        Per step, the ``step_data`` of every live replica (see
+        ``ensemble.aggregate_step`` to summarize them).
+    """
+    if case is None:
+        if setting_id not in cases:
+            raise ValueError(f"Unknown setting ID: {setting_id}")
+        case = CaseModel(**cases[setting_id])
+    backend = backend or OpenAIBatchBackend()
+    if work_dir is None:
+        work_dir = os.path.join(get_cache_dir(), 'batches', f"{setting_id}-{time.strftime('%Y%m%d-%H%M%S')}")
+    os.makedirs(work_dir, exist_ok=True)
+    print(f'batch campaign directory: {work_dir}')
+
+    replicas = [_Replica(index, case, model_name) for index in range(n_replicas)]
+    store = None
+    if trajectory_path:
+        store = TrajectoryStore(trajectory_path, time_steps=time_steps)
+        for replica, run in zip(replicas, store.add_runs(n_replicas)):
+            replica.trajectory = store.run(run)
+
+    init_requests = {
+        replica.index: {'environment': (EnvAgent.build_initialize_messages(case), EnvironmentModel)}
+        for replica in replicas
+    }
+    outputs = await _run_batch_round(
+        replicas, init_requests, backend, model_name, work_dir, 'init', poll_interval, 0
+    )
+    for index, output in outputs.items():
+        replicas[index].env_agent.record_environment(output['environment'])
+        replicas[index].record_trajectory(0)
+
+    for i in range(time_steps):
+        live = [replica for replica in replicas if replica.failed is None]
+        if not live:
+            raise RuntimeError("All batch replicas failed")
+
+        with track_step(i, 'batch'):
+            requests = {replica.index: replica.step_requests(i, case) for replica in live}
+            outputs = await _run_batch_round(
+                live, requests, backend, model_name, work_dir, f'step-{i:03d}', poll_interval, i + 1
+            )
+            for index, output in outputs.items():
+                replicas[index].record(output)
+                replicas[index].record_trajectory(i + 1)
+
+        step_states = [
+            make_step_data(
+                case,
+                i,
+                replica.native.life_memory[-1]['specie_num'],
+                replica.invasive.life_memory[-1]['specie_num'],
+                source='batch'
+            )
+            for replica in replicas if replica.failed is None
+        ]
+        if not step_states:
+            raise RuntimeError("All batch replicas failed")
+        if store is not None:
+            store.flush()
+        yield step_states
+
+
+if __name__ == '__main__':
+    from simulator.ensemble import aggregate_step
+
+    async def main():
+        # local stand-in, pass OpenAIBatchBackend() for a real campaign
+        async for step_states in run_batch_simulation(n_replicas=8, time_steps=10, backend=LocalBatchBackend()):
+            print(aggregate_step(step_states))
+
+    asyncio.run(main())
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseModel
+
+from simulator.utils import get_project_root
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# eviction goes down to this share of the bound, so it does not rerun on every write at the bound
+EVICT_TO = 0.9
+
+# reads recorded in memory before their access times and hit/miss counts are written,
+# so lookups do not take the database write lock
+ACCESS_FLUSH_READS = 64
+ACCESS_FLUSH_SECONDS = 5.0
+
+
+@lru_cache(maxsize=None)
+def _schema_fingerprint(response_format: type[BaseModel]) -> str:
+    return json.dumps(response_format.model_json_schema(), sort_keys=True)
+
+
+def make_cache_key(
+        model: str,
+        messages: list[dict],
+        response_format: type[BaseModel],
+        backend: str = None
+) -> str:
+    """
+    Content address of a structured call: backend, model name, messages and schema.
+    """
+    payload = json.dumps(
+        [backend, model, messages, _schema_fingerprint(response_format)],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache(object):
+    """
+    Persistent, size-bounded LRU key/value store on top of SQLite.
+
+    SQLite file locking makes the cache safe to share between several
+    processes; a lock serializes threads of the same process. Every write
+    runs in one ``BEGIN IMMEDIATE`` transaction that also updates the stored
+    size kept in the counters table, so the size never has to be summed and
+    never drifts between processes. Reads only record their access time and
+    hit or miss in memory; they are written in batches (every
+    ``ACCESS_FLUSH_READS`` reads or ``ACCESS_FLUSH_SECONDS``, and before
+    every write), so lookups do not contend for the write lock. Hit and
+    miss counters are kept both for this instance and in the database.
+
+    Args:
+        path: Database file. Created if missing.
+        max_bytes: Upper bound on the total size of stored values. Least
+            recently used entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._access = {}
+        self._counts = {'hits': 0, 'misses': 0}
+        self._flushed = time.monotonic()
+        with self._transaction():
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            self._conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+            # caches written before the size was a counter get it from their entries once
+            self._conn.execute(
+                "INSERT OR IGNORE INTO counters SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries"
+            )
+            self._total = self._stored_bytes()
+
+    @contextmanager
+    def _transaction(self):
+        # the connection is in autocommit mode, take the write lock up front
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+
+    def _add_bytes(self, amount: int):
+        self._conn.execute("UPDATE counters SET value = value + ? WHERE name = 'bytes'", (amount,))
+
+    def _write_access(self):
+        # inside a transaction
+        if self._access:
+            self._conn.executemany(
+                'UPDATE entries SET last_access = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in self._access.items()]
+            )
+        for name, count in self._counts.items():
+            if count:
+                self._conn.execute('UPDATE counters SET value = value + ? WHERE name = ?', (count, name))
+        self._access = {}
+        self._counts = {'hits': 0, 'misses': 0}
+        self._flushed = time.monotonic()
+
+    def _flush_access(self):
+        if self._access or any(self._counts.values()):
+            with self._transaction():
+                self._write_access()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row:
+                self._access[key] = time.time()
+            self._counts['hits' if row else 'misses'] += 1
+            if len(self._access) + sum(self._counts.values()) >= ACCESS_FLUSH_READS \
+                    or time.monotonic() - self._flushed >= ACCESS_FLUSH_SECONDS:
+                self._flush_access()
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set(self, key: str, value: str):
+        size = len(value.encode('utf-8'))
+        with self._lock, self._transaction():
+            # pending access times first, eviction must see them
+            self._write_access()
+            replaced = self._conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                (key, value, size, time.time())
+            )
+            self._add_bytes(size - (replaced[0] if replaced else 0))
+            self._total = self._stored_bytes()
+            self._evict()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        # drop least recently used entries until we are back under the bound
+        target = int(self.max_bytes * EVICT_TO)
+        rows = self._conn.execute('SELECT key, size FROM entries ORDER BY last_access ASC').fetchall()
+        stale = []
+        evicted = 0
+        for key, size in rows:
+            if self._total - evicted <= target:
+                break
+            stale.append((key,))
+            evicted += size
+        self._conn.executemany('DELETE FROM entries WHERE key = ?', stale)
+        self._add_bytes(-evicted)
+        self._total -= evicted
+
+    def clear(self):
+        with self._lock, self._transaction():
+            self._conn.execute('DELETE FROM entries')
+            self._conn.execute('UPDATE counters SET value = 0')
+            self._access = {}
+            self._counts = {'hits': 0, 'misses': 0}
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._flush_access()
+            entries, total = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+            counters = dict(self._conn.execute('SELECT name, value FROM counters').fetchall())
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': counters.get('hits', 0),
+            'total_misses': counters.get('misses', 0),
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.close()
+
+
+_caches: dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache_dir() -> str:
+    return os.getenv('BIOSIM_CACHE_DIR') or os.path.join(get_project_root(), '.cache')
+
+
+def get_response_cache(path: str = None, max_bytes: int = None) -> ResponseCache:
+    """
+    Process-wide cache instance per database file.
+
+    Args:
+        path: Database file, defaults to ``responses.sqlite`` in the cache
+            directory (BIOSIM_CACHE_DIR, then ``<project>/.cache``).
+        max_bytes: Size bound, defaults to BIOSIM_CACHE_MAX_BYTES or 256 MiB.
+    """
+    path = os.path.abspath(path or os.path.join(get_cache_dir(), 'responses.sqlite'))
+    with _caches_lock:
+        if path not in _caches:
+            if max_bytes is None:
+                max_bytes = int(os.getenv('BIOSIM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+            _caches[path] = ResponseCache(path, max_bytes=max_bytes)
+        return _caches[path]
@@ -0,0 +1,208 @@
+import asyncio
+from typing import AsyncIterator
+
+import numpy as np
+
+from simulator.agents import BioAgent, EnvAgent
+from simulator.metrics import track_step
+from simulator.providers import BaseProvider, get_provider
+from simulator.types import CaseModel, SpeciesModel
+
+
+def species_from_case(case: CaseModel) -> list[SpeciesModel]:
+    """
+    The native and invasive species of a two-species case
+    """
+    return [
+        SpeciesModel(
+            name=case.native_specie_name,
+            role='native specie',
+            initial_number=case.native_specie_initial_number,
+            initial_density=case.native_specie_initial_density,
+        ),
+        SpeciesModel(
+            name=case.invasive_specie_name,
+            role='invasive specie',
+            initial_number=case.invasive_specie_initial_number,
+            initial_density=case.invasive_specie_initial_density,
+        ),
+    ]
+
+
+class CommunityState(object):
+    """
+    Populations and densities of all species, stored in preallocated
+    (species, step) arrays. Column 0 is the initial state.
+
+    History windows are returned as NumPy views, no per-step Python objects
+    are kept.
+    """
+
+    def __init__(self, species: list[SpeciesModel], time_steps: int):
+        self.species = species
+        self.step = 0
+
+        n_species = len(species)
+        self.populations = np.zeros((n_species, time_steps + 1), dtype=np.int64)
+        self.densities = np.zeros((n_species, time_steps + 1), dtype=np.int64)
+        self.populations[:, 0] = [specie.initial_number for specie in species]
+        self.densities[:, 0] = [specie.initial_density for specie in species]
+
+    @property
+    def n_species(self) -> int:
+        return len(self.species)
+
+    def current(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.populations[:, self.step], self.densities[:, self.step]
+
+    def record(self, populations, densities):
+        """
+        Store the state of the next step for all species at once
+        """
+        self.step += 1
+        self.populations[:, self.step] = populations
+        self.densities[:, self.step] = densities
+
+    def window(self, index: int, size: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Last ``size`` populations and densities of one specie, as views
+        """
+        start = max(0, self.step - size + 1)
+        return (
+            self.populations[index, start:self.step + 1],
+            self.densities[index, start:self.step + 1],
+        )
+
+    def history_table(self, index: int, size: int) -> str:
+        populations, densities = self.window(index, size)
+        first = self.step - len(populations) + 1
+        return '\n'.join(
+            f'{first + offset},{population},{density}'
+            for offset, (population, density) in enumerate(zip(populations.tolist(), densities.tolist()))
+        )
+
+    def monthly_change(self) -> np.ndarray:
+        """
+        Population change of every specie over the last step in %
+        """
+        if self.step == 0:
+            return np.zeros(self.n_species)
+        previous = self.populations[:, self.step - 1].astype(np.float64)
+        current = self.populations[:, self.step]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (current - previous) / previous * 100
+        return np.where(np.isfinite(change), change, 0.0)
+
+    def community_table(self) -> str:
+        """
+        One compact line per specie, shared by every agent's prompt
+        """
+        populations, densities = self.current()
+        change = self.monthly_change()
+        return '\n'.join(
+            f'{specie.name}|{specie.role}|{population}|{density}|{rate:+.1f}'
+            for specie, population, density, rate in zip(
+                self.species, populations.tolist(), densities.tolist(), change.tolist()
+            )
+        )
+
+    def status_list(self) -> list[dict]:
+        """
+        Compact per-specie status for the environment agent
+        """
+        populations, densities = self.current()
+        return [
+            {
+                "bio_name": specie.name,
+                "bio_num": population,
+                "bio_density": density,
+                "characteristics": specie.role,
+            }
+            for specie, population, density in zip(self.species, populations.tolist(), densities.tolist())
+        ]
+
+
+async def run_community_simulation(
+        case: CaseModel,
+        species: list[SpeciesModel] = None,
+        time_steps: int = 10,
+        provider: BaseProvider = None,
+        max_memory_records: int = 10,
+        env_instructions: dict[int, str] = None,
+) -> AsyncIterator[dict]:
+    """
+    Simulate a community of any number of interacting species.
+
+    Every step, one prediction per specie and the environment prediction
+    are requested concurrently. Each specie sees its own recent history and
+    one compact table of the whole community.
+
+    Args:
+        case: Case describing the ecosystem, used to initialize the environment
+        species: Species of the community, defaults to the case's two species
+        time_steps: Number of time steps to simulate
+        provider: LLM provider shared by all agents
+        max_memory_records: History window shown to each agent
+        env_instructions: External factors injected at given steps, e.g.
+            ``{6: "Environment more favourable for invasive species"}``
+
+    Yields:
+        {'step', 'species', 'populations', 'densities', 'env_change'} per step,
+        populations and densities ordered like ``species``.
+    """
+    species = species or species_from_case(case)
+    env_instructions = env_instructions or {}
+    provider = provider or get_provider()
+
+    state = CommunityState(species, time_steps)
+
+    env_agent = EnvAgent(provider=provider, max_memory_records=max_memory_records)
+    env_init_task = asyncio.create_task(env_agent.ainitialize_environment(case_model=case))
+
+    agents = []
+    for specie in species:
+        agent = BioAgent(provider=provider, max_memory_records=max_memory_records)
+        agent.bio_name = specie.name
+        agent.bio_role = specie.role
+        agents.append(agent)
+
+    await env_init_task
+
+    for i in range(time_steps):
+        populations, densities = state.current()
+        community_table = state.community_table()
+        current_environment = env_agent.get_current_environment_status()
+
+        predictions = [
+            agent.predict_in_community(
+                bio_num=int(populations[index]),
+                bio_density=int(densities[index]),
+                status_history=state.history_table(index, max_memory_records),
+                community_table=community_table,
+                current_environment=current_environment,
+            )
+            for index, agent in enumerate(agents)
+        ]
+        environment_prediction = env_agent.predict_environment(
+            agent_status_list=state.status_list(),
+            env_change_condition=case.weather_changing_description,
+            user_instruction=env_instructions.get(i),
+        )
+
+        # the coroutines only run, and get their context, inside gather
+        with track_step(i, 'community'):
+            *outputs, _ = await asyncio.gather(*predictions, environment_prediction)
+
+        state.record(
+            [output.specie_num for output in outputs],
+            [output.specie_density for output in outputs],
+        )
+
+        populations, densities = state.current()
+        yield {
+            'step': i,
+            'species': [specie.name for specie in species],
+            'populations': populations.tolist(),
+            'densities': densities.tolist(),
+            'env_change': 1 if i in env_instructions else 0,
+        }
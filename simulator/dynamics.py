@@ -0,0 +1,193 @@
+import numpy as np
+
+from simulator.types import CaseModel
+
+# species axis order used by every array in this module
+NATIVE, INVASIVE = 0, 1
+SPECIES = ('native', 'invasive')
+
+MONTHS_PER_YEAR = 12
+
+
+class CompetitionParameters(object):
+    """
+    Parameter sets of the discrete Lotka-Volterra competition model.
+
+    Every array has a leading parameter-set axis ``P`` so that many sets are
+    advanced together; ``S`` is the species axis.
+
+    Args:
+        growth: (P, S) intrinsic monthly log growth rates
+        capacity: (P, S) carrying capacities
+        competition: (P, S, S) competition coefficients, ``competition[p, i, j]``
+            is the effect of species j on species i (diagonal is 1)
+        initial_number: (P, S) populations at step 0
+        initial_density: (P, S) densities at step 0
+        seasonal_amplitude: (P,) relative amplitude of the yearly growth cycle
+        seasonal_phase: (P,) month at which the cycle crosses its mean upwards
+        event_step: step from which ``event_boost`` applies, None for no event
+        event_boost: (P, S) growth multiplier once the event happened
+    """
+
+    def __init__(
+            self,
+            growth,
+            capacity,
+            competition,
+            initial_number,
+            initial_density,
+            seasonal_amplitude,
+            seasonal_phase,
+            event_step=None,
+            event_boost=None,
+    ):
+        self.growth = np.asarray(growth, dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.float64)
+        self.competition = np.asarray(competition, dtype=np.float64)
+        self.initial_number = np.asarray(initial_number, dtype=np.float64)
+        self.initial_density = np.asarray(initial_density, dtype=np.float64)
+        self.seasonal_amplitude = np.asarray(seasonal_amplitude, dtype=np.float64)
+        self.seasonal_phase = np.asarray(seasonal_phase, dtype=np.float64)
+        self.event_step = event_step
+        self.event_boost = np.ones_like(self.growth) if event_boost is None \
+            else np.asarray(event_boost, dtype=np.float64)
+
+    @property
+    def n_sets(self) -> int:
+        return self.growth.shape[0]
+
+    @property
+    def n_species(self) -> int:
+        return self.growth.shape[1]
+
+
+def parameters_from_case(
+        case: CaseModel,
+        n_sets: int = 1,
+        rng: np.random.Generator = None,
+        native_growth: float = 0.5,
+        capacity_factor: float = 20.0,
+        seasonal_amplitude: float = 0.3,
+        event_step: int = None,
+        event_boost: float = 1.2,
+) -> CompetitionParameters:
+    """
+    Calibrate the competition model from a case.
+
+    The invasive species starts growing at the case's monthly growth rate
+    and is limited by a carrying capacity of ``capacity_factor`` times the
+    larger initial population. The native species sits at its carrying
+    capacity and declines only through invasive competition, calibrated so
+    the initial monthly decline equals the case's decline rate.
+
+    With ``rng`` rates are drawn uniformly within the case bounds for each
+    parameter set, otherwise the midpoints are used.
+
+    Args:
+        case: Case with initial numbers/densities and monthly rate bounds (%)
+        n_sets: Number of parameter sets
+        rng: Generator for sampled parameter sets
+        native_growth: Intrinsic monthly log growth rate of the native species
+        capacity_factor: Invasive carrying capacity relative to the larger
+            initial population
+        seasonal_amplitude: Relative amplitude of the yearly growth cycle
+        event_step: Step of an environment change favouring the invasive species
+        event_boost: Invasive growth multiplier from ``event_step`` on
+    """
+    growth_bounds = sorted([case.invasive_specie_growth_lower, case.invasive_specie_growth_upper])
+    decline_bounds = sorted([abs(case.native_specie_decline_lower), abs(case.native_specie_decline_upper)])
+    if rng is None:
+        invasive_rate = np.full(n_sets, np.mean(growth_bounds) / 100)
+        native_rate = np.full(n_sets, np.mean(decline_bounds) / 100)
+    else:
+        invasive_rate = rng.uniform(*growth_bounds, size=n_sets) / 100
+        native_rate = rng.uniform(*decline_bounds, size=n_sets) / 100
+
+    native_0 = float(max(case.native_specie_initial_number, 1))
+    invasive_0 = float(max(case.invasive_specie_initial_number, 1))
+    native_capacity = native_0
+    invasive_capacity = capacity_factor * max(native_0, invasive_0)
+
+    # exact initial rates: log(1 + g) = r (1 - N0 / K) for the invasive species,
+    # log(1 - d) = -r_n * a * I0 / N0 for the native one at its capacity
+    invasive_growth = np.log1p(invasive_rate) / (1 - invasive_0 / invasive_capacity)
+    native_competition = -np.log1p(-np.minimum(native_rate, 0.99)) * native_0 / (native_growth * invasive_0)
+
+    competition = np.zeros((n_sets, 2, 2))
+    competition[:, NATIVE, NATIVE] = 1
+    competition[:, INVASIVE, INVASIVE] = 1
+    competition[:, NATIVE, INVASIVE] = native_competition
+
+    boost = np.ones((n_sets, 2))
+    boost[:, INVASIVE] = event_boost
+
+    return CompetitionParameters(
+        growth=np.stack([np.full(n_sets, native_growth), invasive_growth], axis=1),
+        capacity=np.tile([native_capacity, invasive_capacity], (n_sets, 1)),
+        competition=competition,
+        initial_number=np.tile([native_0, invasive_0], (n_sets, 1)),
+        initial_density=np.tile(
+            [case.native_specie_initial_density, case.invasive_specie_initial_density], (n_sets, 1)
+        ),
+        seasonal_amplitude=np.full(n_sets, seasonal_amplitude),
+        seasonal_phase=np.zeros(n_sets),
+        event_step=event_step,
+        event_boost=boost,
+    )
+
+
+def seasonal_factor(params: CompetitionParameters, time_steps: int) -> np.ndarray:
+    """
+    (T, P) growth multipliers of the yearly cycle
+    """
+    months = np.arange(time_steps, dtype=np.float64)[:, None]
+    angle = 2 * np.pi * (months - params.seasonal_phase[None, :]) / MONTHS_PER_YEAR
+    return 1 + params.seasonal_amplitude[None, :] * np.sin(angle)
+
+
+def simulate(params: CompetitionParameters, time_steps: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Advance all parameter sets with the Ricker form of Lotka-Volterra
+    competition, ``N' = N exp(r s(t) (1 - (A N) / K))``, which keeps
+    populations positive for any step size.
+
+    Returns:
+        populations and densities, both (P, T + 1, S) with step 0 the
+        initial state. Densities scale with population on a fixed area.
+    """
+    populations = np.empty((params.n_sets, time_steps + 1, params.n_species))
+    populations[:, 0] = params.initial_number
+    season = seasonal_factor(params, time_steps)
+
+    current = populations[:, 0]
+    for t in range(time_steps):
+        rate = params.growth * season[t][:, None]
+        if params.event_step is not None and t >= params.event_step:
+            rate = rate * params.event_boost
+        pressure = np.einsum('pij,pj->pi', params.competition, current)
+        current = current * np.exp(rate * (1 - pressure / params.capacity))
+        populations[:, t + 1] = current
+
+    densities = populations * (params.initial_density / params.initial_number)[:, None, :]
+    return populations, densities
+
+
+def fit_log_rates(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """
+    Mean per-step log growth rate of each variable over observed one-step
+    transitions.
+
+    Args:
+        before: (K, V) states before each transition
+        after: (K, V) states after each transition
+
+    Returns:
+        (V,) rates, apply as ``state * exp(rates)``. Zero where a variable
+        was zero, so extinct species stay extinct.
+    """
+    before = np.asarray(before, dtype=np.float64)
+    after = np.asarray(after, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.log(after / before)
+    rates = np.where(np.isfinite(rates), rates, 0.0)
+    return rates.mean(axis=0)
@@ -0,0 +1,157 @@
+import asyncio
+from typing import AsyncIterator
+
+from simulator.providers import BaseProvider, ConcurrencyLimitedProvider, get_provider
+from simulator.providers.base import current_replica
+from simulator.simulation import run_simulation
+from simulator.trajectories import TrajectoryStore
+from simulator.utils import percentile
+
+DEFAULT_PERCENTILES = (5, 50, 95)
+ENSEMBLE_VARIABLES = ('native_population', 'invasive_population')
+# trajectory store variable of each ensemble variable
+TRAJECTORY_COLUMNS = {
+    'native_population': 'native.specie_num',
+    'invasive_population': 'invasive.specie_num',
+}
+
+_DONE = object()
+
+
+def aggregate_step(
+        step_states: list[dict],
+        percentiles=DEFAULT_PERCENTILES,
+        store: TrajectoryStore = None,
+        runs: range = None
+) -> dict:
+    """
+    Summarize the states of all replicas at one step.
+
+    With a trajectory store the numbers come from NumPy slices of the
+    replicas' runs instead of the step dicts.
+    """
+    aggregate = {
+        'step': step_states[0]['step'],
+        'n_replicas': len(step_states),
+        'native_name': step_states[0]['native_name'],
+        'invasive_name': step_states[0]['invasive_name'],
+        'env_change': step_states[0]['env_change'],
+    }
+    for variable in ENSEMBLE_VARIABLES:
+        if store is not None:
+            aggregate[variable] = store.summary(
+                TRAJECTORY_COLUMNS[variable], aggregate['step'] + 1, percentiles, runs=runs
+            )
+            continue
+        values = sorted(state[variable] for state in step_states)
+        summary = {'mean': sum(values) / len(values)}
+        for q in percentiles:
+            summary[f'p{q:g}'] = percentile(values, q)
+        aggregate[variable] = summary
+    return aggregate
+
+
+async def _run_replica(replica: int, queue: asyncio.Queue, simulation_kwargs: dict, trajectory=None):
+    current_replica.set(replica)
+    try:
+        async for step_data in run_simulation(render=False, trajectory=trajectory, **simulation_kwargs):
+            await queue.put((replica, step_data))
+    except Exception as e:
+        print(f'replica {replica} failed: {e}')
+        await queue.put((replica, e))
+    else:
+        await queue.put((replica, _DONE))
+
+
+async def run_ensemble(
+        n_replicas: int,
+        time_steps: int = 10,
+        setting_id: str = "setting-1",
+        max_concurrency: int = 16,
+        provider: BaseProvider = None,
+        percentiles=DEFAULT_PERCENTILES,
+        joint_step: bool = False,
+        trajectory_path: str = None,
+) -> AsyncIterator[dict]:
+    """
+    Run independent replicas of a setting concurrently and stream per-step
+    aggregates.
+
+    All replicas run on the current event loop and share one provider, so
+    they share its clients and a global cap on requests in flight. An
+    aggregate for a step is yielded as soon as every replica still running
+    has finished that step; failed replicas are dropped from the count.
+
+    Args:
+        n_replicas: Number of independent replicas
+        time_steps: Number of time steps per replica
+        setting_id: ID of the case setting to use
+        max_concurrency: Maximum number of LLM requests in flight across all
+            replicas
+        provider: Shared provider, defaults to ``get_provider()``
+        percentiles: Percentiles reported next to the mean for each variable
+        joint_step: One structured call per replica and step, see ``run_simulation``
+        trajectory_path: TrajectoryStore directory to write every replica's
+            trajectory to, aggregates are then computed from it. Reusing a
+            store adds this ensemble's runs after the existing ones.
+    """
+    provider = ConcurrencyLimitedProvider(provider or get_provider(), max_concurrency)
+    store = runs = None
+    if trajectory_path:
+        store = TrajectoryStore(trajectory_path, time_steps=time_steps)
+        runs = store.add_runs(n_replicas)
+    queue = asyncio.Queue()
+    simulation_kwargs = {
+        'time_steps': time_steps,
+        'setting_id': setting_id,
+        'provider': provider,
+        'joint_step': joint_step,
+    }
+
+    tasks = [
+        asyncio.create_task(_run_replica(
+            replica, queue, simulation_kwargs, store.run(runs[replica]) if store is not None else None
+        ))
+        for replica in range(n_replicas)
+    ]
+
+    # states[step][replica] -> step_data
+    states = [dict() for _ in range(time_steps)]
+    alive = n_replicas
+    next_step = 0
+    try:
+        while alive and next_step < time_steps:
+            replica, item = await queue.get()
+            if item is _DONE:
+                continue
+            if isinstance(item, Exception):
+                alive -= 1
+                for step_states in states[next_step:]:
+                    step_states.pop(replica, None)
+                if store is not None:
+                    store.run(runs[replica]).clear(next_step + 1)
+            else:
+                states[item['step']][replica] = item
+
+            # emit every step that all live replicas have reached
+            while alive and next_step < time_steps and len(states[next_step]) >= alive:
+                yield aggregate_step(list(states[next_step].values()), percentiles, store=store, runs=runs)
+                states[next_step] = None
+                next_step += 1
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if store is not None:
+            store.flush()
+
+    if alive == 0 and next_step < time_steps:
+        raise RuntimeError("All ensemble replicas failed")
+
+
+if __name__ == '__main__':
+    async def main():
+        async for aggregate in run_ensemble(n_replicas=8, time_steps=10):
+            print(aggregate)
+
+    asyncio.run(main())
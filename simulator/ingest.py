@@ -0,0 +1,291 @@
+import os
+import re
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from simulator.cache import ResponseCache
+from simulator.providers import BaseProvider, get_provider
+from simulator.pdf_digest import (
+    DIGEST_MODES,
+    digest_outcome,
+    digest_pdf_text,
+    extract_pdf_text,
+    file_sha256,
+    get_digest_mode,
+    get_pdf_cache,
+    get_pdf_ranking,
+    load_digest,
+    pdf_digest_keys,
+    save_digest,
+)
+from simulator.utils import get_project_root
+
+DEFAULT_LIBRARY = os.path.join(get_project_root(), 'data', 'cases_library.json')
+
+# statuses that are final, files that ended in an error are retried on the next run
+DONE_STATUSES = ('ok', 'invalid', 'empty')
+
+
+def find_pdfs(folder: str) -> list[str]:
+    """
+    PDF files below ``folder``, in a stable order
+    """
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths += [os.path.join(root, name) for name in files if name.lower().endswith('.pdf')]
+    return sorted(paths)
+
+
+def load_library(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_library(path: str, library: dict):
+    # atomic, an interrupted run never leaves a truncated library behind
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(library, f, ensure_ascii=False, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+
+def load_status(path: str) -> dict[str, dict]:
+    """
+    Latest status record per content hash
+    """
+    status = {}
+    if not os.path.exists(path):
+        return status
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                status[record['sha256']] = record
+    return status
+
+
+def case_id(file_path: str, content_hash: str) -> str:
+    """
+    Setting id of an ingested paper, readable and unique per content
+    """
+    stem = re.sub(r'[^a-z0-9]+', '-', os.path.splitext(os.path.basename(file_path))[0].lower()).strip('-')
+    return f'paper-{stem[:40]}-{content_hash[:8]}'
+
+
+class _Ingestion(object):
+    """
+    Shared state of one ingestion run: library, status log and counters.
+    All methods run on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, library_path: str, status_path: str, total: int, flush_interval: float):
+        self.library_path = library_path
+        self.status_path = status_path
+        self.library = load_library(library_path)
+        self.total = total
+        self.flush_interval = flush_interval
+        self.counts = {}
+        self.cached = 0
+        self.started = time.perf_counter()
+        self._dirty = False
+        self._flushed = time.perf_counter()
+
+    async def record(self, record: dict, case_data=None):
+        if case_data is not None:
+            self.library[record['case_id']] = case_data.model_dump()
+            self._dirty = True
+        with open(self.status_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.counts[record['status']] = self.counts.get(record['status'], 0) + 1
+        if time.perf_counter() - self._flushed >= self.flush_interval:
+            await self.flush()
+
+        done = sum(self.counts.values())
+        elapsed = time.perf_counter() - self.started
+        print(
+            f"[{done}/{self.total}] {record['status']:<7} {os.path.basename(record['file'])} "
+            f"({record['seconds']:.1f}s, {done / elapsed * 60:.1f} files/min)"
+        )
+
+    async def flush(self):
+        if self._dirty:
+            await asyncio.to_thread(save_library, self.library_path, dict(self.library))
+            self._dirty = False
+        self._flushed = time.perf_counter()
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        done = sum(self.counts.values())
+        return {
+            'files': self.total,
+            'processed': done,
+            'cached': self.cached,
+            'statuses': dict(self.counts),
+            'library_size': len(self.library),
+            'seconds': round(elapsed, 3),
+            'files_per_minute': round(done / elapsed * 60, 2) if elapsed > 0 else None,
+        }
+
+
+async def _ingest_file(
+        path: str,
+        state: _Ingestion,
+        pool: ProcessPoolExecutor,
+        llm_slots: asyncio.Semaphore,
+        provider: BaseProvider,
+        cache: Optional[ResponseCache],
+        max_characters: int,
+        max_tokens: int,
+        mode: str,
+        ranked: bool,
+        done: dict[str, dict]
+):
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    content_hash = await asyncio.to_thread(file_sha256, path)
+    previous = done.get(content_hash)
+    if previous is not None and previous['status'] in DONE_STATUSES:
+        return
+
+    record = {'file': path, 'sha256': content_hash, 'case_id': case_id(path, content_hash)}
+    case_data = None
+    try:
+        text_key = digest_key = None
+        digest = None
+        if cache:
+            text_key, digest_key = pdf_digest_keys(
+                content_hash, provider, max_characters, max_tokens, mode, ranked
+            )
+            digest = await asyncio.to_thread(load_digest, cache, digest_key)
+            state.cached += digest is not None
+
+        if digest is None:
+            # parsing is CPU bound, spread it over the cores
+            pdf_text = await loop.run_in_executor(pool, extract_pdf_text, path, max_characters, max_tokens, ranked)
+            if not pdf_text.strip():
+                record.update(status='empty', message="Could not extract text from PDF")
+                return
+            if cache:
+                await asyncio.to_thread(cache.set, text_key, pdf_text)
+            async with llm_slots:
+                digest = await digest_pdf_text(pdf_text, provider=provider, mode=mode)
+            if cache:
+                await asyncio.to_thread(save_digest, cache, digest_key, *digest)
+
+        success, message, case_data = digest_outcome(*digest)
+        record.update(status='ok' if success else 'invalid', message=message)
+    except Exception as e:
+        record.update(status='error', message=f"{type(e).__name__}: {e}")
+    finally:
+        record['seconds'] = round(time.perf_counter() - started, 3)
+        if 'status' in record:
+            await state.record(record, case_data)
+
+
+async def ingest_folder(
+        folder: str,
+        library_path: str = DEFAULT_LIBRARY,
+        status_path: str = None,
+        workers: int = None,
+        concurrency: int = 8,
+        max_characters: int = 5000,
+        max_tokens: int = None,
+        provider: BaseProvider = None,
+        cache: Optional[ResponseCache] = None,
+        flush_interval: float = 5.0,
+        mode: str = None,
+        ranked: bool = None
+) -> dict:
+    """
+    Digest every PDF below a folder into the case library.
+
+    Text extraction runs in a process pool, validation and extraction calls
+    with at most ``concurrency`` papers in flight. Valid papers are added to
+    the library (a JSON object of setting id -> case, like
+    ``data/cases_example.json``), which is rewritten at most every
+    ``flush_interval`` seconds and at the end. Every file gets a line in the
+    status log; running again skips files already ingested or rejected and
+    retries the ones that failed.
+
+    Args:
+        folder: Folder to search for PDFs, recursively
+        library_path: Case library file
+        status_path: JSON lines status log, defaults to ``<library>.status.jsonl``
+        workers: Extraction processes, defaults to the number of CPUs
+        concurrency: Papers with LLM calls in flight at the same time
+        max_characters: Character budget of the text sent to the LLM
+        max_tokens: Token budget of the text sent to the LLM
+        provider: LLM provider, defaults to ``get_provider()``
+        cache: PDF digest cache, defaults to ``get_pdf_cache()``, False for none
+        flush_interval: Seconds between two library rewrites
+        mode: How validation and extraction are issued, see ``digest_pdf_text``
+        ranked: Fill the budget with the most relevant chunks instead of the
+            first pages, parsing more of every paper, defaults to ``get_pdf_ranking()``
+
+    Returns:
+        Summary with counts per status and throughput
+    """
+    provider = provider or get_provider()
+    mode = mode or get_digest_mode()
+    ranked = get_pdf_ranking() if ranked is None else ranked
+    if cache is None:
+        cache = get_pdf_cache()
+    status_path = status_path or os.path.splitext(library_path)[0] + '.status.jsonl'
+    paths = find_pdfs(folder)
+    done = await asyncio.to_thread(load_status, status_path)
+    state = _Ingestion(library_path, status_path, len(paths), flush_interval)
+    llm_slots = asyncio.Semaphore(concurrency)
+    print(f'ingesting {len(paths)} PDFs from {folder} into {library_path}')
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            await asyncio.gather(*(
+                _ingest_file(
+                    path, state, pool, llm_slots, provider, cache, max_characters, max_tokens, mode, ranked, done
+                )
+                for path in paths
+            ))
+        finally:
+            await state.flush()
+
+    summary = state.summary()
+    summary['skipped'] = len(paths) - summary['processed']
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='python -m simulator.ingest',
+        description='Turn a folder of invasion papers into simulation cases'
+    )
+    parser.add_argument('folder', help='folder with PDF files, searched recursively')
+    parser.add_argument('--library', default=DEFAULT_LIBRARY, help='case library JSON file')
+    parser.add_argument('--status', default=None, help='status log, defaults to <library>.status.jsonl')
+    parser.add_argument('--workers', type=int, default=None, help='text extraction processes')
+    parser.add_argument('--concurrency', type=int, default=8, help='papers with LLM calls in flight')
+    parser.add_argument('--max-characters', type=int, default=5000, help='text budget per paper')
+    parser.add_argument('--max-tokens', type=int, default=None, help='token budget per paper')
+    parser.add_argument('--mode', choices=DIGEST_MODES, default=None,
+                        help='how validation and extraction are issued, defaults to BIOSIM_PDF_MODE or sequential')
+    parser.add_argument('--ranked', action='store_true',
+                        help='send the chunks most relevant to the case fields instead of the first pages')
+    args = parser.parse_args()
+
+    result = asyncio.run(ingest_folder(
+        args.folder,
+        library_path=args.library,
+        status_path=args.status,
+        workers=args.workers,
+        concurrency=args.concurrency,
+        max_characters=args.max_characters,
+        max_tokens=args.max_tokens,
+        mode=args.mode,
+        ranked=True if args.ranked else None,
+    ))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,292 @@
+import os
+import json
+import tempfile
+from array import array
+from collections.abc import Sequence
+from typing import Optional
+
+from simulator.utils import flatten_dict, unflatten_dict
+
+
+# records an archive buffers in memory before moving them to its column files
+SPILL_RECORDS = 1024
+
+_TYPECODES = {'bool': 'b', 'int': 'q', 'float': 'd'}
+
+
+class _Column(object):
+    """
+    One flattened field of the archive. Numbers go to typed arrays, strings
+    are dictionary encoded since most of them repeat from step to step.
+
+    With a ``path``, ``spill`` moves the buffered values to disk: numbers to
+    a raw ``<path>.bin`` file, strings and other values to ``<path>.jsonl``
+    with their line offsets in ``<path>.idx``.
+    """
+
+    def __init__(self, sample, path: str = None):
+        if isinstance(sample, bool):
+            self.kind = 'bool'
+        elif isinstance(sample, int):
+            self.kind = 'int'
+        elif isinstance(sample, float):
+            self.kind = 'float'
+        elif isinstance(sample, str):
+            self.kind = 'str'
+        else:
+            self.kind = 'object'
+        self.typecode = _TYPECODES.get(self.kind)
+        self.path = path
+        self.spilled = 0
+        self._reset()
+
+    def _reset(self):
+        if self.typecode is not None:
+            self.values = array(self.typecode)
+        elif self.kind == 'str':
+            self.values = array('l')
+            self.strings = []
+            self.codes = {}
+        else:
+            self.values = []
+
+    def __len__(self):
+        return self.spilled + len(self.values)
+
+    def append(self, value):
+        if self.kind == 'str':
+            value = str(value)
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.strings)
+                self.strings.append(value)
+            self.values.append(code)
+        elif self.kind == 'float':
+            self.values.append(float(value))
+        elif self.kind in ('int', 'bool'):
+            self.values.append(int(value))
+        else:
+            self.values.append(value)
+
+    def _buffered(self, index):
+        value = self.values[index]
+        if self.kind == 'str':
+            return self.strings[value]
+        if self.kind == 'bool':
+            return bool(value)
+        return value
+
+    def spill(self):
+        """
+        Append the buffered values to the column files and empty the buffer
+        """
+        if self.typecode is not None:
+            with open(f'{self.path}.bin', 'ab') as f:
+                self.values.tofile(f)
+        else:
+            offsets = array('q')
+            with open(f'{self.path}.jsonl', 'ab') as f:
+                for index in range(len(self.values)):
+                    offsets.append(f.tell())
+                    f.write(json.dumps(self._buffered(index), ensure_ascii=False).encode('utf-8') + b'\n')
+            with open(f'{self.path}.idx', 'ab') as f:
+                offsets.tofile(f)
+        self.spilled += len(self.values)
+        self._reset()
+
+    def _read_item(self, file_path: str, typecode: str, index: int):
+        item = array(typecode)
+        with open(file_path, 'rb') as f:
+            f.seek(index * item.itemsize)
+            item.frombytes(f.read(item.itemsize))
+        return item[0]
+
+    def __getitem__(self, index: int):
+        if index >= self.spilled:
+            return self._buffered(index - self.spilled)
+        if self.typecode is not None:
+            value = self._read_item(f'{self.path}.bin', self.typecode, index)
+            return bool(value) if self.kind == 'bool' else value
+        offset = self._read_item(f'{self.path}.idx', 'q', index)
+        with open(f'{self.path}.jsonl', 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def all(self):
+        if self.typecode is None:
+            return [self[index] for index in range(len(self))]
+        if not self.spilled:
+            return self.values
+        values = array(self.typecode)
+        with open(f'{self.path}.bin', 'rb') as f:
+            values.frombytes(f.read())
+        values.extend(self.values)
+        return values
+
+
+class ColumnarArchive(object):
+    """
+    Append-only store of flat-schema records, one typed column per field.
+
+    Records are flattened with dotted keys on the way in and rebuilt as
+    fresh nested dicts on the way out. All records must share the keys of
+    the first one.
+
+    At most ``spill_records`` records are buffered in memory, older ones are
+    moved to one file per column, so memory stays flat however long the
+    run. Reading a spilled record costs a few small file reads.
+
+    Args:
+        spill_records: Records kept in memory, None to never spill
+        directory: Folder of the column files, defaults to a temporary
+            directory removed with the archive
+    """
+
+    def __init__(self, spill_records: Optional[int] = SPILL_RECORDS, directory: str = None):
+        if spill_records is not None and spill_records < 1:
+            raise ValueError("spill_records must be at least 1")
+        self.spill_records = spill_records
+        self.directory = directory
+        self._tmp = None
+        self._columns: dict[str, _Column] = {}
+        self._length = 0
+        self._buffered = 0
+
+    def __len__(self):
+        return self._length
+
+    def _column_dir(self) -> str:
+        if self.directory is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix='biosim-archive-')
+            self.directory = self._tmp.name
+        os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def append(self, record: dict):
+        flat = flatten_dict(record)
+        if not self._columns:
+            directory = self._column_dir() if self.spill_records is not None else None
+            self._columns = {
+                key: _Column(value, os.path.join(directory, str(i)) if directory else None)
+                for i, (key, value) in enumerate(flat.items())
+            }
+        elif flat.keys() != self._columns.keys():
+            raise ValueError(f"Record keys {sorted(flat)} do not match the archive schema")
+
+        for key, value in flat.items():
+            self._columns[key].append(value)
+        self._length += 1
+        self._buffered += 1
+        if self.spill_records is not None and self._buffered >= self.spill_records:
+            for column in self._columns.values():
+                column.spill()
+            self._buffered = 0
+
+    def __getitem__(self, index: int) -> dict:
+        if not -self._length <= index < self._length:
+            raise IndexError("archive index out of range")
+        if index < 0:
+            index += self._length
+        return unflatten_dict({key: column[index] for key, column in self._columns.items()})
+
+    def column(self, key: str):
+        """
+        Raw values of one flattened field. Numeric columns are ``array``
+        objects, wrap them with ``numpy.frombuffer`` for zero-copy access.
+        """
+        return self._columns[key].all()
+
+
+class HistoryView(Sequence):
+    """
+    Read-only window over a HistoryStore, resolved lazily by absolute index
+    so it stays valid after later appends.
+    """
+
+    def __init__(self, store: 'HistoryStore', start: int, stop: int):
+        self._store = store
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history view index out of range")
+        return self._store.get(self._start + index)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class HistoryStore(object):
+    """
+    Agent history with a fixed-size recent window.
+
+    The last ``window`` records live in a ring buffer and are served as-is;
+    older records go to a ColumnarArchive, which moves them to disk in
+    chunks (or are dropped with ``archive=False``), so memory stays flat
+    over long runs. Indexing and iteration cover the full history, like the
+    plain lists agents used before.
+
+    Args:
+        window: Number of recent records kept as dicts.
+        archive: Keep evicted records in a columnar archive.
+    """
+
+    def __init__(self, window: int = 10, archive: bool = True):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.archive = ColumnarArchive() if archive else None
+        self._ring = [None] * window
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record: dict):
+        slot = self._count % self.window
+        if self._count >= self.window and self.archive is not None:
+            self.archive.append(self._ring[slot])
+        self._ring[slot] = record
+        self._count += 1
+
+    def get(self, index: int) -> dict:
+        """
+        Record by absolute position, 0 being the first record ever appended
+        """
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+        if index >= self._count - self.window:
+            return self._ring[index % self.window]
+        if self.archive is None:
+            raise IndexError("history record was evicted and archiving is off")
+        return self.archive[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.get(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        return self.get(index)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self.get(index)
+
+    def recent(self, n: int = None) -> HistoryView:
+        """
+        The last ``n`` records (at most ``window``) without copying them
+        """
+        n = self.window if n is None else min(n, self.window)
+        start = max(0, self._count - n)
+        return HistoryView(self, start, self._count)
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,370 @@
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from simulator.prompts import estimate_tokens
+from simulator.utils import percentile
+
+# upper bounds of the latency histograms, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STEP_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+SUMMARY_PERCENTILES = (50, 95, 99)
+
+
+class CallRecord(object):
+    """
+    Measurements of one structured LLM call.
+
+    The record is the active one for the duration of the call (see
+    ``current_call``), so every provider layer can annotate it: the cache
+    sets ``cache``, the concurrency limiter adds ``queue_wait``, the OpenAI
+    provider fills the token counts from the API usage.
+    """
+
+    def __init__(self, agent: str, model: str, schema: str, replica: int = None):
+        self.agent = agent
+        self.model = model
+        self.schema = schema
+        self.replica = replica
+        self.started = time.time()
+        self.latency = 0.0
+        self.queue_wait = 0.0
+        self.retries = 0
+        # 'hit', 'miss' or 'none' when no cache is in the stack
+        self.cache = 'none'
+        self.input_tokens = None
+        self.output_tokens = None
+        self.usage_source = 'estimate'
+        self.error = None
+
+    def set_usage(self, input_tokens: int, output_tokens: int):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.usage_source = 'api'
+
+    def set_output(self, output):
+        if self.output_tokens is None:
+            self.output_tokens = estimate_tokens(output.model_dump_json())
+
+    def to_dict(self) -> dict:
+        return {
+            'agent': self.agent,
+            'model': self.model,
+            'schema': self.schema,
+            'replica': self.replica,
+            'started': self.started,
+            'latency': self.latency,
+            'queue_wait': self.queue_wait,
+            'retries': self.retries,
+            'cache': self.cache,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'usage_source': self.usage_source,
+            'error': self.error,
+        }
+
+
+class StepRecord(object):
+    """
+    Measurements of one simulation step, with totals of the calls made in it
+    """
+
+    def __init__(self, step: int, mode: str, replica: int = None):
+        self.step = step
+        self.mode = mode
+        self.replica = replica
+        self.started = time.time()
+        self.wall_time = 0.0
+        self.calls = 0
+        self.queue_wait = 0.0
+        self.retries = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def add_call(self, record: CallRecord):
+        self.calls += 1
+        self.queue_wait += record.queue_wait
+        self.retries += record.retries
+        self.cache_hits += record.cache == 'hit'
+        self.input_tokens += record.input_tokens or 0
+        self.output_tokens += record.output_tokens or 0
+
+    def to_dict(self) -> dict:
+        return {
+            'step': self.step,
+            'mode': self.mode,
+            'replica': self.replica,
+            'started': self.started,
+            'wall_time': self.wall_time,
+            'calls': self.calls,
+            'queue_wait': self.queue_wait,
+            'retries': self.retries,
+            'cache_hits': self.cache_hits,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+        }
+
+
+class _Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def _summary(values: list[float]) -> dict:
+    values = sorted(values)
+    summary = {'count': len(values), 'mean': sum(values) / len(values) if values else 0.0}
+    for q in SUMMARY_PERCENTILES:
+        summary[f'p{q}'] = percentile(values, q) if values else 0.0
+    return summary
+
+
+class MetricsRegistry(object):
+    """
+    In-process store of call and step metrics.
+
+    Counters and histograms cover everything since the last ``reset``; the
+    most recent ``max_records`` raw call and step records are kept for
+    percentiles and inspection.
+
+    Args:
+        max_records: Number of raw call and step records kept.
+    """
+
+    def __init__(self, max_records: int = 10000):
+        self.max_records = max_records
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = deque(maxlen=self.max_records)
+            self.steps = deque(maxlen=self.max_records)
+            self._call_counts = {}
+            self._call_latency = {}
+            self._queue_wait = {}
+            self._tokens = {}
+            self._retries = {}
+            self._step_duration = {}
+
+    def record_call(self, record: CallRecord):
+        series = (record.agent, record.model)
+        status = 'ok' if record.error is None else 'error'
+        with self._lock:
+            self.calls.append(record)
+            key = series + (record.cache, status)
+            self._call_counts[key] = self._call_counts.get(key, 0) + 1
+            self._call_latency.setdefault(series, _Histogram(LATENCY_BUCKETS)).observe(record.latency)
+            self._queue_wait[series] = self._queue_wait.get(series, 0.0) + record.queue_wait
+            self._retries[series] = self._retries.get(series, 0) + record.retries
+            for direction, tokens in (('input', record.input_tokens), ('output', record.output_tokens)):
+                key = series + (direction,)
+                self._tokens[key] = self._tokens.get(key, 0) + (tokens or 0)
+
+    def record_step(self, record: StepRecord):
+        with self._lock:
+            self.steps.append(record)
+            self._step_duration.setdefault(record.mode, _Histogram(STEP_BUCKETS)).observe(record.wall_time)
+
+    def snapshot(self) -> dict:
+        """
+        Summary per agent and model, and per simulation mode, as plain data
+        """
+        with self._lock:
+            calls = list(self.calls)
+            steps = list(self.steps)
+
+        agents = {}
+        for record in calls:
+            agents.setdefault(f'{record.agent}/{record.model}', []).append(record)
+
+        summary = {'calls': {}, 'steps': {}}
+        for name, records in sorted(agents.items()):
+            summary['calls'][name] = {
+                'latency': _summary([record.latency for record in records]),
+                'queue_wait': _summary([record.queue_wait for record in records]),
+                'errors': sum(record.error is not None for record in records),
+                'retries': sum(record.retries for record in records),
+                'cache_hits': sum(record.cache == 'hit' for record in records),
+                'cache_misses': sum(record.cache == 'miss' for record in records),
+                'input_tokens': sum(record.input_tokens or 0 for record in records),
+                'output_tokens': sum(record.output_tokens or 0 for record in records),
+            }
+
+        modes = {}
+        for record in steps:
+            modes.setdefault(record.mode, []).append(record)
+        for mode, records in sorted(modes.items()):
+            summary['steps'][mode] = {
+                'wall_time': _summary([record.wall_time for record in records]),
+                'queue_wait': _summary([record.queue_wait for record in records]),
+                'calls': sum(record.calls for record in records),
+            }
+        return summary
+
+    def to_json(self, include_records: bool = False, indent: int = 2) -> str:
+        data = self.snapshot()
+        if include_records:
+            with self._lock:
+                data['call_records'] = [record.to_dict() for record in self.calls]
+                data['step_records'] = [record.to_dict() for record in self.steps]
+        return json.dumps(data, indent=indent)
+
+    def to_prometheus(self) -> str:
+        """
+        Counters and histograms in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            lines.append('# HELP biosim_llm_calls_total Structured LLM calls.')
+            lines.append('# TYPE biosim_llm_calls_total counter')
+            for (agent, model, cache, status), count in sorted(self._call_counts.items()):
+                labels = _labels(agent=agent, model=model, cache=cache, status=status)
+                lines.append(f'biosim_llm_calls_total{{{labels}}} {count}')
+
+            lines.append('# HELP biosim_llm_call_latency_seconds Latency of structured LLM calls.')
+            lines.append('# TYPE biosim_llm_call_latency_seconds histogram')
+            for (agent, model), histogram in sorted(self._call_latency.items()):
+                lines.extend(_histogram_lines(
+                    'biosim_llm_call_latency_seconds', histogram, agent=agent, model=model
+                ))
+
+            lines.append('# HELP biosim_llm_queue_wait_seconds_total Time calls waited for a concurrency slot.')
+            lines.append('# TYPE biosim_llm_queue_wait_seconds_total counter')
+            for (agent, model), value in sorted(self._queue_wait.items()):
+                lines.append(f'biosim_llm_queue_wait_seconds_total{{{_labels(agent=agent, model=model)}}} {value}')
+
+            lines.append('# HELP biosim_llm_tokens_total Tokens sent and received.')
+            lines.append('# TYPE biosim_llm_tokens_total counter')
+            for (agent, model, direction), value in sorted(self._tokens.items()):
+                labels = _labels(agent=agent, model=model, direction=direction)
+                lines.append(f'biosim_llm_tokens_total{{{labels}}} {value}')
+
+            lines.append('# HELP biosim_llm_retries_total Retried LLM requests.')
+            lines.append('# TYPE biosim_llm_retries_total counter')
+            for (agent, model), value in sorted(self._retries.items()):
+                lines.append(f'biosim_llm_retries_total{{{_labels(agent=agent, model=model)}}} {value}')
+
+            lines.append('# HELP biosim_step_duration_seconds Wall time of simulation steps.')
+            lines.append('# TYPE biosim_step_duration_seconds histogram')
+            for mode, histogram in sorted(self._step_duration.items()):
+                lines.extend(_histogram_lines('biosim_step_duration_seconds', histogram, mode=mode))
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name: str, histogram: _Histogram, **labels) -> list[str]:
+    lines = []
+    for bound, total in histogram.cumulative():
+        lines.append(f'{name}_bucket{{{_labels(**labels, le=bound)}}} {total}')
+    lines.append(f'{name}_bucket{{{_labels(**labels, le="+Inf")}}} {histogram.count}')
+    lines.append(f'{name}_sum{{{_labels(**labels)}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{_labels(**labels)}}} {histogram.count}')
+    return lines
+
+
+_registry = MetricsRegistry()
+
+_current_call: ContextVar[CallRecord] = ContextVar('biosim_current_call', default=None)
+_current_step: ContextVar[StepRecord] = ContextVar('biosim_current_step', default=None)
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    The process-wide metrics registry
+    """
+    return _registry
+
+
+def current_call() -> CallRecord:
+    """
+    Record of the call in progress in this context, None outside of one
+    """
+    return _current_call.get()
+
+
+@contextmanager
+def track_call(agent: str, model: str, response_format, messages: list[dict], registry: MetricsRegistry = None):
+    """
+    Measure one structured call and make its record the current one.
+
+    Token counts not reported by the provider are estimated from the
+    messages and, via ``record.set_output``, the parsed output.
+
+    Args:
+        agent: Label of the caller, e.g. the agent type
+        model: Model name
+        response_format: Pydantic model of the response
+        messages: Messages sent
+        registry: Registry to record into, defaults to the process-wide one
+    """
+    # imported here, the provider layers import this module
+    from simulator.providers.base import current_replica
+
+    record = CallRecord(agent, model, response_format.__name__, current_replica.get())
+    token = _current_call.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        record.latency = time.perf_counter() - start
+        _current_call.reset(token)
+        if record.input_tokens is None:
+            record.input_tokens = estimate_tokens(
+                '\n'.join(str(message.get('content', '')) for message in messages)
+            )
+        (registry or _registry).record_call(record)
+        step = _current_step.get()
+        if step is not None:
+            step.add_call(record)
+
+
+@contextmanager
+def track_step(step: int, mode: str, registry: MetricsRegistry = None):
+    """
+    Measure one simulation step, including the calls made inside it.
+
+    Must not span a ``yield`` of an async generator, since the consumer may
+    resume it from another context.
+    """
+    from simulator.providers.base import current_replica
+
+    record = StepRecord(step, mode, current_replica.get())
+    token = _current_step.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.wall_time = time.perf_counter() - start
+        _current_step.reset(token)
+        (registry or _registry).record_step(record)
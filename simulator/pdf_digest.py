@@ -1,24 +1,26 @@
+import os
+import json
+import asyncio
+import hashlib
 from typing import Optional
-from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 from simulator.types import CaseModel
+from simulator.cache import ResponseCache, get_cache_dir, get_response_cache
+from simulator.providers import BaseProvider, backend_name, get_provider
+from simulator.metrics import track_call
+from simulator.prompts import PromptTemplate, estimate_tokens
+from simulator.retrieval import select_relevant_text
 from pypdf import PdfReader
 
-class PDFValidationResult(BaseModel):
-    is_valid: bool = Field(
-        description="Whether the PDF is a valid biology invasion paper"
-    )
-    reason: str = Field(
-        description="Reason why the PDF is valid or invalid"
-    )
+PDF_MODEL = "gpt-4o-mini"
 
-async def validate_pdf_content(pdf_text: str) -> PDFValidationResult:
-    """
-    First step: Validate if the PDF is a biology invasion paper
-    """
-    client = AsyncOpenAI()
-    
-    prompt = f"""
+# bump when the chunking or scoring changes, so cached ranked texts are redone
+RANKING_VERSION = 1
+
+# ranked extraction reads this many times the budget before ranking, which bounds its parsing cost
+RANKED_SCAN_FACTOR = 8
+
+VALIDATION_PROMPT = PromptTemplate("""
     Analyze the following text from a PDF and determine if it's a scientific paper about biological invasion.
     Focus on identifying:
     1. If it discusses invasive species and their impact on native species
@@ -26,33 +28,16 @@ async def validate_pdf_content(pdf_text: str) -> PDFValidationResult:
     3. If it's from a scientific/academic source
 
     Text:
-    {pdf_text}...
+    {{pdf_text}}...
 
     Provide your analysis in a structured format.
-    """
-
-    response = await client.beta.chat.completions.parse(
-        model="gpt-4o-mini",
-        response_format=PDFValidationResult,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
-    )
-    
-    result = PDFValidationResult.model_validate_json(response.choices[0].message.content)
-    return result
+    """)
 
-async def extract_case_data(pdf_text: str) -> CaseModel:
-    """
-    Second step: Extract relevant fields to create a case model
-    """
-    client = AsyncOpenAI()
-    
-    prompt = f"""
+EXTRACTION_PROMPT = PromptTemplate("""
     Extract information from the following biology invasion paper to create a structured case.
 
     Text:
-    {pdf_text}...
+    {{pdf_text}}...
 
     Format the response to match these fields exactly:
     - scenario
@@ -67,52 +52,397 @@ async def extract_case_data(pdf_text: str) -> CaseModel:
     - experiment_condition
     - evaluation_criteria
     - weather_changing_description
+    """)
+
+COMBINED_PROMPT = PromptTemplate("""
+    Analyze the following text from a PDF. First determine if it's a scientific paper about biological invasion,
+    focusing on:
+    1. If it discusses invasive species and their impact on native species
+    2. If it contains scientific observations or experimental data
+    3. If it's from a scientific/academic source
+
+    If it is, also extract the information needed to create a structured case, matching these fields exactly:
+    - scenario
+    - invasive_specie_name
+    - invasive_specie_initial_number
+    - invasive_specie_initial_density
+    - native_specie_name
+    - native_specie_initial_number
+    - native_specie_initial_density
+    - summary
+    - mitigation_measures
+    - experiment_condition
+    - evaluation_criteria
+    - weather_changing_description
+    If it is not, leave the case empty.
+
+    Text:
+    {{pdf_text}}...
+    """)
+
+# how the validation and extraction calls of a paper are issued
+DIGEST_MODES = ('sequential', 'speculative', 'combined')
+
+class PDFValidationResult(BaseModel):
+    is_valid: bool = Field(
+        description="Whether the PDF is a valid biology invasion paper"
+    )
+    reason: str = Field(
+        description="Reason why the PDF is valid or invalid"
+    )
+
+class PDFDigestModel(BaseModel):
+    validation: PDFValidationResult = Field(
+        description="Whether the PDF is a valid biology invasion paper, and why"
+    )
+    case: Optional[CaseModel] = Field(
+        description="Case extracted from the paper, null if it is not a valid biology invasion paper"
+    )
+
+def extract_pdf_text(
+        file_path: str,
+        max_characters: Optional[int] = 5000,
+        max_tokens: Optional[int] = None,
+        ranked: bool = False
+        ) -> str:
+    """
+    Text of a PDF within a character and/or token budget.
+
+    Pages are parsed one at a time until the budget is met. With ``ranked``
+    parsing goes on for ``RANKED_SCAN_FACTOR`` times the budget and the most
+    relevant chunks fill it (see ``retrieval.select_relevant_text``).
+    Blocking, run it off the event loop.
+
+    Args:
+        file_path: PDF file
+        max_characters: Character budget, None for no limit
+        max_tokens: Token budget (see ``estimate_tokens``), None for no limit
+        ranked: Select chunks by relevance instead of taking the first pages
     """
+    reader = PdfReader(file_path)
+    if ranked:
+        budgets = [budget for budget in (max_characters, max_tokens and max_tokens * 4) if budget is not None]
+        scan_limit = RANKED_SCAN_FACTOR * min(budgets) if budgets else None
+        pages, scanned = [], 0
+        for page in reader.pages:
+            text = page.extract_text() or ''
+            if text.strip():
+                pages.append(text)
+                scanned += len(text)
+            if scan_limit is not None and scanned >= scan_limit:
+                break
+        return select_relevant_text('\n'.join(pages), max_characters, max_tokens)
+
+    pieces = []
+    characters = tokens = 0
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        if not text.strip():
+            continue
+        separator = 1 if pieces else 0
+        if max_characters is not None:
+            text = text[:max(max_characters - characters - separator, 0)]
+        if max_tokens is not None:
+            page_tokens = estimate_tokens(text)
+            if tokens + page_tokens > max_tokens:
+                # keep the share of the page that fits
+                text = text[:len(text) * (max_tokens - tokens) // page_tokens]
+                page_tokens = max_tokens - tokens
+            tokens += page_tokens
+        if text:
+            pieces.append(text)
+            characters += len(text) + separator
+        if (max_characters is not None and characters >= max_characters) or \
+                (max_tokens is not None and tokens >= max_tokens):
+            break
+    return '\n'.join(pieces)
 
-    response = await client.beta.chat.completions.parse(
-        model="gpt-4o-mini",
-        response_format=CaseModel,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_pdf_ranking() -> bool:
+    """
+    Whether the pipeline ranks chunks by relevance, off unless BIOSIM_PDF_RANKING is 1.
+    Ranking parses more of the document, see ``extract_pdf_text``.
+    """
+    return os.getenv('BIOSIM_PDF_RANKING', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def get_digest_mode() -> str:
+    """
+    Default digest mode, from BIOSIM_PDF_MODE (see ``digest_pdf_text``).
+    Sequential unless set, the faster modes cost more on rejected papers.
+    """
+    mode = os.getenv('BIOSIM_PDF_MODE', 'sequential').lower()
+    if mode not in DIGEST_MODES:
+        raise ValueError(f"BIOSIM_PDF_MODE must be one of {', '.join(DIGEST_MODES)}, got {mode!r}")
+    return mode
+
+
+def pdf_digest_keys(
+        content_hash: str,
+        provider: BaseProvider,
+        max_characters: Optional[int],
+        max_tokens: Optional[int],
+        mode: str = 'sequential',
+        ranked: bool = False
+        ) -> tuple[str, str]:
+    """
+    Cache keys of the extracted text and of the digest of a PDF.
+
+    The text only depends on the file, the budget and the chunk selection
+    (ranked text also on the ranking version); the digest also on
+    the model, backend, prompts and schemas, so changing any of them misses.
+    Sequential and speculative digests issue the same two calls and share
+    their entries, combined digests have their own.
+    """
+    text_payload = [content_hash, max_characters, max_tokens]
+    if ranked:
+        text_payload += ['ranked', RANKING_VERSION, RANKED_SCAN_FACTOR]
+    digest_payload = text_payload + [
+        PDF_MODEL,
+        backend_name(provider),
+        VALIDATION_PROMPT.text,
+        EXTRACTION_PROMPT.text,
+        PDFValidationResult.model_json_schema(),
+        CaseModel.model_json_schema(),
+    ]
+    if mode == 'combined':
+        digest_payload += [COMBINED_PROMPT.text, PDFDigestModel.model_json_schema()]
+    return tuple(
+        hashlib.sha256(json.dumps(['pdf', kind, payload], sort_keys=True).encode('utf-8')).hexdigest()
+        for kind, payload in (('text', text_payload), ('digest', digest_payload))
     )
+
+
+def get_pdf_cache() -> Optional[ResponseCache]:
+    """
+    Persistent cache of PDF digests, on unless BIOSIM_PDF_CACHE is 0
+    """
+    if os.getenv('BIOSIM_PDF_CACHE', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+    return get_response_cache(os.path.join(get_cache_dir(), 'pdf_digests.sqlite'))
+
+async def validate_pdf_content(
+        pdf_text: str,
+        provider: BaseProvider = None
+        ) -> PDFValidationResult:
+    """
+    First step: Validate if the PDF is a biology invasion paper
+    """
+    provider = provider or get_provider()
+    
+    prompt = VALIDATION_PROMPT.render(pdf_text=pdf_text)
+
+    messages = [
+        {"role": "user", "content": prompt}
+    ]
+    with track_call('pdf_digest', PDF_MODEL, PDFValidationResult, messages) as record:
+        result = await provider.aparse(
+            model=PDF_MODEL,
+            response_format=PDFValidationResult,
+            messages=messages
+        )
+        record.set_output(result)
+    
+    return result
+
+async def extract_case_data(
+        pdf_text: str,
+        provider: BaseProvider = None
+        ) -> CaseModel:
+    """
+    Second step: Extract relevant fields to create a case model
+    """
+    provider = provider or get_provider()
+    
+    prompt = EXTRACTION_PROMPT.render(pdf_text=pdf_text)
+
+    messages = [
+        {"role": "user", "content": prompt}
+    ]
+    with track_call('pdf_digest', PDF_MODEL, CaseModel, messages) as record:
+        case_data = await provider.aparse(
+            model=PDF_MODEL,
+            response_format=CaseModel,
+            messages=messages
+        )
+        record.set_output(case_data)
     
-    case_data = CaseModel.model_validate_json(response.choices[0].message.content)
     return case_data
 
+async def digest_pdf_combined(
+        pdf_text: str,
+        provider: BaseProvider = None
+        ) -> PDFDigestModel:
+    """
+    Both steps in one call: validation and, for a valid paper, the case
+    """
+    provider = provider or get_provider()
+
+    prompt = COMBINED_PROMPT.render(pdf_text=pdf_text)
+
+    messages = [
+        {"role": "user", "content": prompt}
+    ]
+    with track_call('pdf_digest', PDF_MODEL, PDFDigestModel, messages) as record:
+        digest = await provider.aparse(
+            model=PDF_MODEL,
+            response_format=PDFDigestModel,
+            messages=messages
+        )
+        record.set_output(digest)
+
+    return digest
+
+def load_digest(cache: ResponseCache, digest_key: str) -> Optional[tuple[PDFValidationResult, Optional[CaseModel]]]:
+    """
+    Cached validation result and case of a PDF, None on a miss
+    """
+    cached = cache.get(digest_key)
+    if cached is None:
+        return None
+    digest = json.loads(cached)
+    case_data = CaseModel.model_validate(digest['case']) if digest['case'] is not None else None
+    return PDFValidationResult.model_validate(digest['validation']), case_data
+
+
+def save_digest(
+        cache: ResponseCache,
+        digest_key: str,
+        validation_result: PDFValidationResult,
+        case_data: Optional[CaseModel]
+        ):
+    cache.set(digest_key, json.dumps({
+        'validation': validation_result.model_dump(),
+        'case': case_data.model_dump() if case_data is not None else None,
+    }))
+
+
+async def digest_pdf_text(
+        pdf_text: str,
+        provider: BaseProvider = None,
+        mode: str = None
+        ) -> tuple[PDFValidationResult, Optional[CaseModel]]:
+    """
+    Both LLM steps on extracted text, the case is None for an invalid paper.
+
+    Args:
+        pdf_text: Extracted text of the paper
+        provider: LLM provider, defaults to ``get_provider()``
+        mode: "sequential" extracts only after a positive validation, two
+            round trips. "speculative" starts the extraction together with
+            the validation and drops it for an invalid paper, one round trip
+            at the price of a wasted extraction on rejected papers.
+            "combined" asks for both in a single structured response.
+            Defaults to ``get_digest_mode()``
+    """
+    provider = provider or get_provider()
+    mode = mode or get_digest_mode()
+    if mode not in DIGEST_MODES:
+        raise ValueError(f"Unknown digest mode {mode!r}, expected one of {', '.join(DIGEST_MODES)}")
+
+    if mode == 'combined':
+        digest = await digest_pdf_combined(pdf_text, provider=provider)
+        if not digest.validation.is_valid:
+            return digest.validation, None
+        if digest.case is not None:
+            return digest.validation, digest.case
+        # valid but the model left the case out, fall back to the extraction call
+        return digest.validation, await extract_case_data(pdf_text, provider=provider)
+
+    if mode == 'speculative':
+        extraction = asyncio.create_task(extract_case_data(pdf_text, provider=provider))
+        try:
+            validation_result = await validate_pdf_content(pdf_text, provider=provider)
+        except BaseException:
+            extraction.cancel()
+            raise
+        if not validation_result.is_valid:
+            extraction.cancel()
+            # settle the task, so a failed extraction is not reported as never retrieved
+            await asyncio.gather(extraction, return_exceptions=True)
+            return validation_result, None
+        return validation_result, await extraction
+
+    # Step 1: Validate the PDF
+    validation_result = await validate_pdf_content(pdf_text, provider=provider)
+    if not validation_result.is_valid:
+        return validation_result, None
+
+    # Step 2: Extract case data
+    return validation_result, await extract_case_data(pdf_text, provider=provider)
+
+
+def digest_outcome(
+        validation_result: PDFValidationResult,
+        case_data: Optional[CaseModel]
+        ) -> tuple[bool, str, Optional[CaseModel]]:
+    if not validation_result.is_valid:
+        return False, validation_result.reason, None
+    return True, "Successfully processed PDF", case_data
+
+
 async def process_pdf_file(
         file_path: str,
-        max_characters: int = 5000
+        max_characters: int = 5000,
+        provider: BaseProvider = None,
+        max_tokens: int = None,
+        cache: Optional[ResponseCache] = None,
+        mode: str = None,
+        ranked: bool = None
         ) -> tuple[bool, str, Optional[CaseModel]]:
     """
     Main pipeline function to process PDF files
 
     We keep the text length to 5000 characters to avoid the cost of the API call.
+    Both LLM steps see the same budgeted text, parsed in a worker thread so
+    the event loop keeps serving. ``ranked`` (default ``get_pdf_ranking()``,
+    off) fills the budget with the chunks most relevant to the case fields
+    rather than the first pages, at a higher parsing cost.
+
+    Results are cached by the hash of the file content, so uploading the
+    same paper again skips extraction and both LLM calls. ``cache`` defaults
+    to ``get_pdf_cache()``, pass False to bypass it.
+
+    ``mode`` picks how the two LLM steps are issued, see ``digest_pdf_text``.
     """
+    provider = provider or get_provider()
+    mode = mode or get_digest_mode()
+    ranked = get_pdf_ranking() if ranked is None else ranked
+    if cache is None:
+        cache = get_pdf_cache()
     try:
+        text_key = digest_key = None
+        if cache:
+            content_hash = await asyncio.to_thread(file_sha256, file_path)
+            text_key, digest_key = pdf_digest_keys(
+                content_hash, provider, max_characters, max_tokens, mode, ranked
+            )
+            digest = await asyncio.to_thread(load_digest, cache, digest_key)
+            if digest is not None:
+                return digest_outcome(*digest)
+
         # Extract text from PDF
-        reader = PdfReader(file_path)
-        pdf_text = ""
-        for page in reader.pages:
-            pdf_text += page.extract_text()
+        pdf_text = await asyncio.to_thread(cache.get, text_key) if cache else None
+        if pdf_text is None:
+            pdf_text = await asyncio.to_thread(extract_pdf_text, file_path, max_characters, max_tokens, ranked)
+            if cache:
+                await asyncio.to_thread(cache.set, text_key, pdf_text)
             
         if not pdf_text.strip():
             return False, "Could not extract text from PDF", None
         
-        # Step 1: Validate the PDF
-        validation_result = await validate_pdf_content(pdf_text)
-        
-        if not validation_result.is_valid:
-            return False, validation_result.reason, None
-        
-        
-        # keep the text length to 5000 characters to avoid the exceed of context length.
-        pdf_text = pdf_text[:max_characters]
-        
-        # Step 2: Extract case data
-        case_data = await extract_case_data(pdf_text)
-        
-        return True, "Successfully processed PDF", case_data
+        validation_result, case_data = await digest_pdf_text(pdf_text, provider=provider, mode=mode)
+        if cache:
+            await asyncio.to_thread(save_digest, cache, digest_key, validation_result, case_data)
+
+        return digest_outcome(validation_result, case_data)
         
     except Exception as e:
-        return False, f"Error processing PDF: {str(e)}", None 
\ No newline at end of file
+        return False, f"Error processing PDF: {str(e)}", None
@@ -0,0 +1,162 @@
+import re
+import json
+import math
+import textwrap
+import importlib.util
+from collections.abc import Sequence
+from typing import Callable
+
+from pydantic import BaseModel
+
+from simulator.utils import flatten_dict
+
+# default upper bound of estimated input tokens per agent call
+DEFAULT_PROMPT_TOKEN_BUDGET = 1500
+
+DELTA_TABLE_LEGEND = "first row absolute, later rows are changes to the previous row, '=' unchanged"
+
+_PLACEHOLDER = re.compile(r'\{\{(\w+)\}\}')
+_WORD_PIECE = re.compile(r'\w+|[^\w\s]')
+
+
+class PromptTemplate(object):
+    """
+    Template with ``{{name}}`` placeholders, compiled once.
+
+    The text is dedented and stripped at construction and split into
+    literal parts and field names, so rendering is a single join instead of
+    a chain of ``str.replace`` calls.
+    """
+
+    def __init__(self, text: str):
+        self.text = textwrap.dedent(text).strip()
+        parts = _PLACEHOLDER.split(self.text)
+        self._literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def render(self, **values) -> str:
+        missing = set(self.fields) - values.keys()
+        if missing:
+            raise KeyError(f"Missing prompt fields: {sorted(missing)}")
+
+        pieces = [self._literals[0]]
+        for field, literal in zip(self.fields, self._literals[1:]):
+            pieces.append(str(values[field]))
+            pieces.append(literal)
+        return ''.join(pieces)
+
+
+def _to_jsonable(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Sequence) and not isinstance(obj, (str, bytes)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def compact_json(obj) -> str:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=_to_jsonable)
+
+
+def _format_number(value) -> str:
+    if isinstance(value, float):
+        return f'{value:.4g}'
+    return str(value)
+
+
+def _format_delta(value, previous) -> str:
+    if value == previous:
+        return '='
+    if isinstance(value, (int, float)) and not isinstance(value, bool) \
+            and isinstance(previous, (int, float)) and not isinstance(previous, bool):
+        delta = value - previous
+        return ('+' if delta > 0 else '') + _format_number(delta)
+    return str(value)
+
+
+def delta_table(records: Sequence, start: int = 0, index_name: str = 'month') -> str:
+    """
+    Encode a history of same-shaped (possibly nested) records as a table.
+
+    The header lists the flattened field names once, the first row holds
+    absolute values and every later row only the change to the row before
+    it, which keeps slowly moving histories short.
+
+    Args:
+        records: Records oldest first
+        start: Index of the first record, written in the first column
+        index_name: Name of the first column
+    """
+    if not records:
+        return '(none)'
+
+    rows = [flatten_dict(record) for record in records]
+    columns = list(rows[0])
+    lines = ['|'.join([index_name] + columns)]
+    previous = None
+    for offset, row in enumerate(rows):
+        if previous is None:
+            cells = [_format_number(row.get(column)) for column in columns]
+        else:
+            cells = [_format_delta(row.get(column), previous.get(column)) for column in columns]
+        lines.append('|'.join([str(start + offset)] + cells))
+        previous = row
+    return '\n'.join(lines)
+
+
+def _load_tokenizer():
+    if importlib.util.find_spec('tiktoken') is None:
+        return None
+    import tiktoken
+    try:
+        return tiktoken.get_encoding('o200k_base')
+    except Exception:
+        return None
+
+
+_tokenizer = None
+_tokenizer_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count of a prompt. Exact when ``tiktoken`` is installed, otherwise
+    a cheap estimate from word pieces and length.
+    """
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        _tokenizer = _load_tokenizer()
+        _tokenizer_loaded = True
+    if _tokenizer is not None:
+        return len(_tokenizer.encode(text))
+    return max(math.ceil(len(text) / 4), len(_WORD_PIECE.findall(text)))
+
+
+def fit_to_budget(
+        render: Callable[[dict[str, list]], str],
+        histories: dict[str, list],
+        budget: int = None,
+        min_records: int = 1,
+) -> str:
+    """
+    Render a prompt, trimming the oldest history records until it fits.
+
+    Records are dropped one at a time from whichever history is currently
+    longest, down to ``min_records`` per history. If the prompt still does
+    not fit, the shortest version is returned.
+
+    Args:
+        render: Builds the prompt from the (trimmed) histories
+        histories: History records per name, oldest first
+        budget: Maximum estimated input tokens, None for no limit
+        min_records: Records always kept per history
+    """
+    histories = {name: list(records) for name, records in histories.items()}
+    prompt = render(histories)
+    while budget is not None and estimate_tokens(prompt) > budget:
+        name = max(histories, key=lambda key: len(histories[key]), default=None)
+        if name is None or len(histories[name]) <= min_records:
+            break
+        histories[name] = histories[name][1:]
+        prompt = render(histories)
+    return prompt
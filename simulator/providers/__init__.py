@@ -0,0 +1,9 @@
+from .base import BaseProvider, backend_name
+from .errors import ProviderError, TransientProviderError, RateLimitedError
+from .clients import ClientRegistry, get_client_registry, configure_client_registry, close_client_registry
+from .openai_provider import OpenAIProvider
+from .fake_provider import FakeProvider
+from .cached_provider import CachedProvider
+from .limited_provider import ConcurrencyLimitedProvider
+from .scheduler import ScheduledProvider, RequestScheduler, AdaptiveConcurrency, TokenBucket, SlotLimiter
+from .factory import get_provider, get_scheduler
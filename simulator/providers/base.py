@@ -0,0 +1,51 @@
+import asyncio
+import contextvars
+from typing import TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar('T', bound=BaseModel)
+
+# index of the ensemble replica the current task belongs to, None outside of
+# ensembles. Deterministic backends and caches mix it into their keys so that
+# replicas stay independent samples.
+current_replica: contextvars.ContextVar = contextvars.ContextVar('current_replica', default=None)
+
+
+class BaseProvider(object):
+    """
+    Interface for structured LLM backends.
+
+    A provider turns a chat message list into a validated instance of
+    ``response_format``. Agents and the PDF pipeline only talk to this
+    interface, so the backend can be swapped without touching them.
+    """
+
+    def parse(
+            self,
+            messages: list[dict],
+            model: str,
+            response_format: type[T],
+    ) -> T:
+        raise NotImplementedError
+
+    async def aparse(
+            self,
+            messages: list[dict],
+            model: str,
+            response_format: type[T],
+    ) -> T:
+        # fall back to the sync call in a worker thread so the event loop stays free
+        return await asyncio.to_thread(
+            self.parse, messages, model, response_format
+        )
+
+
+def backend_name(provider: BaseProvider) -> str:
+    """
+    Name of the backend behind cache/scheduler wrappers, mixed into cache
+    keys so answers of one backend (e.g. the fake one) never answer for another
+    """
+    while hasattr(provider, 'provider'):
+        provider = provider.provider
+    return type(provider).__name__
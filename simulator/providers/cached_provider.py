@@ -0,0 +1,57 @@
+import asyncio
+
+from simulator.cache import ResponseCache, make_cache_key
+from simulator.metrics import current_call
+from simulator.providers.base import BaseProvider, backend_name, current_replica
+
+
+class CachedProvider(BaseProvider):
+    """
+    Serve repeated structured calls from a ResponseCache.
+
+    Only misses reach the wrapped provider; their parsed outputs are stored
+    as JSON and re-validated against the schema on the way out. Ensemble
+    replicas and backends get separate entries.
+    """
+
+    def __init__(self, provider: BaseProvider, cache: ResponseCache):
+        self.provider = provider
+        self.cache = cache
+        self.backend = backend_name(provider)
+
+    def _key(self, messages, model, response_format):
+        replica = current_replica.get()
+        if replica is not None:
+            model = f'{model}#replica-{replica}'
+        return make_cache_key(model, messages, response_format, backend=self.backend)
+
+    @staticmethod
+    def _mark(status):
+        record = current_call()
+        if record is not None:
+            record.cache = status
+
+    def parse(self, messages, model, response_format):
+        key = self._key(messages, model, response_format)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._mark('hit')
+            return response_format.model_validate_json(cached)
+
+        self._mark('miss')
+        output = self.provider.parse(messages, model, response_format)
+        self.cache.set(key, output.model_dump_json())
+        return output
+
+    async def aparse(self, messages, model, response_format):
+        key = self._key(messages, model, response_format)
+        # sqlite may wait on another process' lock, keep that off the event loop
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            self._mark('hit')
+            return response_format.model_validate_json(cached)
+
+        self._mark('miss')
+        output = await self.provider.aparse(messages, model, response_format)
+        await asyncio.to_thread(self.cache.set, key, output.model_dump_json())
+        return output
@@ -0,0 +1,197 @@
+import os
+import atexit
+import asyncio
+import threading
+import importlib.util
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec('h2') is not None
+
+
+class ClientRegistry(object):
+    """
+    Shared OpenAI clients with pooled, keep-alive HTTP connections.
+
+    Clients are created on first use and reused by every provider in the
+    process, so connection setup and TLS handshakes are paid once instead of
+    per agent or per call. Async clients are bound to the event loop they
+    were created on, so one is kept per loop and closed on that loop when it
+    shuts down (``asyncio.run`` cancels the task waiting to close it).
+
+    Args:
+        max_connections: Maximum open connections per client.
+        max_keepalive_connections: Idle connections kept open for reuse.
+        keepalive_expiry: Seconds an idle connection is kept open.
+        timeout: Request timeout in seconds.
+        http2: Use HTTP/2. Defaults to on when the ``h2`` package is installed.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            keepalive_expiry: float = 30.0,
+            timeout: float = 60.0,
+            http2: bool = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.http2 = http2_available() if http2 is None else http2
+
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, OpenAI] = {}
+        # key -> (loop, client, task closing the client when the loop shuts down)
+        self._async_clients: dict[tuple, tuple[asyncio.AbstractEventLoop, AsyncOpenAI, asyncio.Task]] = {}
+
+    @staticmethod
+    def _retry_options(max_retries):
+        # None keeps the SDK's default
+        return {} if max_retries is None else {'max_retries': max_retries}
+
+    def get_client(self, base_url: str = None, api_key: str = None, max_retries: int = None) -> OpenAI:
+        key = (base_url, api_key, max_retries)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    base_url=base_url,
+                    api_key=api_key,
+                    http_client=DefaultHttpxClient(
+                        limits=self.limits, timeout=self.timeout, http2=self.http2
+                    ),
+                    **self._retry_options(max_retries),
+                )
+                self._clients[key] = client
+            return client
+
+    def get_async_client(self, base_url: str = None, api_key: str = None, max_retries: int = None) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        key = (base_url, api_key, max_retries, id(loop))
+        with self._lock:
+            # a loop closed without cancelling its tasks never closed its clients, they are only dropped
+            for stale_key, (stale_loop, _, _) in list(self._async_clients.items()):
+                if stale_loop.is_closed():
+                    del self._async_clients[stale_key]
+
+            entry = self._async_clients.get(key)
+            if entry is None or entry[0] is not loop:
+                client = AsyncOpenAI(
+                    base_url=base_url,
+                    api_key=api_key,
+                    http_client=DefaultAsyncHttpxClient(
+                        limits=self.limits, timeout=self.timeout, http2=self.http2
+                    ),
+                    **self._retry_options(max_retries),
+                )
+                entry = (loop, client, loop.create_task(self._close_on_shutdown(key, client)))
+                self._async_clients[key] = entry
+            return entry[1]
+
+    async def _close_on_shutdown(self, key: tuple, client: AsyncOpenAI):
+        # waits until cancelled by the loop shutting down or by close(), then closes the pool on its own loop
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            with self._lock:
+                entry = self._async_clients.get(key)
+                if entry is not None and entry[1] is client:
+                    del self._async_clients[key]
+            await client.close()
+
+    def close(self):
+        """
+        Close the sync clients. Async clients are closed on their own loops
+        the next time those run, ``aclose()`` waits for the running one.
+        """
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+            entries, self._async_clients = list(self._async_clients.values()), {}
+        for client in clients:
+            client.close()
+        for loop, _, closer in entries:
+            try:
+                loop.call_soon_threadsafe(closer.cancel)
+            except RuntimeError:
+                # loop already closed
+                pass
+
+    async def aclose(self):
+        """
+        Close all clients; async ones of the running loop are closed before returning.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            closers = [closer for client_loop, _, closer in self._async_clients.values() if client_loop is loop]
+        self.close()
+        await asyncio.gather(*closers, return_exceptions=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+
+_registry: ClientRegistry = None
+_registry_lock = threading.Lock()
+
+
+def _registry_from_env() -> ClientRegistry:
+    http2 = os.getenv('BIOSIM_HTTP2')
+    return ClientRegistry(
+        max_connections=int(os.getenv('BIOSIM_HTTP_MAX_CONNECTIONS', '100')),
+        max_keepalive_connections=int(os.getenv('BIOSIM_HTTP_MAX_KEEPALIVE', '20')),
+        http2=None if http2 is None else http2.lower() in ('1', 'true', 'yes', 'on'),
+    )
+
+
+def get_client_registry() -> ClientRegistry:
+    """
+    Process-wide registry, configured from BIOSIM_HTTP_* environment
+    variables unless ``configure_client_registry`` was called first.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = _registry_from_env()
+        return _registry
+
+
+def configure_client_registry(**kwargs) -> ClientRegistry:
+    """
+    Replace the process-wide registry, closing the sync clients of the old one.
+
+    Args:
+        **kwargs: Passed to ``ClientRegistry``.
+    """
+    global _registry
+    with _registry_lock:
+        old, _registry = _registry, ClientRegistry(**kwargs)
+    if old is not None:
+        old.close()
+    return _registry
+
+
+def close_client_registry():
+    global _registry
+    with _registry_lock:
+        old, _registry = _registry, None
+    if old is not None:
+        old.close()
+
+
+atexit.register(close_client_registry)
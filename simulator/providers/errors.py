@@ -0,0 +1,24 @@
+class ProviderError(Exception):
+    """
+    Base class of errors raised by providers
+    """
+
+
+class TransientProviderError(ProviderError):
+    """
+    Failure that may succeed when retried, e.g. a timeout or a 5xx response.
+
+    Args:
+        message: Error message
+        retry_after: Seconds the backend asked to wait, if it said so
+    """
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitedError(TransientProviderError):
+    """
+    The backend rejected the request because of a rate limit (HTTP 429)
+    """
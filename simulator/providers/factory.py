@@ -0,0 +1,90 @@
+import os
+import threading
+
+from simulator.providers.base import BaseProvider
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_number(name: str, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+
+def get_scheduler(name: str):
+    """
+    Process-wide RequestScheduler of a backend, configured from BIOSIM_RPM,
+    BIOSIM_TPM and BIOSIM_MAX_CONCURRENCY when first used.
+
+    Args:
+        name: Backend name, e.g. "openai"
+    """
+    from simulator.providers.scheduler import AdaptiveConcurrency, RequestScheduler
+    with _schedulers_lock:
+        if name not in _schedulers:
+            _schedulers[name] = RequestScheduler(
+                requests_per_minute=_env_number('BIOSIM_RPM'),
+                tokens_per_minute=_env_number('BIOSIM_TPM'),
+                concurrency=AdaptiveConcurrency(maximum=_env_number('BIOSIM_MAX_CONCURRENCY', int) or 64),
+            )
+        return _schedulers[name]
+
+
+def _scheduled(provider: BaseProvider, name: str) -> BaseProvider:
+    from simulator.providers.scheduler import ScheduledProvider
+    return ScheduledProvider(
+        provider,
+        max_retries=_env_number('BIOSIM_MAX_RETRIES', int) or 6,
+        scheduler=get_scheduler(name),
+    )
+
+
+def get_provider(name: str = None, cache: bool = None, schedule: bool = None) -> BaseProvider:
+    """
+    Build a provider by name.
+
+    Args:
+        name: "openai" or "fake". Defaults to the BIOSIM_PROVIDER environment
+            variable, then "openai".
+        cache: Serve repeated calls from the persistent response cache.
+            Defaults to the BIOSIM_CACHE environment variable.
+        schedule: Send calls through a ScheduledProvider (rate limits,
+            retries, adaptive concurrency) configured from BIOSIM_RPM,
+            BIOSIM_TPM, BIOSIM_MAX_CONCURRENCY and BIOSIM_MAX_RETRIES.
+            Defaults to BIOSIM_SCHEDULER, which is on for "openai". All
+            providers of a backend share one scheduler (``get_scheduler``).
+    """
+    name = (name or os.getenv('BIOSIM_PROVIDER') or 'openai').lower()
+    if schedule is None:
+        schedule = _env_flag('BIOSIM_SCHEDULER') if os.getenv('BIOSIM_SCHEDULER') else name == 'openai'
+
+    if name == 'openai':
+        from simulator.providers.openai_provider import OpenAIProvider
+        # the scheduler retries itself and needs to see every 429
+        provider = OpenAIProvider(max_retries=0 if schedule else None)
+    elif name == 'fake':
+        from simulator.providers.fake_provider import FakeProvider
+        provider = FakeProvider(
+            seed=int(os.getenv('BIOSIM_FAKE_SEED', '0')),
+            latency=float(os.getenv('BIOSIM_FAKE_LATENCY', '0')),
+        )
+    else:
+        raise ValueError(f"Unknown provider: {name}")
+
+    if schedule:
+        provider = _scheduled(provider, name)
+
+    if cache is None:
+        cache = _env_flag('BIOSIM_CACHE')
+    # cache hits never reach the scheduler, so they cost no rate budget
+    if cache:
+        from simulator.cache import get_response_cache
+        from simulator.providers.cached_provider import CachedProvider
+        provider = CachedProvider(provider, get_response_cache())
+
+    return provider
@@ -0,0 +1,204 @@
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import types
+import typing
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+from simulator.providers.base import BaseProvider, current_replica
+from simulator.types import BioModel, EnvironmentModel, JointStepModel
+
+# plausible value ranges for numeric fields, looked up by field name
+FIELD_RANGES = {
+    'temperature': (-5.0, 30.0),
+    'precipitation': (0.0, 200.0),
+    'humidity': (30.0, 90.0),
+    'wind': (0.0, 20.0),
+    'pH': (6.0, 8.5),
+    'salinity': (0.0, 5.0),
+    'nitrogen': (0.0, 10.0),
+    'phosphorus': (0.0, 10.0),
+    'availability': (0.0, 1.0),
+    'intensity': (0.0, 1.0),
+    'duration': (8.0, 16.0),
+    'quality': (0.0, 1.0),
+    'invasive_specie_initial_number': (50, 1000),
+    'invasive_specie_initial_density': (1, 20),
+    'native_specie_initial_number': (1000, 10000),
+    'native_specie_initial_density': (5, 50),
+    'invasive_specie_growth_upper': (15.0, 30.0),
+    'invasive_specie_growth_lower': (2.0, 15.0),
+    'native_specie_decline_upper': (8.0, 20.0),
+    'native_specie_decline_lower': (1.0, 8.0),
+}
+
+DEFAULT_INT_RANGE = (1, 1000)
+DEFAULT_FLOAT_RANGE = (0.0, 1.0)
+
+# monthly rate ranges used by the bio rule
+INVASIVE_GROWTH_RANGE = (0.05, 0.25)
+NATIVE_DECLINE_RANGE = (0.01, 0.15)
+
+_BIO_NUM_PATTERN = re.compile(r'Bio Num:\s*(\d+)')
+_BIO_DENSITY_PATTERN = re.compile(r'Bio Density:\s*(\d+)')
+_BIO_ROLE_PATTERN = re.compile(r'Bio Role:\s*(\w+)')
+# role, number and density of one specie block, in prompt order
+_BIO_BLOCK_PATTERN = re.compile(
+    r'Bio Role:\s*(invasive|native)\b.*?Bio Num:\s*(\d+).*?Bio Density:\s*(\d+)', re.S | re.I
+)
+
+
+def _fill_value(name: str, annotation, rng: random.Random):
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _fill_value(name, args[0], rng)
+    if origin in (list, typing.List):
+        item_type = typing.get_args(annotation)[0]
+        return [_fill_value(name, item_type, rng) for _ in range(rng.randint(1, 3))]
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return fill_model(annotation, rng)
+    if annotation is bool:
+        return True
+    if annotation is int:
+        low, high = FIELD_RANGES.get(name, DEFAULT_INT_RANGE)
+        return rng.randint(int(low), int(high))
+    if annotation is float:
+        low, high = FIELD_RANGES.get(name, DEFAULT_FLOAT_RANGE)
+        return round(rng.uniform(low, high), 2)
+    if annotation is str:
+        return f"Synthetic {name.replace('_', ' ')} #{rng.randint(0, 9999)}"
+
+    raise TypeError(f"FakeProvider cannot fill field {name} of type {annotation}")
+
+
+def fill_model(schema: type[BaseModel], rng: random.Random) -> dict:
+    """
+    Build a schema-valid dict for any pydantic model from a seeded generator.
+    """
+    return {
+        name: _fill_value(name, field.annotation, rng)
+        for name, field in schema.model_fields.items()
+    }
+
+
+def _first_int(pattern: re.Pattern, text: str) -> Optional[int]:
+    matches = pattern.findall(text)
+    return int(matches[0]) if matches else None
+
+
+def bio_rule(messages: list[dict], rng: random.Random) -> dict:
+    """
+    Invasive species grow and native species decline at a seeded monthly rate.
+    """
+    text = '\n'.join(message['content'] for message in messages)
+    num = _first_int(_BIO_NUM_PATTERN, text)
+    density = _first_int(_BIO_DENSITY_PATTERN, text)
+    if num is None or density is None:
+        return fill_model(BioModel, rng)
+
+    role = _BIO_ROLE_PATTERN.search(text)
+    return _next_bio_state(num, density, role.group(1) if role else None, rng)
+
+
+def _next_bio_state(num: int, density: int, role: Optional[str], rng: random.Random) -> dict:
+    if role is not None and role.lower() == 'invasive':
+        rate = rng.uniform(*INVASIVE_GROWTH_RANGE)
+    else:
+        rate = -rng.uniform(*NATIVE_DECLINE_RANGE)
+
+    return {
+        'specie_num': max(1, round(num * (1 + rate))),
+        'specie_density': max(1, round(density * (1 + rate))),
+    }
+
+
+def joint_rule(messages: list[dict], rng: random.Random) -> dict:
+    """
+    Bio rule for every specie block of a joint prompt, random environment.
+    """
+    text = '\n'.join(message['content'] for message in messages)
+    data = {'environment': fill_model(EnvironmentModel, rng)}
+    for block in _BIO_BLOCK_PATTERN.finditer(text):
+        role, num, density = block.group(1), int(block.group(2)), int(block.group(3))
+        data[role.lower()] = _next_bio_state(num, density, role, rng)
+    for key in ('invasive', 'native'):
+        if key not in data:
+            data[key] = fill_model(BioModel, rng)
+    return data
+
+
+DEFAULT_RULES = {
+    BioModel: bio_rule,
+    JointStepModel: joint_rule,
+}
+
+
+class FakeProvider(BaseProvider):
+    """
+    Deterministic offline provider.
+
+    Every response is derived from a generator seeded with the provider seed
+    and the request content, so identical requests always get identical
+    answers, across processes. Schemas with a registered rule get
+    domain-aware answers, everything else is filled field by field.
+
+    Args:
+        seed: Seed mixed into every request.
+        latency: Artificial latency per call in seconds.
+        latency_jitter: Extra uniformly random latency in seconds.
+        rules: Extra ``{schema: rule(messages, rng) -> dict}`` entries.
+    """
+
+    def __init__(
+            self,
+            seed: int = 0,
+            latency: float = 0.0,
+            latency_jitter: float = 0.0,
+            rules: dict[type[BaseModel], Callable] = None,
+    ):
+        self.seed = seed
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rules = dict(DEFAULT_RULES)
+        if rules:
+            self.rules.update(rules)
+        self.call_count = 0
+
+    def _rng(self, messages, model, response_format) -> random.Random:
+        payload = json.dumps(
+            [self.seed, current_replica.get(), model, response_format.__name__, messages],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        digest = hashlib.sha256(payload.encode('utf-8')).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def _delay(self, rng: random.Random) -> float:
+        return self.latency + rng.uniform(0, self.latency_jitter)
+
+    def _respond(self, messages, response_format, rng):
+        self.call_count += 1
+        rule = self.rules.get(response_format)
+        data = rule(messages, rng) if rule else fill_model(response_format, rng)
+        return response_format.model_validate(data)
+
+    def parse(self, messages, model, response_format):
+        rng = self._rng(messages, model, response_format)
+        delay = self._delay(rng)
+        if delay > 0:
+            time.sleep(delay)
+        return self._respond(messages, response_format, rng)
+
+    async def aparse(self, messages, model, response_format):
+        rng = self._rng(messages, model, response_format)
+        delay = self._delay(rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._respond(messages, response_format, rng)
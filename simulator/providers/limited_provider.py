@@ -0,0 +1,46 @@
+import time
+
+from simulator.metrics import current_call
+from simulator.providers.base import BaseProvider
+from simulator.providers.scheduler import SlotLimiter
+
+
+class ConcurrencyLimitedProvider(BaseProvider):
+    """
+    Cap the number of requests in flight through a provider.
+
+    All agents sharing this instance share the cap, which is what keeps a
+    large ensemble from opening one connection per pending call. Sync and
+    async calls count against the same cap, from any thread or event loop.
+    """
+
+    def __init__(self, provider: BaseProvider, max_concurrency: int = 16):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.slots = SlotLimiter(max_concurrency)
+
+    @staticmethod
+    def _add_queue_wait(start):
+        record = current_call()
+        if record is not None:
+            record.queue_wait += time.perf_counter() - start
+
+    def parse(self, messages, model, response_format):
+        start = time.perf_counter()
+        self.slots.acquire()
+        try:
+            self._add_queue_wait(start)
+            return self.provider.parse(messages, model, response_format)
+        finally:
+            self.slots.release()
+
+    async def aparse(self, messages, model, response_format):
+        start = time.perf_counter()
+        await self.slots.aacquire()
+        try:
+            self._add_queue_wait(start)
+            return await self.provider.aparse(messages, model, response_format)
+        finally:
+            self.slots.release()
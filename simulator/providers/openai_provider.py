@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+
+import openai
+from openai import OpenAI, AsyncOpenAI
+
+from simulator.metrics import current_call
+from simulator.providers.base import BaseProvider
+from simulator.providers.errors import RateLimitedError, TransientProviderError
+from simulator.providers.clients import ClientRegistry, get_client_registry
+
+
+class OpenAIProvider(BaseProvider):
+    """
+    Provider backed by the OpenAI structured outputs API.
+
+    Unless explicit clients are passed, clients are borrowed from the
+    process-wide ClientRegistry on each call, so every provider instance
+    shares the same connection pools. Constructing a provider never needs
+    network access or an API key.
+
+    Args:
+        client: Sync client to use instead of the registry's.
+        async_client: Async client to use instead of the registry's.
+        registry: Registry to borrow from, defaults to the process-wide one.
+        base_url: API base url, defaults to the OpenAI SDK's (OPENAI_BASE_URL).
+        api_key: API key, defaults to the OpenAI SDK's (OPENAI_API_KEY).
+        max_retries: Retries done by the OpenAI SDK itself, defaults to the
+            SDK's. Set to 0 when a ScheduledProvider handles retries.
+
+    Rate limits raise RateLimitedError and other retryable failures
+    TransientProviderError, so wrappers need no knowledge of the SDK.
+    """
+
+    def __init__(
+            self,
+            client: OpenAI = None,
+            async_client: AsyncOpenAI = None,
+            registry: ClientRegistry = None,
+            base_url: str = None,
+            api_key: str = None,
+            max_retries: int = None,
+    ):
+        self._client = client
+        self._async_client = async_client
+        self._registry = registry
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_retries = max_retries
+
+    @property
+    def registry(self) -> ClientRegistry:
+        return self._registry or get_client_registry()
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is not None:
+            return self._client
+        return self.registry.get_client(self.base_url, self.api_key, self.max_retries)
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        if self._async_client is not None:
+            return self._async_client
+        return self.registry.get_async_client(self.base_url, self.api_key, self.max_retries)
+
+    @staticmethod
+    def _get_parsed(response):
+        record = current_call()
+        if record is not None and response.usage is not None:
+            record.set_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        message = response.choices[0].message
+        if message.parsed is None:
+            raise ValueError(f"Model returned no parsed output: {message.refusal}")
+        return message.parsed
+
+    def parse(self, messages, model, response_format):
+        with _translate_errors():
+            response = self.client.beta.chat.completions.parse(
+                messages=messages,
+                model=model,
+                response_format=response_format
+            )
+        return self._get_parsed(response)
+
+    async def aparse(self, messages, model, response_format):
+        with _translate_errors():
+            response = await self.async_client.beta.chat.completions.parse(
+                messages=messages,
+                model=model,
+                response_format=response_format
+            )
+        return self._get_parsed(response)
+
+
+def _retry_after(response) -> float:
+    """
+    Seconds to wait from the Retry-After headers of a response, if present
+    """
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except ValueError:
+        # http-date values are rare for this API, fall back to backoff
+        return None
+    return None
+
+
+@contextmanager
+def _translate_errors():
+    try:
+        yield
+    except openai.RateLimitError as e:
+        raise RateLimitedError(str(e), retry_after=_retry_after(e.response)) from e
+    except openai.APIConnectionError as e:
+        # includes timeouts
+        raise TransientProviderError(str(e)) from e
+    except openai.APIStatusError as e:
+        if e.status_code in (408, 409) or e.status_code >= 500:
+            raise TransientProviderError(str(e), retry_after=_retry_after(e.response)) from e
+        raise
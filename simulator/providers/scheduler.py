@@ -0,0 +1,380 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Union
+
+from simulator.metrics import current_call
+from simulator.prompts import estimate_tokens
+from simulator.providers.base import BaseProvider
+from simulator.providers.errors import RateLimitedError, TransientProviderError
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled continuously at ``rate_per_minute``.
+
+    ``reserve`` takes tokens immediately and returns how long the caller
+    must wait for them to have been available, so waiters are served in
+    reservation order without polling. A single request larger than the
+    capacity is let through once the bucket is full again.
+
+    Args:
+        rate_per_minute: Refill rate, None for no limit
+        capacity: Maximum burst, defaults to one minute worth of tokens
+    """
+
+    def __init__(self, rate_per_minute: float = None, capacity: float = None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        rate = self.rate_per_minute / 60
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take ``amount`` tokens, returning the seconds to wait before using them
+        """
+        if self.rate_per_minute is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            amount = min(amount, self.capacity)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / (self.rate_per_minute / 60)
+
+    def adjust(self, amount: float):
+        """
+        Return (positive) or take (negative) tokens once the real cost of a
+        request is known
+        """
+        if self.rate_per_minute is None:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AdaptiveConcurrency(object):
+    """
+    Additive-increase/multiplicative-decrease limit on requests in flight.
+
+    Every success adds ``1 / limit`` (about one per round of requests), a
+    rate limit multiplies the limit by ``decrease``, and a latency above
+    ``latency_tolerance`` times the fastest observed one is treated as
+    congestion and shrinks the limit gently. Decreases are at most one per
+    ``cooldown`` seconds, by default the average latency, so one burst of
+    429s from a round of requests counts once.
+
+    Args:
+        initial: Starting limit
+        minimum: Lowest limit
+        maximum: Highest limit
+        decrease: Factor applied on a rate limit
+        latency_tolerance: Latency ratio to the fastest call counted as congestion
+        cooldown: Seconds between two decreases, None for the average latency
+    """
+
+    def __init__(
+            self,
+            initial: float = 4,
+            minimum: float = 1,
+            maximum: float = 64,
+            decrease: float = 0.5,
+            latency_tolerance: float = 4.0,
+            cooldown: float = None,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = min(max(initial, minimum), maximum)
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self._fastest = None
+        self._average = None
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def slots(self) -> int:
+        return max(int(self.limit), 1)
+
+    def _shrink(self, factor):
+        now = time.monotonic()
+        cooldown = self.cooldown if self.cooldown is not None else (self._average or 0.0)
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+    def on_success(self, latency: float):
+        with self._lock:
+            if self._fastest is None or latency < self._fastest:
+                self._fastest = latency
+            self._average = latency if self._average is None else 0.9 * self._average + 0.1 * latency
+            if latency > self.latency_tolerance * self._fastest and latency > 0.5:
+                self._shrink(0.9)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_rate_limited(self):
+        with self._lock:
+            self._shrink(self.decrease)
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SlotLimiter(object):
+    """
+    Requests in flight under a limit, shared by threads and event loops.
+
+    One thread-safe counter serves every caller: threads wait on a
+    condition, coroutines on a future of their own loop that a release
+    wakes thread-safely. The count never depends on which loop a caller
+    runs on, so a second ``asyncio.run`` or a worker thread neither resets
+    nor bypasses it.
+
+    Args:
+        limit: Maximum requests in flight, or a callable returning it
+    """
+
+    def __init__(self, limit: Union[int, Callable[[], int]]):
+        self._limit = limit if callable(limit) else (lambda: limit)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        # (loop, future) of every waiting coroutine
+        self._waiters = deque()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _free(self) -> bool:
+        return self._in_flight < self._limit()
+
+    def acquire(self):
+        with self._condition:
+            self._condition.wait_for(self._free)
+            self._in_flight += 1
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._free():
+                    self._in_flight += 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._condition:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                raise
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, deque()
+        # every waiter checks again, one whose loop is gone is dropped
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass
+
+
+def backoff_delay(attempt: int, base: float = 0.5, maximum: float = 30.0) -> float:
+    """
+    Exponential backoff with full jitter for the given retry (0-based)
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class RequestScheduler(object):
+    """
+    Rate budgets and request slots shared by every ScheduledProvider built
+    on it, so all runs, sessions and PDF calls of a process together stay
+    below the account limits instead of each getting a budget of its own.
+
+    Args:
+        requests_per_minute: Request rate limit, None for no limit
+        tokens_per_minute: Token rate limit, None for no limit
+        concurrency: Adaptive concurrency limit, a default one when None
+    """
+
+    def __init__(
+            self,
+            requests_per_minute: float = None,
+            tokens_per_minute: float = None,
+            concurrency: AdaptiveConcurrency = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        # one count for threads and every event loop
+        self.slots = SlotLimiter(lambda: self.concurrency.slots)
+
+    def reserve(self, cost) -> float:
+        """
+        Take one request and ``cost`` tokens, returning the seconds to wait for them
+        """
+        return max(self.requests.reserve(1), self.tokens.reserve(cost))
+
+    def settle(self, cost):
+        # refund or charge the difference once the API reported the usage
+        record = current_call()
+        if record is not None and record.usage_source == 'api':
+            self.tokens.adjust(cost - record.input_tokens - record.output_tokens)
+
+    def acquire(self):
+        self.slots.acquire()
+
+    async def aacquire(self):
+        await self.slots.aacquire()
+
+    def release(self):
+        self.slots.release()
+
+
+class ScheduledProvider(BaseProvider):
+    """
+    Rate-limit-aware scheduling of structured calls.
+
+    Calls wait for requests-per-minute and tokens-per-minute buckets and for
+    a slot of an adaptive concurrency limit, then go to the wrapped provider.
+    Transient failures are retried with exponential backoff and jitter (or
+    the backend's Retry-After), and rate limits also shrink the concurrency
+    limit, which grows back as calls succeed. Together this keeps requests
+    just below what the account allows instead of failing or idling.
+
+    Budgets and slots live in a RequestScheduler; ``get_provider`` passes
+    the process-wide one of the backend, so every provider shares them.
+
+    Args:
+        provider: Provider to schedule calls for
+        requests_per_minute: Request rate limit, None for no limit
+        tokens_per_minute: Token rate limit, None for no limit
+        concurrency: Adaptive concurrency limit, a default one when None
+        max_retries: Retries of a transient failure before it is raised
+        backoff_base: First backoff delay scale in seconds
+        backoff_max: Largest backoff delay in seconds
+        output_tokens: Expected output tokens per call, for the token bucket
+        scheduler: Shared budgets and slots, replaces the three limits above
+    """
+
+    def __init__(
+            self,
+            provider: BaseProvider,
+            requests_per_minute: float = None,
+            tokens_per_minute: float = None,
+            concurrency: AdaptiveConcurrency = None,
+            max_retries: int = 6,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0,
+            output_tokens: int = 500,
+            scheduler: RequestScheduler = None,
+    ):
+        self.provider = provider
+        self.scheduler = scheduler or RequestScheduler(requests_per_minute, tokens_per_minute, concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.output_tokens = output_tokens
+
+    @property
+    def requests(self) -> TokenBucket:
+        return self.scheduler.requests
+
+    @property
+    def tokens(self) -> TokenBucket:
+        return self.scheduler.tokens
+
+    @property
+    def concurrency(self) -> AdaptiveConcurrency:
+        return self.scheduler.concurrency
+
+    def _estimate_cost(self, messages) -> int:
+        text = '\n'.join(str(message.get('content', '')) for message in messages)
+        return estimate_tokens(text) + self.output_tokens
+
+    def _retry_delay(self, error, attempt) -> float:
+        if isinstance(error, RateLimitedError):
+            self.concurrency.on_rate_limited()
+        if error.retry_after is not None:
+            return error.retry_after + random.uniform(0, self.backoff_base)
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+    @staticmethod
+    def _note(queue_wait=0.0, retry=False):
+        record = current_call()
+        if record is not None:
+            record.queue_wait += queue_wait
+            record.retries += retry
+
+    def parse(self, messages, model, response_format):
+        cost = self._estimate_cost(messages)
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            time.sleep(self.scheduler.reserve(cost))
+            self.scheduler.acquire()
+            self._note(queue_wait=time.perf_counter() - start)
+
+            sent = time.perf_counter()
+            try:
+                output = self.provider.parse(messages, model, response_format)
+            except TransientProviderError as e:
+                if attempt == self.max_retries:
+                    raise
+                error, delay = e, self._retry_delay(e, attempt)
+            else:
+                self.concurrency.on_success(time.perf_counter() - sent)
+                self.scheduler.settle(cost)
+                return output
+            finally:
+                self.scheduler.release()
+
+            print(f'{type(error).__name__} from {model}, retrying in {delay:.1f}s')
+            self._note(retry=True)
+            time.sleep(delay)
+
+    async def aparse(self, messages, model, response_format):
+        cost = self._estimate_cost(messages)
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            await asyncio.sleep(self.scheduler.reserve(cost))
+            await self.scheduler.aacquire()
+            self._note(queue_wait=time.perf_counter() - start)
+
+            sent = time.perf_counter()
+            try:
+                output = await self.provider.aparse(messages, model, response_format)
+            except TransientProviderError as e:
+                if attempt == self.max_retries:
+                    raise
+                error, delay = e, self._retry_delay(e, attempt)
+            else:
+                self.concurrency.on_success(time.perf_counter() - sent)
+                self.scheduler.settle(cost)
+                return output
+            finally:
+                self.scheduler.release()
+
+            print(f'{type(error).__name__} from {model}, retrying in {delay:.1f}s')
+            self._note(retry=True)
+            await asyncio.sleep(delay)
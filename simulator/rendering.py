@@ -0,0 +1,248 @@
+import os
+import time
+import uuid
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from simulator.types import CaseModel
+from simulator.trajectories import TrajectoryStore
+from simulator.utils import get_project_root
+
+POPULATION_PLOT = 'simulation_results.png'
+GROWTH_PLOT = 'monthly_growth_rates.png'
+
+_executor: ThreadPoolExecutor = None
+_executor_lock = threading.Lock()
+
+
+def new_run_id() -> str:
+    """
+    Unique, sortable id of a simulation run
+    """
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def get_output_dir() -> str:
+    return os.path.join(get_project_root(), 'output')
+
+
+def result_paths(run_id: str = None, output_dir: str = None) -> dict[str, str]:
+    """
+    Paths of the result images of a run.
+
+    Args:
+        run_id: Run whose images to locate, None for the legacy shared location
+        output_dir: Base output directory, defaults to <project root>/output
+    """
+    directory = output_dir or get_output_dir()
+    if run_id is not None:
+        directory = os.path.join(directory, run_id)
+    return {
+        'population': os.path.join(directory, POPULATION_PLOT),
+        'growth': os.path.join(directory, GROWTH_PLOT),
+    }
+
+
+def _rate(current, previous):
+    return (current - previous) / previous * 100 if previous else 0.0
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def population_figure(CASE: CaseModel, time_steps_x, native_population, invasive_population, env_changes) -> Figure:
+    figure = Figure(figsize=(12, 6))
+    ax = figure.subplots()
+
+    # Plot species populations
+    ax.plot(time_steps_x, native_population, 'g-', linewidth=2, label=f'Native Species ({CASE.native_specie_name})')
+    ax.plot(time_steps_x, invasive_population, 'r-', linewidth=2, label=f'Invasive Species ({CASE.invasive_specie_name})')
+
+    # Add vertical line for environmental change
+    for i, change in enumerate(env_changes):
+        if change:
+            ax.axvline(x=time_steps_x[i], color='blue', linestyle='--', alpha=0.5, label='Environmental Change')
+
+    ax.set_xlabel('Time Steps (Months)')
+    ax.set_ylabel('Population')
+    ax.set_title('Species Population Changes Over Time')
+    ax.legend(loc='upper right')
+    ax.grid(True)
+    return figure
+
+
+def growth_figure(
+        CASE: CaseModel,
+        time_steps_x,
+        native_population_rates,
+        invasive_population_rates,
+        env_changes
+) -> Figure:
+    # reference rates from the case, declines negative for plotting
+    invasive_growth_upper = CASE.invasive_specie_growth_upper
+    invasive_growth_lower = CASE.invasive_specie_growth_lower
+    native_decline_upper = -abs(CASE.native_specie_decline_upper)
+    native_decline_lower = -abs(CASE.native_specie_decline_lower)
+    invasive_avg_rate = (invasive_growth_upper + invasive_growth_lower) / 2
+    native_avg_rate = (native_decline_upper + native_decline_lower) / 2
+
+    figure = Figure(figsize=(12, 6))
+    ax = figure.subplots()
+
+    # Plot simulation results
+    ax.plot(time_steps_x[1:], native_population_rates, 'g-', linewidth=2,
+            label=f'Simulation: Native Species ({CASE.native_specie_name})')
+    ax.plot(time_steps_x[1:], invasive_population_rates, 'r-', linewidth=2,
+            label=f'Simulation: Invasive Species ({CASE.invasive_specie_name})')
+
+    # reference data from the paper over 12 months
+    months = list(range(1, 13))
+    ax.plot(months, [invasive_avg_rate] * 12, 'r--', linewidth=1.5,
+            label=f'Reference: {CASE.invasive_specie_name} ({invasive_avg_rate}% monthly growth)')
+    ax.plot(months, [native_avg_rate] * 12, 'g--', linewidth=1.5,
+            label=f'Reference: {CASE.native_specie_name} ({abs(native_avg_rate)}% monthly decline)')
+
+    # Add shaded regions for reference ranges
+    ax.fill_between(months, [invasive_growth_lower] * 12, [invasive_growth_upper] * 12,
+                    color='red', alpha=0.1,
+                    label=f'Reference Range: {CASE.invasive_specie_name} ({invasive_growth_lower}-{invasive_growth_upper}%)')
+    ax.fill_between(months, [native_decline_lower] * 12, [native_decline_upper] * 12,
+                    color='green', alpha=0.1,
+                    label=f'Reference Range: {CASE.native_specie_name} ({abs(native_decline_upper)}-{abs(native_decline_lower)}% decline)')
+
+    # Add vertical line for environmental change
+    for i, change in enumerate(env_changes[1:], 1):
+        if change:
+            ax.axvline(x=time_steps_x[i], color='blue', linestyle='--', alpha=0.5, label='Environmental Change')
+
+    ax.set_xlabel('Time Steps (Months)')
+    ax.set_ylabel('Population Growth Rate (%)')
+    ax.set_title('Monthly Population Growth Rates\n(Simulation vs Reference Data)')
+    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+    ax.grid(True)
+    ax.axhline(y=0, color='k', linestyle='--', alpha=0.3)
+    figure.tight_layout()
+    return figure
+
+
+def ensemble_figure(
+        store: TrajectoryStore,
+        variables=('native.specie_num', 'invasive.specie_num'),
+        percentiles=(5, 50, 95),
+        runs: range = None
+) -> Figure:
+    """
+    Median and percentile band of each variable over the runs of a trajectory store.
+
+    Args:
+        store: Trajectories to plot
+        variables: Store variables, one line and band each
+        percentiles: Lower bound, median and upper bound of the band
+        runs: Runs to include, all by default
+    """
+    figure = Figure(figsize=(12, 6))
+    ax = figure.subplots()
+    months = np.arange(store.steps)
+    for variable in variables:
+        lower, median, upper = store.percentiles(variable, percentiles, runs=runs)
+        line, = ax.plot(months, median, linewidth=2, label=f'{variable} (median)')
+        ax.fill_between(months, lower, upper, color=line.get_color(), alpha=0.2,
+                        label=f'{variable} (p{percentiles[0]:g}-p{percentiles[-1]:g})')
+
+    ax.set_xlabel('Time Steps (Months)')
+    ax.set_title(f'Ensemble of {store.n_runs if runs is None else len(runs)} runs')
+    ax.legend(loc='upper right')
+    ax.grid(True)
+    return figure
+
+
+def save_result_plots(
+        CASE,
+        time_steps_x,
+        native_population,
+        invasive_population,
+        native_densities,
+        invasive_densities,
+        env_changes,
+        run_id=None,
+        output_dir=None
+) -> dict[str, str]:
+    """
+    Save the population and growth rate plots of a finished run.
+
+    Only explicit Figure objects are used, no pyplot state, so several runs
+    can render at the same time from different threads. This is still
+    blocking work, use ``render_result_plots`` from async code.
+
+    Args:
+        CASE: Case model of the run
+        time_steps_x: Step numbers, starting at 1
+        native_population: Native population after each step
+        invasive_population: Invasive population after each step
+        native_densities: Native density of every memory record, initial one included
+        invasive_densities: Invasive density of every memory record, initial one included
+        env_changes: 1 for steps with an injected environment change, else 0
+        run_id: Run the images belong to, they go to a directory of their own
+        output_dir: Base output directory, defaults to <project root>/output
+
+    Returns:
+        Paths of the saved images, see ``result_paths``
+    """
+    paths = result_paths(run_id, output_dir)
+    os.makedirs(os.path.dirname(paths['population']), exist_ok=True)
+
+    figure = population_figure(CASE, time_steps_x, native_population, invasive_population, env_changes)
+    figure.savefig(paths['population'])
+    print(f"Plot saved as '{paths['population']}'")
+
+    # monthly rates (percentage change)
+    steps = range(1, len(time_steps_x))
+    native_population_rates = [_rate(native_population[i], native_population[i - 1]) for i in steps]
+    invasive_population_rates = [_rate(invasive_population[i], invasive_population[i - 1]) for i in steps]
+    native_density_rates = [_rate(native_densities[i], native_densities[i - 1]) for i in steps]
+    invasive_density_rates = [_rate(invasive_densities[i], invasive_densities[i - 1]) for i in steps]
+
+    # Print the final average rates
+    print("\nAverage Monthly Growth Rates:")
+    print("Native Species:")
+    print(f"  Population: {_mean(native_population_rates):.2f}%")
+    print(f"  Density: {_mean(native_density_rates):.2f}%")
+    print("Invasive Species:")
+    print(f"  Population: {_mean(invasive_population_rates):.2f}%")
+    print(f"  Density: {_mean(invasive_density_rates):.2f}%")
+
+    figure = growth_figure(CASE, time_steps_x, native_population_rates, invasive_population_rates, env_changes)
+    figure.savefig(paths['growth'], bbox_inches='tight')
+    print(f"Monthly growth rates plot saved as '{paths['growth']}'")
+
+    return paths
+
+
+def get_render_executor() -> ThreadPoolExecutor:
+    """
+    Worker pool shared by all result rendering, sized by BIOSIM_RENDER_WORKERS
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('BIOSIM_RENDER_WORKERS', '2')),
+                thread_name_prefix='biosim-render'
+            )
+        return _executor
+
+
+async def render_result_plots(*args, **kwargs) -> dict[str, str]:
+    """
+    ``save_result_plots`` in the render worker pool, without blocking the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_render_executor(), functools.partial(save_result_plots, *args, **kwargs)
+    )
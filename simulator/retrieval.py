@@ -0,0 +1,200 @@
+import re
+import math
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from simulator.types import CaseModel
+from simulator.prompts import estimate_tokens
+
+# numbers and percentages become terms of their own, chunks with data match numeric fields
+NUMBER = '<num>'
+PERCENT = '<pct>'
+
+_TERM = re.compile(rf'{NUMBER}|{PERCENT}|[a-z]+|\d+(?:[.,]\d+)*')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+STOPWORDS = frozenset('''
+    a an and are as at be by for from has how in is it its of on or per the this to was were which whether
+    with case see
+'''.split())
+
+# words papers use for the fields, beyond the field titles and descriptions
+FIELD_HINTS = {
+    'scenario': 'ecosystem habitat site region interaction competition',
+    'invasive_specie_name': 'invasive alien introduced non native exotic',
+    'native_specie_name': 'native indigenous endemic resident',
+    'invasive_specie_initial_number': f'abundance individuals population count total {NUMBER}',
+    'native_specie_initial_number': f'abundance individuals population count total {NUMBER}',
+    'invasive_specie_initial_density': f'density individuals m2 ha km2 plot quadrat area {NUMBER}',
+    'native_specie_initial_density': f'density individuals m2 ha km2 plot quadrat area {NUMBER}',
+    'mitigation_measures': 'control removal management eradication trapping culling',
+    'experiment_condition': 'methods study design sampling survey treatment plots',
+    'evaluation_criteria': 'measured metric response compared significant effect',
+    'weather_changing_description': 'temperature rainfall precipitation seasonal climate winter summer',
+    'invasive_specie_growth_upper': f'growth increase spread expansion annual year month {NUMBER} {PERCENT}',
+    'invasive_specie_growth_lower': f'growth increase spread expansion annual year month {NUMBER} {PERCENT}',
+    'native_specie_decline_upper': f'decline decrease loss mortality reduction annual year month {NUMBER} {PERCENT}',
+    'native_specie_decline_lower': f'decline decrease loss mortality reduction annual year month {NUMBER} {PERCENT}',
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercase word terms of a text, numbers and percentages folded into placeholders
+    """
+    terms = []
+    for term in _TERM.findall(text.lower().replace('%', f' {PERCENT} ')):
+        if term[0].isdigit():
+            term = NUMBER
+        elif term in STOPWORDS or len(term) == 1:
+            continue
+        terms.append(term)
+    return terms
+
+
+def field_queries(model: type[BaseModel] = CaseModel, hints: dict[str, str] = FIELD_HINTS) -> dict[str, list[str]]:
+    """
+    One query per field of a model, from its name, title, description and hints
+    """
+    queries = {}
+    for name, field in model.model_fields.items():
+        text = ' '.join([name.replace('_', ' '), field.title or '', field.description or '', hints.get(name, '')])
+        queries[name] = list(dict.fromkeys(tokenize(text)))
+    return queries
+
+
+def split_chunks(text: str, chunk_characters: int = 600) -> list[str]:
+    """
+    Sentence-aligned chunks of about ``chunk_characters``, in document order.
+    Sentences longer than a chunk are cut.
+    """
+    sentences = _SENTENCE_END.split(' '.join(text.split()))
+    chunks, current = [], ''
+    for sentence in sentences:
+        while len(sentence) > chunk_characters:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(sentence[:chunk_characters])
+            sentence = sentence[chunk_characters:]
+        if current and len(current) + 1 + len(sentence) > chunk_characters:
+            chunks.append(current)
+            current = ''
+        current = f'{current} {sentence}' if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25Index(object):
+    """
+    Okapi BM25 over a small in-memory collection, e.g. the chunks of one paper.
+
+    Args:
+        documents: Texts to index
+        k1: Term frequency saturation
+        b: Length normalization
+    """
+
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(document)) for document in documents]
+        self.lengths = np.array([sum(counts.values()) for counts in self.term_counts], dtype=float)
+        self.average_length = self.lengths.mean() if len(documents) else 0.0
+        document_frequency = Counter(term for counts in self.term_counts for term in counts)
+        n = len(documents)
+        # the non-negative idf variant, terms in every chunk still count a little
+        self.idf = {
+            term: math.log(1 + (n - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: list[str]) -> np.ndarray:
+        """
+        BM25 score of every document for a tokenized query
+        """
+        scores = np.zeros(len(self.term_counts))
+        if not len(scores):
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.average_length, 1e-9))
+        for term in set(query):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            frequency = np.array([counts.get(term, 0) for counts in self.term_counts], dtype=float)
+            scores += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+
+def rank_chunks(chunks: list[str], queries: dict[str, list[str]] = None) -> np.ndarray:
+    """
+    Relevance of every chunk to a set of field queries.
+
+    Scores are normalized per field before summing, so a field with many
+    query terms does not drown the others and a chunk that is the best match
+    of several fields ranks first.
+    """
+    queries = queries if queries is not None else field_queries()
+    index = BM25Index(chunks)
+    total = np.zeros(len(chunks))
+    for query in queries.values():
+        scores = index.scores(query)
+        best = scores.max() if len(scores) else 0.0
+        if best > 0:
+            total += scores / best
+    return total
+
+
+def select_relevant_text(
+        text: str,
+        max_characters: Optional[int] = 5000,
+        max_tokens: Optional[int] = None,
+        chunk_characters: int = 600,
+        lead_chunks: int = 1,
+        queries: dict[str, list[str]] = None
+) -> str:
+    """
+    Most relevant chunks of a document within a character and/or token budget.
+
+    The document is split into chunks, ranked with BM25 against the case
+    fields (see ``rank_chunks``) and packed greedily, best first. The first
+    ``lead_chunks`` chunks (title and abstract, where species are named) are
+    always kept. Chosen chunks are returned in document order. Text that
+    fits the budget is returned as is.
+
+    Args:
+        text: Full document text
+        max_characters: Character budget, None for no limit
+        max_tokens: Token budget (see ``estimate_tokens``), None for no limit
+        chunk_characters: Target chunk size
+        lead_chunks: Leading chunks kept regardless of their score
+        queries: Tokenized queries per field, defaults to ``field_queries()``
+    """
+    fits_characters = max_characters is None or len(text) <= max_characters
+    if fits_characters and (max_tokens is None or estimate_tokens(text) <= max_tokens):
+        return text
+
+    chunks = split_chunks(text, chunk_characters)
+    scores = rank_chunks(chunks, queries)
+    # leading chunks first, then by score, ties in document order
+    order = list(range(min(lead_chunks, len(chunks))))
+    order += sorted(range(len(order), len(chunks)), key=lambda i: (-scores[i], i))
+
+    chosen = []
+    characters = tokens = 0
+    for i in order:
+        separator = 1 if chosen else 0
+        size = len(chunks[i]) + separator
+        if max_characters is not None and characters + size > max_characters:
+            continue
+        chunk_tokens = estimate_tokens(chunks[i]) if max_tokens is not None else 0
+        if max_tokens is not None and tokens + chunk_tokens > max_tokens:
+            continue
+        chosen.append(i)
+        characters += size
+        tokens += chunk_tokens
+    return '\n'.join(chunks[i] for i in sorted(chosen))
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
+
+from simulator.types import CaseModel
+from simulator.rendering import get_output_dir
+
+
+class RunRegistry(object):
+    """
+    Simulation runs and their per-step states in an embedded SQLite database.
+
+    Every run is stored with its case, parameters, status and the Gradio
+    session (or any other owner) that started it, so finished runs can be
+    listed and shown again without re-simulating. Like the response cache,
+    the database is safe to share between processes and a lock serializes
+    threads of the same process.
+
+    Args:
+        path: Database file. Created if missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS runs ('
+            'run_id TEXT PRIMARY KEY, setting_id TEXT, session_id TEXT, status TEXT NOT NULL, '
+            'case_json TEXT NOT NULL, params_json TEXT NOT NULL, error TEXT, '
+            'started REAL NOT NULL, finished REAL, wall_time REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS runs_session ON runs (session_id, started)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS runs_setting ON runs (setting_id, started)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS steps ('
+            'run_id TEXT NOT NULL, step INTEGER NOT NULL, state_json TEXT NOT NULL, wall_time REAL, '
+            'PRIMARY KEY (run_id, step))'
+        )
+
+    def start_run(
+            self,
+            run_id: str,
+            case: CaseModel,
+            params: dict,
+            setting_id: str = None,
+            session_id: str = None
+    ):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO runs (run_id, setting_id, session_id, status, case_json, params_json, started) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (run_id, setting_id, session_id, 'running', case.model_dump_json(), json.dumps(params), time.time())
+            )
+            self._conn.execute('DELETE FROM steps WHERE run_id = ?', (run_id,))
+
+    def record_step(self, run_id: str, step: int, state: dict, wall_time: float = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?)',
+                (run_id, step, json.dumps(state), wall_time)
+            )
+
+    def finish_run(self, run_id: str, status: str = 'complete', error: str = None, wall_time: float = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE runs SET status = ?, error = ?, finished = ?, wall_time = ? WHERE run_id = ?',
+                (status, error, time.time(), wall_time, run_id)
+            )
+
+    @staticmethod
+    def _run_dict(row) -> dict:
+        run_id, setting_id, session_id, status, case_json, params_json, error, started, finished, wall_time = row
+        return {
+            'run_id': run_id,
+            'setting_id': setting_id,
+            'session_id': session_id,
+            'status': status,
+            'case': json.loads(case_json),
+            'params': json.loads(params_json),
+            'error': error,
+            'started': started,
+            'finished': finished,
+            'wall_time': wall_time,
+        }
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        return self._run_dict(row) if row else None
+
+    def get_steps(self, run_id: str) -> list[dict]:
+        """
+        Stored states of a run in step order, each with its ``wall_time``
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT state_json, wall_time FROM steps WHERE run_id = ? ORDER BY step', (run_id,)
+            ).fetchall()
+        return [{**json.loads(state), 'wall_time': wall_time} for state, wall_time in rows]
+
+    def list_runs(
+            self,
+            session_id: str = None,
+            setting_id: str = None,
+            status: str = None,
+            limit: int = 50
+    ) -> list[dict]:
+        """
+        Most recent runs first, optionally filtered by owner, setting or status
+        """
+        filters = {'session_id': session_id, 'setting_id': setting_id, 'status': status}
+        where = [f'{column} = ?' for column, value in filters.items() if value is not None]
+        query = 'SELECT * FROM runs'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY started DESC LIMIT ?'
+        with self._lock:
+            rows = self._conn.execute(
+                query, [value for value in filters.values() if value is not None] + [limit]
+            ).fetchall()
+        return [self._run_dict(row) for row in rows]
+
+    async def record_run(
+            self,
+            run_id: str,
+            steps: AsyncIterator[dict],
+            case: CaseModel,
+            params: dict,
+            setting_id: str = None,
+            session_id: str = None
+    ) -> AsyncIterator[dict]:
+        """
+        Pass the step data of a running simulation through, storing each step
+        with the time it took to produce (time spent by the consumer excluded).
+
+        The run ends as "complete", "failed" (with the error) or "cancelled"
+        when the consumer stops early.
+        """
+        await asyncio.to_thread(self.start_run, run_id, case, params, setting_id, session_id)
+        run_started = time.perf_counter()
+        status, error = 'cancelled', None
+        try:
+            started = time.perf_counter()
+            async with aclosing(steps):
+                async for step_data in steps:
+                    wall_time = round(time.perf_counter() - started, 6)
+                    await asyncio.to_thread(self.record_step, run_id, step_data['step'], step_data, wall_time)
+                    yield step_data
+                    started = time.perf_counter()
+            status = 'complete'
+        except Exception as e:
+            status, error = 'failed', str(e)
+            raise
+        finally:
+            # also reached when the consumer closes the generator, keep it synchronous
+            self.finish_run(run_id, status, error, round(time.perf_counter() - run_started, 6))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_registries: dict[str, RunRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_run_registry(path: str = None) -> RunRegistry:
+    """
+    Process-wide registry instance per database file.
+
+    Args:
+        path: Database file, defaults to BIOSIM_RUNS_DB, then
+            ``runs.sqlite`` in the output directory.
+    """
+    path = os.path.abspath(path or os.getenv('BIOSIM_RUNS_DB') or os.path.join(get_output_dir(), 'runs.sqlite'))
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = RunRegistry(path)
+        return _registries[path]
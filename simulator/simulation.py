@@ -1,320 +1,476 @@
 import os
 import json
+import time
 import asyncio
-from simulator.agents import BioAgent, EnvAgent
-import matplotlib.pyplot as plt
+from collections import deque
+from contextlib import aclosing
+import numpy as np
+from simulator.agents import BioAgent, EnvAgent, JointAgent
 
 from simulator.utils import get_project_root
 
-from simulator.types import CaseModel
+from simulator.types import CaseModel, BioModel
+from simulator.providers import get_provider
+from simulator.metrics import track_step
+from simulator.rendering import new_run_id, render_result_plots
+from simulator.trajectories import numeric_trajectories
+from simulator.trace import RecordingProvider, TraceWriter, replay_simulation
+from simulator.dynamics import NATIVE, INVASIVE, parameters_from_case, simulate, fit_log_rates
 
 # Load cases but don't process them yet
 case_path = os.path.join(get_project_root(), 'data/cases_example.json')
 with open(case_path, 'r', encoding='utf-8') as f:
     cases = json.load(f)
 
-async def run_simulation(time_steps=10, setting_id="setting-1"):
+# papers added with `python -m simulator.ingest`, the example cases win on a clash
+library_path = os.path.join(get_project_root(), 'data/cases_library.json')
+if os.path.exists(library_path):
+    with open(library_path, 'r', encoding='utf-8') as f:
+        cases = {**json.load(f), **cases}
+
+# step at which the environment is changed in favour of the invasive species
+ENV_CHANGE_STEP = 6
+
+SIMULATION_MODES = ('llm', 'numeric', 'hybrid')
+
+
+def make_step_data(CASE, step, native_population, invasive_population, source='llm'):
+    """
+    State of one step as streamed to consumers such as the Gradio demo
+
+    ``source`` tells how the step was produced: "llm", "interpolated"
+    (hybrid runs between keyframes) or "numeric".
+    """
+    return {
+        'step': step,
+        'native_name': CASE.native_specie_name,
+        'invasive_name': CASE.invasive_specie_name,
+        'native_population': native_population,
+        'invasive_population': invasive_population,
+        'env_change': 1 if step == ENV_CHANGE_STEP else 0,
+        'source': source
+    }
+
+
+async def run_numeric_simulation(CASE, time_steps=10, render=True, run_id=None, trajectory=None):
+    """
+    Advance the case with the vectorized competition model of
+    ``simulator.dynamics`` instead of LLM agents.
+
+    Yields the same step data as the agent-driven simulation.
+    """
+    params = parameters_from_case(CASE, event_step=ENV_CHANGE_STEP)
+    populations, densities = simulate(params, time_steps)
+    if trajectory is not None:
+        trajectory.write_all(numeric_trajectories(populations, densities, trajectory.store.variables)[0])
+    populations = populations[0].round().astype(int)
+    densities = densities[0].round().astype(int)
+
+    for i in range(time_steps):
+        yield make_step_data(
+            CASE, i, int(populations[i + 1, NATIVE]), int(populations[i + 1, INVASIVE]), source='numeric'
+        )
+
+    if render:
+        await render_result_plots(
+            CASE,
+            list(range(1, time_steps + 1)),
+            populations[1:, NATIVE].tolist(),
+            populations[1:, INVASIVE].tolist(),
+            densities[:, NATIVE].tolist(),
+            densities[:, INVASIVE].tolist(),
+            [1 if i == ENV_CHANGE_STEP else 0 for i in range(time_steps)],
+            run_id=run_id
+        )
+
+def is_keyframe(step, keyframe_interval, keyframe_steps):
+    """
+    Whether a hybrid run asks the LLM agents at this step
+    """
+    return step % keyframe_interval == 0 or step in keyframe_steps
+
+
+def bio_state(bio_agent_native, bio_agent_invasive):
+    """
+    Latest number and density of both species as
+    [native num, native density, invasive num, invasive density]
+    """
+    native = bio_agent_native.life_memory[-1]
+    invasive = bio_agent_invasive.life_memory[-1]
+    return np.array([
+        native['specie_num'], native['specie_density'],
+        invasive['specie_num'], invasive['specie_density']
+    ], dtype=np.float64)
+
+
+def record_bio_state(state, bio_agent_native, bio_agent_invasive):
+    """
+    Store an interpolated state in both agents' memories
+    """
+    values = state.round().astype(int).tolist()
+    bio_agent_native.life_memory.append(
+        BioModel(specie_num=values[0], specie_density=values[1]).model_dump()
+    )
+    bio_agent_invasive.life_memory.append(
+        BioModel(specie_num=values[2], specie_density=values[3]).model_dump()
+    )
+
+
+def environment_instruction(step):
+    """
+    External factor injected into the environment prediction at ``step``, if any
+    """
+    # inject more favourable conditions for invasive species: Zebra Mussel
+    if step == ENV_CHANGE_STEP:
+        return "Environment more favourable for invasive species, suppress native species"
+    return None
+
+
+def agent_status_list(bio_agent_native, bio_agent_invasive):
+    """
+    Current status and recent history of both species for the environment agent
+    """
+    return [
+        {
+            "bio_name": bio_agent_invasive.bio_name,
+            "bio_num": bio_agent_invasive.life_memory[-1]['specie_num'],
+            "bio_density": bio_agent_invasive.life_memory[-1]['specie_density'],
+            "characteristics": "invasive",
+            "bio_status_list": bio_agent_invasive.get_current_bio_status_list()
+        },
+        {
+            "bio_name": bio_agent_native.bio_name,
+            "bio_num": bio_agent_native.life_memory[-1]['specie_num'],
+            "bio_density": bio_agent_native.life_memory[-1]['specie_density'],
+            "characteristics": "native",
+            "bio_status_list": bio_agent_native.get_current_bio_status_list()
+        }
+    ]
+
+
+def life_prediction_inputs(bio_agent, competitor, current_environment):
+    """
+    Keyword arguments of ``predict_life``/``build_life_messages`` for one bio agent
+    """
+    return {
+        'competitor_name': competitor.bio_name,
+        'competitor_num': competitor.life_memory[-1]['specie_num'],
+        'competitor_density': competitor.life_memory[-1]['specie_density'],
+        'competitor_status_list': competitor.get_current_bio_status_list(),
+        'current_environment': current_environment,
+    }
+
+
+async def predict_step(step, CASE, env_agent, bio_agent_native, bio_agent_invasive):
+    """
+    Ask both bio agents and the environment agent for the next month.
+    Each agent stores its prediction in its own memory.
+    """
+    env_current_status = env_agent.get_current_environment_status()
+
+    # collaborative reasoning, every agent sees the state before this step
+    reasoning_tasks = [
+        bio_agent_invasive.predict_life(
+            **life_prediction_inputs(bio_agent_invasive, bio_agent_native, env_current_status)
+        ),
+        bio_agent_native.predict_life(
+            **life_prediction_inputs(bio_agent_native, bio_agent_invasive, env_current_status)
+        ),
+        env_agent.predict_environment(
+            agent_status_list=agent_status_list(bio_agent_native, bio_agent_invasive),
+            env_change_condition=CASE.weather_changing_description,
+            user_instruction=environment_instruction(step)
+        ),
+    ]
+
+    await asyncio.gather(*reasoning_tasks)
+
+
+async def run_simulation(
+        time_steps=10,
+        setting_id="setting-1",
+        provider=None,
+        trace_path=None,
+        replay_path=None,
+        render=True,
+        mode="llm",
+        keyframe_interval=3,
+        keyframe_steps=None,
+        fit_window=2,
+        joint_step=False,
+        run_id=None,
+        case=None,
+        registry=None,
+        session_id=None,
+        trajectory=None
+):
     """
     Run simulation with specified setting
     
     Args:
         time_steps: Number of time steps to simulate
         setting_id: ID of the case setting to use (e.g., "setting-1", "setting-2")
+        provider: LLM provider shared by all agents of the run. Defaults to
+            the one selected by the BIOSIM_PROVIDER environment variable.
+        trace_path: If given, write a trace of every step (prompts, parsed
+            outputs, timings and memory entries) to this new file, one run
+            per file. Not supported in numeric mode.
+        replay_path: If given, re-emit the steps of a recorded trace instead
+            of running any agent.
+        render: Save the result plots to the output directory once the run
+            is finished. Ensembles turn this off for their replicas.
+        mode: "llm" to drive the species and environment with LLM agents,
+            "numeric" for the fast Lotka-Volterra competition model, "hybrid"
+            to call the agents only at keyframes and extrapolate in between.
+        keyframe_interval: Hybrid mode calls the agents every this many steps,
+            i.e. roughly this many times fewer LLM calls.
+        keyframe_steps: Extra hybrid keyframes, defaults to the environment
+            change step.
+        fit_window: Number of most recent LLM transitions the hybrid growth
+            rates are fitted on.
+        joint_step: Predict both species and the environment in one
+            structured call per step instead of three.
+        run_id: Run the result plots belong to, they are saved under
+            output/<run_id>/ so concurrent runs never overwrite each other.
+            A new run id is made if None.
+        case: Case to simulate instead of looking ``setting_id`` up in the
+            example cases, e.g. one extracted from an uploaded paper.
+            ``setting_id`` is then only a label.
+        registry: RunRegistry to store the run in (case, parameters and
+            every step).
+        session_id: Owner of the run in the registry, e.g. a Gradio session.
+        trajectory: TrajectoryRun receiving the numeric state (species and
+            environment variables) of every step, initial state included.
     """
+    if replay_path:
+        print(f"Replaying simulation from {replay_path}...")
+        async for step_data in replay_simulation(replay_path):
+            yield step_data
+        return
+
     print("Starting simulation in simulator...")
     
     # Get the specific case data
-    if setting_id not in cases:
+    if case is not None:
+        CASE = case if isinstance(case, CaseModel) else CaseModel(**case)
+    elif setting_id in cases:
+        CASE = CaseModel(**cases[setting_id])
+    else:
         raise ValueError(f"Unknown setting ID: {setting_id}")
-    
-    case_data = cases[setting_id]
-    CASE = CaseModel(**case_data)
+
+    if mode not in SIMULATION_MODES:
+        raise ValueError(f"Unknown simulation mode: {mode}")
+    if mode == 'numeric' and trace_path:
+        # traces record agent calls, a numeric run makes none
+        raise ValueError("trace_path is not supported in numeric mode")
+    if keyframe_interval < 1:
+        raise ValueError("keyframe_interval must be at least 1")
+    if keyframe_steps is None:
+        keyframe_steps = {ENV_CHANGE_STEP}
+    run_id = run_id or new_run_id()
+    if registry is not None:
+        params = {
+            'time_steps': time_steps,
+            'mode': mode,
+            'keyframe_interval': keyframe_interval,
+            'keyframe_steps': sorted(keyframe_steps),
+            'fit_window': fit_window,
+            'joint_step': joint_step,
+            'trace_path': trace_path,
+        }
+        steps = run_simulation(
+            time_steps=time_steps,
+            setting_id=setting_id,
+            provider=provider,
+            trace_path=trace_path,
+            render=render,
+            mode=mode,
+            keyframe_interval=keyframe_interval,
+            keyframe_steps=keyframe_steps,
+            fit_window=fit_window,
+            joint_step=joint_step,
+            run_id=run_id,
+            case=CASE,
+            trajectory=trajectory
+        )
+        # closed with this generator, so a consumer stopping early marks the run cancelled
+        async with aclosing(registry.record_run(
+                run_id, steps, CASE, params, setting_id=setting_id, session_id=session_id
+        )) as recorded:
+            async for step_data in recorded:
+                yield step_data
+        return
+    if mode == 'numeric':
+        async for step_data in run_numeric_simulation(
+                CASE, time_steps=time_steps, render=render, run_id=run_id, trajectory=trajectory
+        ):
+            yield step_data
+        return
     
     # Add tracking lists for plotting
     time_steps_x = []
     native_population = []
     invasive_population = []
     env_changes = []  # Track environmental changes
+    llm_transitions = deque(maxlen=fit_window)  # (before, after) states of recent LLM steps
     
     print(f'initializing agents...')
 
-    env_agent = EnvAgent()
-    env_model = env_agent.initialize_environment(case_model=CASE)
+    provider = provider or get_provider()
 
-    bio_agent_native = BioAgent()
-    bio_agent_native.initialize_life(
-        bio_name=CASE.native_specie_name,
-        bio_role='native specie',
-        bio_num=CASE.native_specie_initial_number,
-        bio_density=CASE.native_specie_initial_density
-    )
+    trace = None
+    run_started = time.perf_counter()
+    try:
+        if trace_path:
+            provider = RecordingProvider(provider)
+            trace = await asyncio.to_thread(TraceWriter, trace_path)
+            await asyncio.to_thread(
+                trace.write_header,
+                run_id=run_id,
+                setting_id=setting_id,
+                time_steps=time_steps,
+                case=CASE.model_dump()
+            )
 
-    bio_agent_invasive = BioAgent()
-    bio_agent_invasive.initialize_life(
-        bio_name=CASE.invasive_specie_name,
-        bio_role='invasive specie',
-        bio_num=CASE.invasive_specie_initial_number,
-        bio_density=CASE.invasive_specie_initial_density
-    )
+        # bootstrap the environment while the bio agents are set up
+        env_agent = EnvAgent(provider=provider)
+        env_init_task = asyncio.create_task(
+            env_agent.ainitialize_environment(case_model=CASE)
+        )
 
-    print(f'agents initialized.')
-    print(f'starting simulation...')
+        bio_agent_native = BioAgent(provider=provider)
+        bio_agent_native.initialize_life(
+            bio_name=CASE.native_specie_name,
+            bio_role='native specie',
+            bio_num=CASE.native_specie_initial_number,
+            bio_density=CASE.native_specie_initial_density
+        )
 
-    # Get reference rates from case data
-    invasive_growth_upper = CASE.invasive_specie_growth_upper if hasattr(CASE, 'invasive_specie_growth_upper') else 25
-    invasive_growth_lower = CASE.invasive_specie_growth_lower if hasattr(CASE, 'invasive_specie_growth_lower') else 15
-    # Convert positive decline rates to negative for plotting
-    native_decline_upper = -abs(CASE.native_specie_decline_upper) if hasattr(CASE, 'native_specie_decline_upper') else -5
-    native_decline_lower = -abs(CASE.native_specie_decline_lower) if hasattr(CASE, 'native_specie_decline_lower') else -15
+        bio_agent_invasive = BioAgent(provider=provider)
+        bio_agent_invasive.initialize_life(
+            bio_name=CASE.invasive_specie_name,
+            bio_role='invasive specie',
+            bio_num=CASE.invasive_specie_initial_number,
+            bio_density=CASE.invasive_specie_initial_density
+        )
 
-    # Calculate average rates
-    invasive_avg_rate = (invasive_growth_upper + invasive_growth_lower) / 2
-    native_avg_rate = (native_decline_upper + native_decline_lower) / 2  # Will be negative
+        env_model = await env_init_task
+        joint_agent = JointAgent(env_agent, bio_agent_native, bio_agent_invasive, provider=provider) \
+            if joint_step else None
 
-    # Reference data points for 12 months
-    months = list(range(1, 13))
-    
-    # Reference data for Invasive species
-    invasive_ref_rate = [invasive_avg_rate] * 12
-    plt.plot(months, invasive_ref_rate, 'r--', linewidth=1.5, 
-             label=f'Reference: {CASE.invasive_specie_name} ({invasive_avg_rate}% monthly growth)')
-    
-    # Reference data for Native species (already negative)
-    native_ref_rate = [native_avg_rate] * 12
-    plt.plot(months, native_ref_rate, 'g--', linewidth=1.5, 
-             label=f'Reference: {CASE.native_specie_name} ({abs(native_avg_rate)}% monthly decline)')
-    
-    # Add shaded regions for reference ranges
-    plt.fill_between(months, [invasive_growth_lower]*12, [invasive_growth_upper]*12, 
-                    color='red', alpha=0.1, 
-                    label=f'Reference Range: {CASE.invasive_specie_name} ({invasive_growth_lower}-{invasive_growth_upper}%)')
-    plt.fill_between(months, [native_decline_lower]*12, [native_decline_upper]*12, 
-                    color='green', alpha=0.1, 
-                    label=f'Reference Range: {CASE.native_specie_name} ({abs(native_decline_upper)}-{abs(native_decline_lower)}% decline)')
-    
-    # run for each time step
-    for i in range(time_steps):
-        time_steps_x.append(i + 1)
-        env_changes.append(1 if i == 6 else 0)  # Mark when we inject environmental change
-        print(f'running time step {i + 1} / {time_steps}...')
-
-        bio_agent_invasive_num = bio_agent_invasive.life_memory[-1]['specie_num']
-        bio_agent_invasive_density = bio_agent_invasive.life_memory[-1]['specie_density']
-        bio_agent_invasive_status_list = bio_agent_invasive.get_current_bio_status_list()
-
-        bio_agent_native_num = bio_agent_native.life_memory[-1]['specie_num']
-        bio_agent_native_density = bio_agent_native.life_memory[-1]['specie_density']
-        bio_agent_native_status_list = bio_agent_native.get_current_bio_status_list()
-
-        env_current_status = env_agent.get_current_environment_status()
-
-        # collaborative reasoning
-        reasoning_tasks = []
-
-        reasoning_tasks.append(
-            bio_agent_invasive.predict_life(
-                competitor_name=bio_agent_native.bio_name,
-                competitor_num=bio_agent_native_num,
-                competitor_density=bio_agent_native_density,
-                competitor_status_list=bio_agent_native_status_list,
-                current_environment=env_current_status
+        print(f'agents initialized.')
+        if trajectory is not None:
+            trajectory.record(
+                0, bio_agent_native.life_memory[-1], bio_agent_invasive.life_memory[-1], env_agent.environment_memory[-1]
             )
-        )
-
-        reasoning_tasks.append(
-            bio_agent_native.predict_life(
-                competitor_name=bio_agent_invasive.bio_name,
-                competitor_num=bio_agent_invasive_num,
-                competitor_density=bio_agent_invasive_density,
-                competitor_status_list=bio_agent_invasive_status_list,
-                current_environment=env_current_status
+        if trace:
+            await asyncio.to_thread(
+                trace.write,
+                'init',
+                calls=provider.drain(),
+                memory={
+                    'native': bio_agent_native.life_memory[-1],
+                    'invasive': bio_agent_invasive.life_memory[-1],
+                    'environment': env_agent.environment_memory[-1],
+                }
             )
-        )
+        print(f'starting simulation...')
+
+        # run for each time step
+        for i in range(time_steps):
+            step_started = time.perf_counter()
+            time_steps_x.append(i + 1)
+            env_changes.append(1 if i == ENV_CHANGE_STEP else 0)  # Mark when we inject environmental change
+            print(f'running time step {i + 1} / {time_steps}...')
+
+            # closed before the yield, the consumer may resume this generator in another context
+            with track_step(i, mode):
+                if mode == 'llm' or is_keyframe(i, keyframe_interval, keyframe_steps):
+                    before = bio_state(bio_agent_native, bio_agent_invasive)
+                    if joint_agent is not None:
+                        await joint_agent.predict_joint(
+                            env_change_condition=CASE.weather_changing_description,
+                            user_instruction=environment_instruction(i)
+                        )
+                    else:
+                        await predict_step(i, CASE, env_agent, bio_agent_native, bio_agent_invasive)
+                    after = bio_state(bio_agent_native, bio_agent_invasive)
+                    llm_transitions.append((before, after))
+                    interpolated_state = after
+                    source = 'llm'
+                else:
+                    # advance with the rates of the most recent LLM transitions
+                    rates = fit_log_rates(
+                        np.array([before for before, _ in llm_transitions]),
+                        np.array([after for _, after in llm_transitions])
+                    )
+                    interpolated_state = interpolated_state * np.exp(rates)
+                    record_bio_state(interpolated_state, bio_agent_native, bio_agent_invasive)
+                    source = 'interpolated'
 
-        # inject more favourable conditions for invasive species: Zebra Mussel
-        if i == 6:
-            user_instruction = "Environment more favourable for invasive species, suppress native species"
-
-            reasoning_tasks.append(
-                env_agent.predict_environment(
-                    agent_status_list=[
-                        {
-                            "bio_name": bio_agent_invasive.bio_name,
-                            "bio_num": bio_agent_invasive_num,
-                            "bio_density": bio_agent_invasive_density,
-                            "characteristics": "invasive",
-                            "bio_status_list": bio_agent_invasive_status_list
-                        },
-                        {
-                            "bio_name": bio_agent_native.bio_name,
-                            "bio_num": bio_agent_native_num,
-                            "bio_density": bio_agent_native_density,
-                            "characteristics": "native",
-                            "bio_status_list": bio_agent_native_status_list
-                        }
-                    ],
-                    env_change_condition=CASE.weather_changing_description,
-                    user_instruction=user_instruction
+            if trajectory is not None:
+                trajectory.record(
+                    i + 1,
+                    bio_agent_native.life_memory[-1],
+                    bio_agent_invasive.life_memory[-1],
+                    env_agent.environment_memory[-1]
                 )
+
+            # Store data for plotting
+            native_population.append(bio_agent_native.life_memory[-1]['specie_num'])
+            invasive_population.append(bio_agent_invasive.life_memory[-1]['specie_num'])
+        
+            # After processing each step, yield the current state
+            current_state = make_step_data(
+                CASE,
+                i,
+                bio_agent_native.life_memory[-1]['specie_num'],
+                bio_agent_invasive.life_memory[-1]['specie_num'],
+                source=source
             )
-        else:
-            reasoning_tasks.append(
-                env_agent.predict_environment(
-                    agent_status_list=[
-                        {
-                            "bio_name": bio_agent_invasive.bio_name,
-                            "bio_num": bio_agent_invasive_num,
-                            "bio_density": bio_agent_invasive_density,
-                            "characteristics": "invasive",
-                            "bio_status_list": bio_agent_invasive_status_list
-                        },
-                        {
-                            "bio_name": bio_agent_native.bio_name,
-                            "bio_num": bio_agent_native_num,
-                            "bio_density": bio_agent_native_density,
-                            "characteristics": "native",
-                            "bio_status_list": bio_agent_native_status_list
-                        }
-                    ],
-                    env_change_condition=CASE.weather_changing_description,
-                    user_instruction=None
+            if trace:
+                await asyncio.to_thread(
+                    trace.write,
+                    'step',
+                    step_data=current_state,
+                    calls=provider.drain(),
+                    wall_time=round(time.perf_counter() - step_started, 6),
+                    memory={
+                        'native': bio_agent_native.life_memory[-1],
+                        'invasive': bio_agent_invasive.life_memory[-1],
+                        'environment': env_agent.environment_memory[-1],
+                    }
                 )
-            )
+            print(f"Yielding step {i + 1} data")  # Debug print
+            yield current_state
 
-        await asyncio.gather(*reasoning_tasks)
+            print("\n" + "="*30 + "\n")
 
-        # Store data for plotting
-        native_population.append(bio_agent_native.life_memory[-1]['specie_num'])
-        invasive_population.append(bio_agent_invasive.life_memory[-1]['specie_num'])
-        
-        # After processing each step, yield the current state
-        current_state = {
-            'step': i,
-            'native_name': CASE.native_specie_name,
-            'invasive_name': CASE.invasive_specie_name,
-            'native_population': bio_agent_native.life_memory[-1]['specie_num'],
-            'invasive_population': bio_agent_invasive.life_memory[-1]['specie_num'],
-            'env_change': 1 if i == 6 else 0
-        }
-        print(f"Yielding step {i + 1} data")  # Debug print
-        yield current_state
-
-        print("\n" + "="*30 + "\n")
+        if trace:
+            await asyncio.to_thread(trace.write, 'end', wall_time=round(time.perf_counter() - run_started, 6))
+    except BaseException as e:
+        # cancelled, closed early by the consumer or failed, written synchronously as the task may be cancelled
+        if trace:
+            trace.write('aborted', reason=type(e).__name__, wall_time=round(time.perf_counter() - run_started, 6))
+        raise
+    finally:
+        if trace:
+            trace.close()
 
-    # Create plots after simulation
-    plt.figure(figsize=(12, 6))
-    
-    # Plot species populations
-    plt.plot(time_steps_x, native_population, 'g-', linewidth=2, label=f'Native Species ({CASE.native_specie_name})')
-    plt.plot(time_steps_x, invasive_population, 'r-', linewidth=2, label=f'Invasive Species ({CASE.invasive_specie_name})')
-    
-    # Add vertical line for environmental change
-    for i, change in enumerate(env_changes):
-        if change:
-            plt.axvline(x=time_steps_x[i], color='blue', linestyle='--', alpha=0.5, 
-                       label='Environmental Change')
-    
-    plt.xlabel('Time Steps (Months)')
-    plt.ylabel('Population')
-    plt.title('Species Population Changes Over Time')
-    plt.legend(loc='upper right')
-    plt.grid(True)
-    
-    # Save the plot
-    output_dir = os.path.join(get_project_root(), 'output')
-    os.makedirs(output_dir, exist_ok=True)
-    plt.savefig(os.path.join(output_dir, 'simulation_results.png'))
-    plt.close()
-    
-    print(f"Plot saved as 'simulation_results.png' in the output directory")
+    if not render:
+        return
 
-    # After the simulation loop ends, calculate monthly rates
-    native_population_rates = []
-    invasive_population_rates = []
-    native_density_rates = []
-    invasive_density_rates = []
-    
-    # Calculate monthly rates (percentage change)
-    for i in range(1, len(time_steps_x)):
-        # Population rates
-        native_pop_rate = ((native_population[i] - native_population[i-1]) / native_population[i-1]) * 100
-        invasive_pop_rate = ((invasive_population[i] - invasive_population[i-1]) / invasive_population[i-1]) * 100
-        
-        # Density rates
-        native_density_current = bio_agent_native.life_memory[i]['specie_density']
-        native_density_prev = bio_agent_native.life_memory[i-1]['specie_density']
-        native_density_rate = ((native_density_current - native_density_prev) / native_density_prev) * 100
-        
-        invasive_density_current = bio_agent_invasive.life_memory[i]['specie_density']
-        invasive_density_prev = bio_agent_invasive.life_memory[i-1]['specie_density']
-        invasive_density_rate = ((invasive_density_current - invasive_density_prev) / invasive_density_prev) * 100
-        
-        native_population_rates.append(native_pop_rate)
-        invasive_population_rates.append(invasive_pop_rate)
-        native_density_rates.append(native_density_rate)
-        invasive_density_rates.append(invasive_density_rate)
-    
-    # Print the final average rates
-    print("\nAverage Monthly Growth Rates:")
-    print(f"Native Species:")
-    print(f"  Population: {sum(native_population_rates)/len(native_population_rates):.2f}%")
-    print(f"  Density: {sum(native_density_rates)/len(native_density_rates):.2f}%")
-    print(f"Invasive Species:")
-    print(f"  Population: {sum(invasive_population_rates)/len(invasive_population_rates):.2f}%")
-    print(f"  Density: {sum(invasive_density_rates)/len(invasive_density_rates):.2f}%")
-
-    # Create plot for population growth rates
-    plt.figure(figsize=(12, 6))
-    
-    # Plot simulation results
-    plt.plot(time_steps_x[1:], native_population_rates, 'g-', linewidth=2, 
-             label=f'Simulation: Native Species ({CASE.native_specie_name})')
-    plt.plot(time_steps_x[1:], invasive_population_rates, 'r-', linewidth=2, 
-             label=f'Simulation: Invasive Species ({CASE.invasive_specie_name})')
-    
-    # Add reference data from paper
-    # Create reference data points for 12 months
-    months = list(range(1, 13))
-    
-    # Reference data for Invasive species
-    plt.plot(months, invasive_ref_rate, 'r--', linewidth=1.5, 
-             label=f'Reference: {CASE.invasive_specie_name} ({invasive_avg_rate}% monthly growth)')
-    
-    # Reference data for Native species (already negative)
-    plt.plot(months, native_ref_rate, 'g--', linewidth=1.5, 
-             label=f'Reference: {CASE.native_specie_name} ({abs(native_avg_rate)}% monthly decline)')
-    
-    # Add shaded regions for reference ranges
-    plt.fill_between(months, [invasive_growth_lower]*12, [invasive_growth_upper]*12, 
-                    color='red', alpha=0.1, 
-                    label=f'Reference Range: {CASE.invasive_specie_name} ({invasive_growth_lower}-{invasive_growth_upper}%)')
-    plt.fill_between(months, [native_decline_lower]*12, [native_decline_upper]*12, 
-                    color='green', alpha=0.1, 
-                    label=f'Reference Range: {CASE.native_specie_name} ({abs(native_decline_upper)}-{abs(native_decline_lower)}% decline)')
-    
-    # Add vertical line for environmental change
-    for i, change in enumerate(env_changes[1:], 1):
-        if change:
-            plt.axvline(x=time_steps_x[i], color='blue', linestyle='--', alpha=0.5,
-                       label='Environmental Change')
-    
-    plt.xlabel('Time Steps (Months)')
-    plt.ylabel('Population Growth Rate (%)')
-    plt.title('Monthly Population Growth Rates\n(Simulation vs Reference Data)')
-    plt.legend(loc='center left', bbox_to_anchor=(1, 0.5))
-    plt.grid(True)
-    plt.axhline(y=0, color='k', linestyle='--', alpha=0.3)
-    
-    # Adjust layout to prevent legend cutoff
-    plt.tight_layout()
-    
-    # Save the growth rates plot
-    output_dir = os.path.join(get_project_root(), 'output')
-    os.makedirs(output_dir, exist_ok=True)
-    plt.savefig(os.path.join(output_dir, 'monthly_growth_rates.png'), bbox_inches='tight')
-    plt.close()
-    
-    print(f"Monthly growth rates plot saved as 'monthly_growth_rates.png' in the output directory")
+    # render in the worker pool, the plots only need plain data
+    await render_result_plots(
+        CASE,
+        time_steps_x,
+        native_population,
+        invasive_population,
+        [record['specie_density'] for record in bio_agent_native.life_memory],
+        [record['specie_density'] for record in bio_agent_invasive.life_memory],
+        env_changes,
+        run_id=run_id
+    )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+import os
+import gzip
+import json
+import time
+import asyncio
+from typing import AsyncIterator, Iterator
+
+from simulator.providers import BaseProvider
+
+TRACE_VERSION = 1
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class RecordingProvider(BaseProvider):
+    """
+    Pass calls through to a provider and keep the prompt, parsed output and
+    latency of each one until the next ``drain()``.
+    """
+
+    def __init__(self, provider: BaseProvider):
+        self.provider = provider
+        self.calls = []
+
+    def _record(self, messages, model, response_format, output, started):
+        self.calls.append({
+            'model': model,
+            'schema': response_format.__name__,
+            'messages': messages,
+            'output': output.model_dump(),
+            'latency': round(time.perf_counter() - started, 6),
+        })
+
+    def parse(self, messages, model, response_format):
+        started = time.perf_counter()
+        output = self.provider.parse(messages, model, response_format)
+        self._record(messages, model, response_format, output, started)
+        return output
+
+    async def aparse(self, messages, model, response_format):
+        started = time.perf_counter()
+        output = await self.provider.aparse(messages, model, response_format)
+        self._record(messages, model, response_format, output, started)
+        return output
+
+    def drain(self) -> list[dict]:
+        calls, self.calls = self.calls, []
+        return calls
+
+
+class TraceWriter(object):
+    """
+    JSON lines trace of one simulation run.
+
+    Every record is written and flushed as soon as it is known, so a trace
+    of an interrupted run is still readable up to its last step. The file
+    must not exist yet, so runs never share or interleave in a trace. Paths
+    ending in ``.gz`` are gzip compressed.
+
+    Record types:
+        header: run parameters and the case
+        init: calls and memory entries of agent initialization
+        step: ``step_data`` as yielded to consumers, calls made during the
+            step, step wall time and the memory entries the step produced
+        end: total wall time
+        aborted: reason and wall time of a run that failed or was stopped
+            before its last step
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = _open(path, 'x')
+
+    def write(self, record_type: str, **fields):
+        self._file.write(_dumps({'type': record_type, **fields}) + '\n')
+        self._file.flush()
+
+    def write_header(self, **fields):
+        self.write('header', version=TRACE_VERSION, created_at=time.time(), **fields)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_trace(path: str) -> Iterator[dict]:
+    with _open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def replay_simulation(path: str, delay: float = 0.0) -> AsyncIterator[dict]:
+    """
+    Re-emit the ``step_data`` stream of a recorded run without any agent.
+
+    Args:
+        path: Trace written by ``run_simulation(trace_path=...)``.
+        delay: Optional pause between steps in seconds, e.g. for demos.
+    """
+    headers = 0
+    for record in read_trace(path):
+        if record['type'] == 'header':
+            if record.get('version', TRACE_VERSION) > TRACE_VERSION:
+                raise ValueError(f"Unsupported trace version: {record['version']}")
+            headers += 1
+            # traces written before one run per file may hold several runs, replay the first one
+            if headers > 1:
+                break
+        if record['type'] != 'step':
+            continue
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield record['step_data']
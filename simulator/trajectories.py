@@ -0,0 +1,325 @@
+import os
+import json
+import warnings
+import threading
+import contextlib
+from typing import Union
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory file locks (Windows), a store then has one writing process at a time
+    fcntl = None
+
+import numpy as np
+from pydantic import BaseModel
+
+from simulator.types import EnvironmentModel
+from simulator.utils import flatten_dict
+from simulator.dynamics import NATIVE, INVASIVE
+
+BIO_VARIABLES = (
+    'native.specie_num',
+    'native.specie_density',
+    'invasive.specie_num',
+    'invasive.specie_density',
+)
+
+META_FILE = 'trajectories.json'
+DATA_FILE = 'trajectories.bin'
+LOCK_FILE = 'trajectories.lock'
+
+
+def numeric_fields(model: type[BaseModel], prefix: str = '') -> list[str]:
+    """
+    Dotted names of the int/float fields of a (nested) model, in declaration
+    order, matching the keys of ``flatten_dict(model.model_dump())``
+    """
+    names = []
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            names += numeric_fields(annotation, prefix=f'{prefix}{name}.')
+        elif annotation in (int, float):
+            names.append(f'{prefix}{name}')
+    return names
+
+
+# free-text environment fields stay in traces and the run registry, arrays only hold numbers
+ENVIRONMENT_VARIABLES = tuple(f'environment.{name}' for name in numeric_fields(EnvironmentModel))
+TRAJECTORY_VARIABLES = BIO_VARIABLES + ENVIRONMENT_VARIABLES
+
+
+def state_row(
+        native: dict,
+        invasive: dict,
+        environment: dict = None,
+        variables=TRAJECTORY_VARIABLES
+) -> np.ndarray:
+    """
+    One step of a run as a flat row, NaN for variables that are missing.
+
+    Args:
+        native: Native life memory record
+        invasive: Invasive life memory record
+        environment: Environment memory record, None when not simulated
+        variables: Variable order of the row
+    """
+    flat = {
+        **flatten_dict(native, prefix='native.'),
+        **flatten_dict(invasive, prefix='invasive.'),
+        **flatten_dict(environment or {}, prefix='environment.'),
+    }
+    row = np.full(len(variables), np.nan)
+    for index, name in enumerate(variables):
+        value = flat.get(name)
+        if isinstance(value, (int, float)):
+            row[index] = value
+    return row
+
+
+def numeric_trajectories(
+        populations: np.ndarray,
+        densities: np.ndarray,
+        variables=TRAJECTORY_VARIABLES
+) -> np.ndarray:
+    """
+    (P, T + 1, V) trajectories of ``dynamics.simulate`` output, ready for
+    ``TrajectoryStore.append_runs``. The environment is not simulated there
+    and stays NaN.
+    """
+    trajectories = np.full(populations.shape[:2] + (len(variables),), np.nan)
+    columns = {
+        'native.specie_num': populations[:, :, NATIVE],
+        'native.specie_density': densities[:, :, NATIVE],
+        'invasive.specie_num': populations[:, :, INVASIVE],
+        'invasive.specie_density': densities[:, :, INVASIVE],
+    }
+    for name, values in columns.items():
+        if name in variables:
+            trajectories[:, :, variables.index(name)] = values
+    return trajectories
+
+
+class TrajectoryStore(object):
+    """
+    Columnar on-disk trajectories of many runs, as one memory-mapped
+    (runs, steps, variables) array of a fixed dtype.
+
+    Runs are contiguous in the file, so adding runs only appends to it and
+    existing maps stay valid. Step 0 is the initial state, step ``i + 1``
+    the state after simulation step ``i``. Reserved runs are NaN until their
+    steps are written, so failed or unfinished runs drop out of NaN-aware
+    aggregates on their own. Reads are NumPy views of the map, nothing is
+    copied into Python objects. Several processes may add runs to the same
+    store: reservations re-read the run count under a file lock (POSIX
+    only), and each process then writes its own runs.
+
+    Args:
+        path: Directory of the store. Created if missing, reopened otherwise
+        time_steps: Simulation steps per run, required for a new store
+        variables: Variable names, see ``TRAJECTORY_VARIABLES``
+        dtype: Dtype of every value
+        readonly: Open an existing store for reading only
+    """
+
+    def __init__(
+            self,
+            path: str,
+            time_steps: int = None,
+            variables=TRAJECTORY_VARIABLES,
+            dtype: str = 'float64',
+            readonly: bool = False
+    ):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._map = None
+
+        meta_path = os.path.join(path, META_FILE)
+        if readonly and not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No trajectory store at {path}")
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        # creating processes must not truncate a store another one just made
+        with contextlib.nullcontext() if readonly else self._file_lock():
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                if time_steps is not None and meta['steps'] != time_steps + 1:
+                    raise ValueError(f"Store {path} holds {meta['steps'] - 1} time steps, not {time_steps}")
+                self._meta = meta
+            elif time_steps is None:
+                raise ValueError("time_steps is required to create a trajectory store")
+            else:
+                meta = {
+                    'variables': list(variables), 'dtype': np.dtype(dtype).name, 'steps': time_steps + 1, 'runs': 0
+                }
+                open(os.path.join(path, DATA_FILE), 'wb').close()
+                self._meta = meta
+                self._write_meta()
+        self.variables = tuple(meta['variables'])
+        self.dtype = np.dtype(meta['dtype'])
+        self.steps = meta['steps']
+        self._index = {name: index for index, name in enumerate(self.variables)}
+
+    @property
+    def n_runs(self) -> int:
+        return self._meta['runs']
+
+    @property
+    def time_steps(self) -> int:
+        return self.steps - 1
+
+    def _write_meta(self):
+        # atomic, so readers never see a run count the data file does not have yet
+        meta_path = os.path.join(self.path, META_FILE)
+        with open(f'{meta_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f)
+        os.replace(f'{meta_path}.tmp', meta_path)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_runs(self) -> int:
+        with open(os.path.join(self.path, META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)['runs']
+
+    def add_runs(self, n: int) -> range:
+        """
+        Reserve ``n`` NaN-filled runs, returning their indices
+        """
+        if self.readonly:
+            raise PermissionError("Trajectory store is read-only")
+        with self._lock, self._file_lock():
+            # another process may have added runs since we last looked
+            start = self._read_runs()
+            blank = np.full((self.steps, len(self.variables)), np.nan, dtype=self.dtype).tobytes()
+            with open(os.path.join(self.path, DATA_FILE), 'ab') as f:
+                for _ in range(n):
+                    f.write(blank)
+            self._meta['runs'] = start + n
+            self._write_meta()
+            self._map = None
+        return range(start, start + n)
+
+    def append_runs(self, trajectories: np.ndarray) -> range:
+        """
+        Append whole (R, steps, V) trajectories, e.g. ``numeric_trajectories`` output
+        """
+        trajectories = np.asarray(trajectories, dtype=self.dtype)
+        if trajectories.shape[1:] != (self.steps, len(self.variables)):
+            raise ValueError(
+                f"Expected trajectories of shape (R, {self.steps}, {len(self.variables)}), got {trajectories.shape}"
+            )
+        runs = self.add_runs(trajectories.shape[0])
+        self.data[runs.start:runs.stop] = trajectories
+        return runs
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        The (runs, steps, variables) memory map
+        """
+        with self._lock:
+            if self._map is None or self._map.shape[0] != self.n_runs:
+                if self.n_runs == 0:
+                    return np.empty((0, self.steps, len(self.variables)), dtype=self.dtype)
+                self._map = np.memmap(
+                    os.path.join(self.path, DATA_FILE),
+                    dtype=self.dtype,
+                    mode='r' if self.readonly else 'r+',
+                    shape=(self.n_runs, self.steps, len(self.variables))
+                )
+            return self._map
+
+    def variable(self, name: str) -> np.ndarray:
+        """
+        (runs, steps) view of one variable
+        """
+        return self.data[:, :, self._index[name]]
+
+    def write(self, run: int, step: int, row: Union[np.ndarray, dict]):
+        """
+        Store one step of a run, ``row`` as from ``state_row`` or a flat dict of variables
+        """
+        if isinstance(row, dict):
+            row = [row.get(name, np.nan) for name in self.variables]
+        self.data[run, step] = row
+
+    def run(self, index: int) -> 'TrajectoryRun':
+        return TrajectoryRun(self, index)
+
+    def refresh(self):
+        """
+        Pick up runs added by another process since the store was opened
+        """
+        runs = self._read_runs()
+        with self._lock:
+            self._meta['runs'] = runs
+
+    def flush(self):
+        if self._map is not None and not self.readonly:
+            self._map.flush()
+
+    def summary(self, name: str, step: int, percentiles=(5, 50, 95), runs: range = None) -> dict:
+        """
+        Mean and percentiles of a variable at a store step over the runs
+        (all, or ``runs``) that reached it
+        """
+        values = self.variable(name)[:, step]
+        if runs is not None:
+            values = values[runs.start:runs.stop]
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {'mean': float('nan'), **{f'p{q:g}': float('nan') for q in percentiles}}
+        summary = {'mean': float(values.mean())}
+        for q, value in zip(percentiles, np.percentile(values, percentiles)):
+            summary[f'p{q:g}'] = float(value)
+        return summary
+
+    def percentiles(self, name: str, q=(5, 50, 95), runs: range = None) -> np.ndarray:
+        """
+        (len(q), steps) percentiles of a variable over the runs, NaN (unfinished) values ignored
+        """
+        values = self.variable(name)
+        if runs is not None:
+            values = values[runs.start:runs.stop]
+        with warnings.catch_warnings():
+            # steps no run reached yet are all NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanpercentile(values, q, axis=0)
+
+
+class TrajectoryRun(object):
+    """
+    Writer for one run of a TrajectoryStore, fed straight from agent memories.
+    """
+
+    def __init__(self, store: TrajectoryStore, index: int):
+        self.store = store
+        self.index = index
+
+    def record(self, step: int, native: dict, invasive: dict, environment: dict = None):
+        self.store.write(self.index, step, state_row(native, invasive, environment, self.store.variables))
+
+    def write_all(self, trajectory: np.ndarray):
+        """
+        Store the whole (steps, variables) trajectory at once, e.g. one run of ``numeric_trajectories``
+        """
+        self.store.data[self.index] = trajectory
+
+    def clear(self, from_step: int = 0):
+        """
+        Reset the steps from ``from_step`` on to NaN, e.g. after the run failed
+        """
+        self.store.data[self.index, from_step:] = np.nan
@@ -1,2 +1,2 @@
-from .types import Model4Use, CaseModel, BioModel
+from .types import Model4Use, CaseModel, BioModel, SpeciesModel, JointStepModel
 from .elements import EnvironmentModel, AbioticModel
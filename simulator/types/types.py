@@ -2,6 +2,8 @@ from enum import Enum
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 
+from .elements import EnvironmentModel
+
 
 class Model4Use(Enum):
     GPT_4o_MINI = "gpt-4o-mini"
@@ -106,4 +108,43 @@ class BioModel(BaseModel):
     specie_density: int = Field(
         title="Specie Density",
         description="The density of species in the environment per unit area.",
-    )
\ No newline at end of file
+    )
+
+
+class SpeciesModel(BaseModel):
+    name: str = Field(
+        title="Specie Name",
+        description="The name of the specie.",
+    )
+
+    role: str = Field(
+        title="Specie Role",
+        description="The role of the specie in the ecosystem, e.g. native or invasive.",
+    )
+
+    initial_number: int = Field(
+        title="Specie Initial Number",
+        description="The initial number of the specie.",
+    )
+
+    initial_density: int = Field(
+        title="Specie Initial Density",
+        description="The initial density of the specie per unit area.",
+    )
+
+
+class JointStepModel(BaseModel):
+    invasive: BioModel = Field(
+        title="Invasive Specie",
+        description="The status of the invasive specie in the next month.",
+    )
+
+    native: BioModel = Field(
+        title="Native Specie",
+        description="The status of the native specie in the next month.",
+    )
+
+    environment: EnvironmentModel = Field(
+        title="Environment",
+        description="The environment data in the next month.",
+    )
@@ -1,5 +1,50 @@
 import os
+import math
 
 
 def get_project_root():
     return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def flatten_dict(data: dict, prefix: str = '') -> dict:
+    """
+    Flatten nested dicts into one level with dotted keys,
+    e.g. {'abiotic': {'climate': {'wind': 1.0}}} -> {'abiotic.climate.wind': 1.0}
+    """
+    flat = {}
+    for key, value in data.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten_dict(value, prefix=f'{name}.'))
+        else:
+            flat[name] = value
+    return flat
+
+
+def unflatten_dict(flat: dict) -> dict:
+    """
+    Inverse of ``flatten_dict``
+    """
+    data = {}
+    for name, value in flat.items():
+        *parents, key = name.split('.')
+        node = data
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return data
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """
+    Linear interpolation percentile of an already sorted list, q in [0, 100]
+    """
+    if not sorted_values:
+        return math.nan
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return float(sorted_values[lower])
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
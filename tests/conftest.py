@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def offline_environment(monkeypatch, tmp_path):
+    # every test runs against the fake backend with private caches
+    monkeypatch.setenv('BIOSIM_PROVIDER', 'fake')
+    monkeypatch.setenv('BIOSIM_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.delenv('BIOSIM_CACHE', raising=False)
+    monkeypatch.delenv('BIOSIM_RPM', raising=False)
+    monkeypatch.delenv('BIOSIM_TPM', raising=False)
+    monkeypatch.setenv('BIOSIM_RUNS_DB', str(tmp_path / 'runs.sqlite'))
+    # result plots of test runs stay out of the project's output directory
+    from simulator import rendering
+    monkeypatch.setattr(rendering, 'get_output_dir', lambda: str(tmp_path / 'output'))
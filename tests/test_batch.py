@@ -0,0 +1,79 @@
+import asyncio
+
+import numpy as np
+
+from simulator.batch import LocalBatchBackend, response_format_param, run_batch_simulation
+from simulator.providers import FakeProvider
+from simulator.providers.base import current_replica
+from simulator.trajectories import TrajectoryStore
+from simulator.types import BioModel
+
+
+class CountingBackend(LocalBatchBackend):
+    def __init__(self, provider=None):
+        super().__init__(provider)
+        self.submitted = []
+
+    def submit(self, input_path):
+        self.submitted.append(input_path)
+        return super().submit(input_path)
+
+
+class FailingProvider(FakeProvider):
+    """
+    Fails every request of one replica once ``fail_after`` requests of it went through
+    """
+
+    def __init__(self, replica, fail_after):
+        super().__init__()
+        self.replica = replica
+        self.remaining = fail_after
+
+    def parse(self, messages, model, response_format):
+        if current_replica.get() == self.replica:
+            if self.remaining <= 0:
+                raise RuntimeError('model refused')
+            self.remaining -= 1
+        return super().parse(messages, model, response_format)
+
+
+def campaign(**kwargs):
+    async def main():
+        return [step_states async for step_states in run_batch_simulation(poll_interval=0, **kwargs)]
+    return asyncio.run(main())
+
+
+def test_response_format_is_strict():
+    param = response_format_param(BioModel)
+    schema = param['json_schema']['schema']
+    assert param['json_schema']['strict'] is True
+    assert schema['additionalProperties'] is False
+    assert sorted(schema['required']) == ['specie_density', 'specie_num']
+
+
+def test_resumed_campaign_does_not_resubmit(tmp_path):
+    work_dir = str(tmp_path / 'batches')
+    backend = CountingBackend()
+    first = campaign(n_replicas=3, time_steps=3, backend=backend, work_dir=work_dir)
+    # one batch for the initialization and one per step
+    assert len(backend.submitted) == 4
+
+    resumed = CountingBackend()
+    second = campaign(n_replicas=3, time_steps=3, backend=resumed, work_dir=work_dir)
+    assert resumed.submitted == []
+    assert first == second
+
+
+def test_failed_replica_is_dropped_and_its_trajectory_cleared(tmp_path):
+    # init is one request, every step three: replica 1 fails in its second step
+    backend = LocalBatchBackend(FailingProvider(replica=1, fail_after=4))
+    store_path = str(tmp_path / 'store')
+    steps = campaign(
+        n_replicas=3, time_steps=3, backend=backend, work_dir=str(tmp_path / 'batches'), trajectory_path=store_path
+    )
+    assert [len(step_states) for step_states in steps] == [3, 2, 2]
+
+    native = TrajectoryStore(store_path, readonly=True).variable('native.specie_num')
+    assert not np.isnan(native[[0, 2]]).any()
+    assert not np.isnan(native[1, :2]).any()
+    assert np.isnan(native[1, 2:]).all()
@@ -0,0 +1,129 @@
+import asyncio
+import sqlite3
+import threading
+
+from pydantic import BaseModel
+
+from simulator.cache import ResponseCache, make_cache_key
+from simulator.metrics import track_call
+from simulator.providers import CachedProvider, FakeProvider
+
+
+class Answer(BaseModel):
+    value: int
+
+
+MESSAGES = [{'role': 'user', 'content': 'hello'}]
+
+
+class CountingProvider(FakeProvider):
+    pass
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    assert cache.get('key') is None
+    cache.set('key', 'value')
+    assert cache.get('key') == 'value'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=300)
+    for index in range(3):
+        cache.set(f'key-{index}', 'x' * 100)
+    # touch the oldest entry, so the second one is now the least recently used
+    cache.get('key-0')
+    cache.set('key-3', 'x' * 100)
+
+    assert cache.get('key-1') is None
+    assert cache.get('key-0') is not None
+    assert cache.get('key-3') is not None
+    assert cache.stats()['bytes'] <= 300
+
+
+def test_running_total_follows_replacements(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=1000)
+    cache.set('key', 'x' * 400)
+    cache.set('key', 'x' * 100)
+    assert cache._total == cache.stats()['bytes'] == 100
+    cache.clear()
+    assert cache._total == 0
+
+
+def test_stored_size_stays_exact_under_concurrent_writers(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    # one instance per thread, i.e. one connection each like separate processes
+    caches = [ResponseCache(path, max_bytes=5000) for _ in range(4)]
+
+    def write(cache, seed):
+        for index in range(60):
+            cache.set(f'key-{(index * seed) % 25}', 'x' * (50 + (index * seed) % 70))
+
+    threads = [threading.Thread(target=write, args=(cache, seed)) for seed, cache in enumerate(caches, 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with sqlite3.connect(path) as conn:
+        stored = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        summed = conn.execute('SELECT SUM(size) FROM entries').fetchone()[0]
+    assert stored == summed <= 5000
+
+
+def test_reads_are_written_in_batches(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ResponseCache(path)
+    cache.set('key', 'value')
+    for _ in range(3):
+        cache.get('key')
+    cache.get('other')
+
+    def stored_hits():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT value FROM counters WHERE name = 'hits'").fetchone()[0]
+
+    assert stored_hits() == 0
+    assert cache.stats()['total_hits'] == 3
+    assert cache.stats()['total_misses'] == 1
+    assert stored_hits() == 3
+
+
+def test_reopened_cache_keeps_entries(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    first = ResponseCache(path)
+    first.set('key', 'value')
+    first.close()
+    assert ResponseCache(path).get('key') == 'value'
+
+
+def test_keys_depend_on_backend():
+    assert make_cache_key('model', MESSAGES, Answer, backend='FakeProvider') != \
+        make_cache_key('model', MESSAGES, Answer, backend='OpenAIProvider')
+
+
+def test_cached_provider_serves_repeats(tmp_path):
+    backend = FakeProvider(seed=1)
+    provider = CachedProvider(backend, ResponseCache(str(tmp_path / 'cache.sqlite')))
+
+    async def call():
+        with track_call('test', 'model', Answer, MESSAGES) as record:
+            output = await provider.aparse(MESSAGES, 'model', Answer)
+        return output, record.cache
+
+    first, first_status = asyncio.run(call())
+    second, second_status = asyncio.run(call())
+    assert (first_status, second_status) == ('miss', 'hit')
+    assert first == second
+    assert backend.call_count == 1
+
+
+def test_cached_answers_are_not_shared_between_backends(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    fake = CachedProvider(FakeProvider(), cache)
+    other = CachedProvider(CountingProvider(), cache)
+    fake.parse(MESSAGES, 'model', Answer)
+    other.parse(MESSAGES, 'model', Answer)
+    assert other.provider.call_count == 1
@@ -0,0 +1,31 @@
+import asyncio
+
+from simulator.providers import ClientRegistry
+
+
+def test_async_clients_are_closed_with_their_loop():
+    registry = ClientRegistry()
+
+    async def use():
+        first = registry.get_async_client(api_key='test')
+        assert registry.get_async_client(api_key='test') is first
+        return first
+
+    first = asyncio.run(use())
+    second = asyncio.run(use())
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
+    assert registry._async_clients == {}
+
+
+def test_aclose_closes_the_clients_of_the_running_loop():
+    registry = ClientRegistry()
+
+    async def main():
+        client = registry.get_async_client(api_key='test')
+        sync_client = registry.get_client(api_key='test')
+        await registry.aclose()
+        return client, sync_client
+
+    client, sync_client = asyncio.run(main())
+    assert client.is_closed() and sync_client.is_closed()
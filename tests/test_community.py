@@ -0,0 +1,58 @@
+import asyncio
+
+import numpy as np
+
+from simulator.community import CommunityState, run_community_simulation, species_from_case
+from simulator.providers import FakeProvider
+from simulator.simulation import cases
+from simulator.types import CaseModel, SpeciesModel
+
+CASE = CaseModel(**cases['setting-1'])
+
+SPECIES = [
+    SpeciesModel(name='oak', role='native specie', initial_number=1000, initial_density=10),
+    SpeciesModel(name='ash', role='native specie', initial_number=0, initial_density=0),
+    SpeciesModel(name='knotweed', role='invasive specie', initial_number=50, initial_density=2),
+]
+
+
+def test_state_lives_in_preallocated_int64_arrays():
+    state = CommunityState(SPECIES, time_steps=4)
+    assert state.populations.shape == state.densities.shape == (3, 5)
+    assert state.populations.dtype == state.densities.dtype == np.int64
+
+    state.record([900, 0, 75], [9, 0, 3])
+    state.record([800, 5, 110], [8, 1, 4])
+    populations, densities = state.window(0, 2)
+    assert populations.tolist() == [900, 800]
+    # windows are views, no copies per step
+    assert np.shares_memory(populations, state.populations)
+    assert state.history_table(2, 10).split('\n') == ['0,50,2', '1,75,3', '2,110,4']
+
+
+def test_monthly_change_and_tables():
+    state = CommunityState(SPECIES, time_steps=2)
+    assert state.monthly_change().tolist() == [0.0, 0.0, 0.0]
+    state.record([500, 10, 100], [5, 1, 4])
+    # a specie growing from zero has no finite rate
+    assert state.monthly_change().tolist() == [-50.0, 0.0, 100.0]
+    assert state.community_table().split('\n')[0] == 'oak|native specie|500|5|-50.0'
+    status = state.status_list()
+    assert status[2] == {'bio_name': 'knotweed', 'bio_num': 100, 'bio_density': 4, 'characteristics': 'invasive specie'}
+    assert all(type(entry['bio_num']) is int for entry in status)
+
+
+def test_community_run_with_any_number_of_species():
+    async def main():
+        return [step async for step in run_community_simulation(
+            CASE, species=SPECIES, time_steps=3, provider=FakeProvider(), env_instructions={1: 'A dry summer'}
+        )]
+
+    steps = asyncio.run(main())
+    assert [step['step'] for step in steps] == [0, 1, 2]
+    assert [step['env_change'] for step in steps] == [0, 1, 0]
+    assert all(step['species'] == ['oak', 'ash', 'knotweed'] for step in steps)
+    assert all(len(step['populations']) == 3 and all(type(n) is int for n in step['populations']) for step in steps)
+    assert [specie.name for specie in species_from_case(CASE)] == [
+        CASE.native_specie_name, CASE.invasive_specie_name
+    ]
@@ -0,0 +1,46 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from simulator.dynamics import INVASIVE, NATIVE, fit_log_rates, parameters_from_case, simulate
+from simulator.simulation import ENV_CHANGE_STEP, cases, run_simulation
+from simulator.types import CaseModel
+
+CASE = CaseModel(**cases['setting-1'])
+
+
+def test_parameter_sets_advance_together():
+    params = parameters_from_case(CASE, n_sets=4, rng=np.random.default_rng(0))
+    populations, densities = simulate(params, 12)
+    assert populations.shape == densities.shape == (4, 13, 2)
+    assert (populations > 0).all()
+    # every set keeps its own sampled rates
+    assert len(np.unique(populations[:, -1, INVASIVE])) == 4
+
+
+def test_first_step_matches_the_case_rates():
+    params = parameters_from_case(CASE, seasonal_amplitude=0.0)
+    populations, _ = simulate(params, 1)
+    growth = populations[0, 1, INVASIVE] / populations[0, 0, INVASIVE] - 1
+    decline = 1 - populations[0, 1, NATIVE] / populations[0, 0, NATIVE]
+    expected_growth = (CASE.invasive_specie_growth_lower + CASE.invasive_specie_growth_upper) / 200
+    expected_decline = (abs(CASE.native_specie_decline_lower) + abs(CASE.native_specie_decline_upper)) / 200
+    assert growth == pytest.approx(expected_growth)
+    assert decline == pytest.approx(expected_decline)
+
+
+def test_fit_log_rates_keeps_extinct_variables_extinct():
+    rates = fit_log_rates([[10.0, 0.0], [20.0, 0.0]], [[20.0, 0.0], [40.0, 0.0]])
+    assert rates == pytest.approx([np.log(2), 0.0])
+
+
+def test_numeric_mode_streams_the_model_without_agents():
+    async def main():
+        return [step_data async for step_data in run_simulation(time_steps=5, mode='numeric', render=False)]
+
+    steps = asyncio.run(main())
+    assert [step['source'] for step in steps] == ['numeric'] * 5
+    populations, _ = simulate(parameters_from_case(CASE, event_step=ENV_CHANGE_STEP), 5)
+    expected = populations[0, 1:, INVASIVE].round().astype(int).tolist()
+    assert [step['invasive_population'] for step in steps] == expected
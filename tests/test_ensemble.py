@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from simulator.ensemble import run_ensemble
+from simulator.providers import ConcurrencyLimitedProvider, FakeProvider
+from simulator.providers.base import current_replica
+from simulator.trajectories import TrajectoryStore
+from simulator.types import BioModel
+
+
+class TrackingProvider(FakeProvider):
+    """
+    Counts the most calls in flight at once and fails one replica's calls
+    once it made ``fail_after`` of them
+    """
+
+    def __init__(self, latency=0.0, failing_replica=None, fail_after=0):
+        super().__init__(latency=latency)
+        self.failing_replica = failing_replica
+        self.remaining = fail_after
+        self.current = self.peak = 0
+        self.lock = threading.Lock()
+
+    async def aparse(self, messages, model, response_format):
+        if self.failing_replica is not None and current_replica.get() == self.failing_replica:
+            if self.remaining <= 0:
+                raise RuntimeError('backend down')
+            self.remaining -= 1
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        try:
+            return await super().aparse(messages, model, response_format)
+        finally:
+            with self.lock:
+                self.current -= 1
+
+
+def ensemble(**kwargs):
+    async def main():
+        return [aggregate async for aggregate in run_ensemble(**kwargs)]
+    return asyncio.run(main())
+
+
+def test_requests_in_flight_stay_under_the_cap():
+    provider = TrackingProvider(latency=0.01)
+    aggregates = ensemble(n_replicas=6, time_steps=2, max_concurrency=2, provider=provider)
+    assert [aggregate['n_replicas'] for aggregate in aggregates] == [6, 6]
+    assert provider.peak == 2
+    # the replicas are independent draws
+    populations = aggregates[-1]['invasive_population']
+    assert populations['p5'] < populations['p95']
+
+
+def test_failed_replica_is_dropped_and_its_trajectory_cleared(tmp_path):
+    # start-up makes three calls per replica, every step three more: replica 1 fails in its second step
+    provider = TrackingProvider(failing_replica=1, fail_after=6)
+    store_path = str(tmp_path / 'store')
+    aggregates = ensemble(n_replicas=3, time_steps=3, provider=provider, trajectory_path=store_path)
+    assert [aggregate['n_replicas'] for aggregate in aggregates] == [3, 2, 2]
+
+    native = TrajectoryStore(store_path, readonly=True).variable('native.specie_num')
+    assert not np.isnan(native[[0, 2]]).any()
+    assert not np.isnan(native[1, :2]).any()
+    assert np.isnan(native[1, 2:]).all()
+
+
+def test_an_ensemble_without_survivors_fails():
+    provider = TrackingProvider(failing_replica=0, fail_after=0)
+    with pytest.raises(RuntimeError):
+        ensemble(n_replicas=1, time_steps=2, provider=provider)
+
+
+def test_cap_holds_across_event_loops():
+    backend = TrackingProvider(latency=0.02)
+    provider = ConcurrencyLimitedProvider(backend, max_concurrency=1)
+    messages = [{'role': 'user', 'content': 'Bio Num: 10\nBio Density: 1'}]
+
+    def run_loop():
+        async def main():
+            await asyncio.gather(*(provider.aparse(messages, 'model', BioModel) for _ in range(3)))
+        asyncio.run(main())
+
+    threads = [threading.Thread(target=run_loop) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert backend.call_count == 6
+    assert backend.peak == 1
+    assert provider.slots.in_flight == 0
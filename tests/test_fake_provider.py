@@ -0,0 +1,51 @@
+import asyncio
+
+from simulator.providers import FakeProvider
+from simulator.providers.base import current_replica
+from simulator.simulation import run_simulation
+from simulator.types import BioModel, CaseModel
+
+BIO_PROMPT = [{'role': 'user', 'content': 'Bio Role: invasive\nBio Num: 1000\nBio Density: 10'}]
+
+
+def test_identical_requests_get_identical_answers():
+    first = FakeProvider().parse(BIO_PROMPT, 'fake', BioModel)
+    second = asyncio.run(FakeProvider().aparse(BIO_PROMPT, 'fake', BioModel))
+    assert first == second
+
+
+def test_seed_and_replica_change_the_answer():
+    answers = {FakeProvider(seed=seed).parse(BIO_PROMPT, 'fake', BioModel).specie_num for seed in range(5)}
+    assert len(answers) > 1
+
+    token = current_replica.set(1)
+    try:
+        replica_answer = FakeProvider().parse(BIO_PROMPT, 'fake', BioModel)
+    finally:
+        current_replica.reset(token)
+    assert replica_answer != FakeProvider().parse(BIO_PROMPT, 'fake', BioModel)
+
+
+def test_bio_rule_grows_invasive_and_shrinks_native():
+    provider = FakeProvider()
+    invasive = provider.parse(BIO_PROMPT, 'fake', BioModel)
+    native_prompt = [{'role': 'user', 'content': BIO_PROMPT[0]['content'].replace('invasive', 'native')}]
+    native = provider.parse(native_prompt, 'fake', BioModel)
+    assert invasive.specie_num > 1000
+    assert native.specie_num < 1000
+
+
+def test_models_without_rule_are_filled_completely():
+    case = FakeProvider().parse([{'role': 'user', 'content': 'any paper'}], 'fake', CaseModel)
+    assert all(value is not None for value in case.model_dump().values())
+    assert 15.0 <= case.invasive_specie_growth_upper <= 30.0
+
+
+def test_simulation_runs_offline_and_repeat_exactly():
+    async def simulate():
+        return [step_data async for step_data in run_simulation(time_steps=3, provider=FakeProvider(), render=False)]
+
+    first = asyncio.run(simulate())
+    assert [step['step'] for step in first] == [0, 1, 2]
+    assert {step['source'] for step in first} == {'llm'}
+    assert asyncio.run(simulate()) == first
@@ -0,0 +1,49 @@
+import asyncio
+
+import gradio_demo
+
+
+def stream(**kwargs):
+    async def collect():
+        return [update async for update in gradio_demo.run_simulation_with_plots(**kwargs)]
+    return asyncio.run(collect())
+
+
+def test_updates_are_bounded_and_mark_environment_changes(monkeypatch):
+    monkeypatch.setattr(gradio_demo, 'CHART_WINDOW', 3)
+    updates = stream(setting_id='setting-1', mode='numeric')
+    population, growth, status, run_id = updates[-1]
+    assert status == 'Simulation complete!'
+
+    species = population[~population['Species'].str.startswith('Environment Change')]
+    assert sorted(species['Month'].unique()) == [8, 9, 10]
+    assert len(growth) <= 2 * 3
+    # the change at month 7 has scrolled out of the window, it was marked while visible
+    marked = [frame for frame, *_ in updates[:-1] if frame['Species'].str.startswith('Environment Change').any()]
+    assert marked
+    marker = marked[0][marked[0]['Species'] == 'Environment Change (month 7)']
+    assert list(marker['Month']) == [7, 7]
+    assert marker['Population'].min() == 0
+
+
+def test_past_runs_are_limited_to_their_session():
+    class Request(object):
+        def __init__(self, session_hash):
+            self.session_hash = session_hash
+
+    run_id = stream(setting_id='setting-1', mode='numeric', request=Request('alice'))[-1][3]
+    population, _, status, shown = gradio_demo.show_past_run(run_id, Request('alice'))
+    assert shown == run_id and len(population)
+
+    population, _, status, shown = gradio_demo.show_past_run(run_id, Request('bob'))
+    assert population is None and shown is None
+    assert 'Unknown run' in status
+
+
+def test_trace_files_are_named_after_the_run(monkeypatch, tmp_path):
+    monkeypatch.setenv('BIOSIM_TRACE_DIR', str(tmp_path))
+    first, second = (gradio_demo.get_trace_path('setting-1', run_id) for run_id in ('run-a', 'run-b'))
+    assert first != second
+    assert first.endswith('setting-1-run-a.jsonl')
+    monkeypatch.delenv('BIOSIM_TRACE_DIR')
+    assert gradio_demo.get_trace_path('setting-1', 'run-a') is None
@@ -0,0 +1,41 @@
+import asyncio
+
+from benchmarks.suites import write_sample_pdf
+from simulator.ingest import ingest_folder, load_library, load_status
+from simulator.providers import FakeProvider
+
+
+class UnavailableProvider(FakeProvider):
+    async def aparse(self, messages, model, response_format):
+        raise ConnectionError('backend down')
+
+
+def ingest(folder, library_path, provider):
+    return asyncio.run(ingest_folder(
+        str(folder), library_path=str(library_path), workers=1, provider=provider, cache=False, flush_interval=0
+    ))
+
+
+def test_failed_files_are_retried_and_finished_ones_skipped(tmp_path):
+    papers = tmp_path / 'papers'
+    (papers / 'nested').mkdir(parents=True)
+    write_sample_pdf(str(papers / 'first.pdf'), pages=2)
+    write_sample_pdf(str(papers / 'nested' / 'second.pdf'), pages=3)
+    library_path = tmp_path / 'library.json'
+    status_path = tmp_path / 'library.status.jsonl'
+
+    failed = ingest(papers, library_path, UnavailableProvider())
+    assert failed['statuses'] == {'error': 2}
+    assert {record['status'] for record in load_status(str(status_path)).values()} == {'error'}
+    assert load_library(str(library_path)) == {}
+
+    retried = ingest(papers, library_path, FakeProvider())
+    assert retried['processed'] == 2
+    assert retried['statuses'] == {'ok': 2}
+    assert len(load_library(str(library_path))) == 2
+
+    # the status log keeps every attempt, the latest one per file counts
+    assert len(status_path.read_text().splitlines()) == 4
+    again = ingest(papers, library_path, UnavailableProvider())
+    assert again['processed'] == 0
+    assert again['skipped'] == 2
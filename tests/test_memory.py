@@ -0,0 +1,78 @@
+import pytest
+
+from simulator.memory import ColumnarArchive, HistoryStore
+
+
+def records(n):
+    return [
+        {'specie_num': i, 'rate': i / 2, 'note': f'step {i % 2}', 'env': {'ok': i % 3 == 0, 'tags': ['a', str(i)]}}
+        for i in range(n)
+    ]
+
+
+def test_history_keeps_the_full_sequence():
+    history = HistoryStore(window=3)
+    for record in records(10):
+        history.append(record)
+    assert len(history) == 10
+    assert list(history) == records(10)
+    assert history[-1] == records(10)[-1]
+    assert history[2:5] == records(10)[2:5]
+    assert len(history.archive) == 7
+
+
+def test_recent_view_follows_later_appends():
+    history = HistoryStore(window=3)
+    for record in records(5):
+        history.append(record)
+    view = history.recent(2)
+    assert list(view) == records(5)[3:]
+    assert view[-1]['specie_num'] == 4
+    # resolved by absolute index, the view keeps pointing at the same records
+    history.append(records(6)[5])
+    assert list(view) == records(5)[3:]
+    assert len(history.recent(10)) == 3
+
+
+def test_without_archive_evicted_records_are_gone():
+    history = HistoryStore(window=2, archive=False)
+    for record in records(4):
+        history.append(record)
+    assert history[-1]['specie_num'] == 3
+    with pytest.raises(IndexError):
+        history[0]
+    with pytest.raises(ValueError):
+        HistoryStore(window=0)
+
+
+def test_archive_columns_and_schema():
+    archive = ColumnarArchive()
+    for record in records(4):
+        archive.append(record)
+    assert list(archive.column('specie_num')) == [0, 1, 2, 3]
+    assert archive.column('note') == ['step 0', 'step 1', 'step 0', 'step 1']
+    assert archive[1] == records(4)[1]
+    with pytest.raises(ValueError):
+        archive.append({'specie_num': 1})
+
+
+def test_archive_spills_to_disk_in_chunks(tmp_path):
+    archive = ColumnarArchive(spill_records=4, directory=str(tmp_path))
+    for record in records(10):
+        archive.append(record)
+    # two chunks on disk, two records buffered
+    assert all(len(column.values) == 2 for column in archive._columns.values())
+    assert len(list(tmp_path.iterdir())) > 0
+    assert [archive[i] for i in range(10)] == records(10)
+    assert archive[-10] == records(10)[0]
+    assert list(archive.column('rate')) == [i / 2 for i in range(10)]
+    assert archive.column('env.tags') == [['a', str(i)] for i in range(10)]
+
+
+def test_history_memory_stays_flat(tmp_path):
+    history = HistoryStore(window=3)
+    history.archive = ColumnarArchive(spill_records=5, directory=str(tmp_path))
+    for record in records(50):
+        history.append(record)
+        assert history.archive._buffered < 5
+    assert list(history) == records(50)
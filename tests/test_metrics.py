@@ -0,0 +1,71 @@
+import json
+
+import pytest
+from pydantic import BaseModel
+
+from simulator.metrics import MetricsRegistry, current_call, track_call, track_step
+
+
+class Answer(BaseModel):
+    value: int
+
+
+MESSAGES = [{'role': 'user', 'content': 'how many?'}]
+
+
+def call(registry, agent='bio', cache='miss', usage=None, fail=False):
+    with track_call(agent, 'model', Answer, MESSAGES, registry=registry) as record:
+        assert current_call() is record
+        record.cache = cache
+        record.queue_wait = 0.5
+        if usage:
+            record.set_usage(*usage)
+        if fail:
+            raise RuntimeError('backend down')
+        record.set_output(Answer(value=1))
+
+
+def test_steps_total_the_calls_made_in_them():
+    registry = MetricsRegistry()
+    with track_step(3, 'llm', registry=registry) as step:
+        call(registry, usage=(100, 20))
+        call(registry, cache='hit')
+    assert current_call() is None
+    assert (step.calls, step.cache_hits, step.queue_wait) == (2, 1, 1.0)
+    # API usage is taken as reported, the rest is estimated
+    assert step.input_tokens > 100
+    assert step.output_tokens > 20
+    assert registry.steps[0] is step and step.wall_time > 0
+
+
+def test_failed_calls_are_recorded_as_errors():
+    registry = MetricsRegistry()
+    with pytest.raises(RuntimeError):
+        call(registry, fail=True)
+    call(registry, agent='env')
+    snapshot = registry.snapshot()
+    assert snapshot['calls']['bio/model']['errors'] == 1
+    assert snapshot['calls']['env/model']['errors'] == 0
+    assert snapshot['calls']['env/model']['latency']['count'] == 1
+    records = json.loads(registry.to_json(include_records=True))['call_records']
+    assert [record['error'] for record in records] == ['RuntimeError', None]
+
+
+def test_prometheus_exposition():
+    registry = MetricsRegistry()
+    with track_step(0, 'hybrid', registry=registry):
+        call(registry, usage=(100, 20))
+        call(registry, agent='bio "native"', cache='hit')
+    text = registry.to_prometheus()
+    lines = text.splitlines()
+    assert 'biosim_llm_calls_total{agent="bio",model="model",cache="miss",status="ok"} 1' in lines
+    assert 'biosim_llm_tokens_total{agent="bio",model="model",direction="input"} 100' in lines
+    # label values are escaped
+    assert any(line.startswith('biosim_llm_calls_total{agent="bio \\"native\\""') for line in lines)
+    assert 'biosim_step_duration_seconds_bucket{mode="hybrid",le="+Inf"} 1' in lines
+    assert 'biosim_step_duration_seconds_count{mode="hybrid"} 1' in lines
+    # buckets are cumulative
+    prefix = 'biosim_llm_call_latency_seconds_bucket{agent="bio",'
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines if line.startswith(prefix)]
+    assert buckets == sorted(buckets) and buckets[-1] == 1
+    assert text.endswith('\n')
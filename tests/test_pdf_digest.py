@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+from simulator import pdf_digest
+from simulator.pdf_digest import (
+    PDFDigestModel,
+    PDFValidationResult,
+    digest_pdf_text,
+    extract_pdf_text,
+    get_digest_mode,
+    get_pdf_ranking,
+    pdf_digest_keys,
+    process_pdf_file,
+)
+from simulator.prompts import PromptTemplate
+from simulator.providers import FakeProvider
+
+
+class RejectingProvider(FakeProvider):
+    """
+    Rejects every paper, counting the extraction calls it is asked for
+    """
+
+    extractions = 0
+
+    async def aparse(self, messages, model, response_format):
+        if response_format is PDFValidationResult:
+            await asyncio.sleep(self.latency)
+            return PDFValidationResult(is_valid=False, reason='not about invasions')
+        if response_format is PDFDigestModel:
+            return PDFDigestModel(validation=PDFValidationResult(is_valid=False, reason='no'), case=None)
+        self.extractions += 1
+        return await super().aparse(messages, model, response_format)
+
+
+def test_sequential_is_the_default(monkeypatch):
+    monkeypatch.delenv('BIOSIM_PDF_MODE', raising=False)
+    assert get_digest_mode() == 'sequential'
+    monkeypatch.setenv('BIOSIM_PDF_MODE', 'nonsense')
+    with pytest.raises(ValueError):
+        get_digest_mode()
+
+
+@pytest.mark.parametrize('mode, round_trips', [('sequential', 2), ('speculative', 1), ('combined', 1)])
+def test_modes_agree_and_overlap_round_trips(mode, round_trips):
+    provider = FakeProvider(latency=0.1)
+    started = time.perf_counter()
+    validation, case = asyncio.run(digest_pdf_text('invasive crayfish text', provider, mode=mode))
+    elapsed = time.perf_counter() - started
+    assert validation.is_valid
+    assert case is not None
+    assert round_trips * 0.1 <= elapsed < (round_trips + 0.5) * 0.1
+
+
+@pytest.mark.parametrize('mode', ['sequential', 'speculative', 'combined'])
+def test_rejected_papers_have_no_case(mode):
+    provider = RejectingProvider(latency=0.05)
+    validation, case = asyncio.run(digest_pdf_text('a cooking recipe', provider, mode=mode))
+    assert not validation.is_valid
+    assert case is None
+    # only the speculative mode starts an extraction before knowing
+    assert provider.extractions == (1 if mode == 'speculative' else 0)
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    from benchmarks.suites import write_sample_pdf
+    path = str(tmp_path / 'sample.pdf')
+    write_sample_pdf(path, pages=12)
+    return path
+
+
+@pytest.mark.parametrize('ranked', [False, True])
+def test_extracted_text_respects_the_budget(sample_pdf, ranked):
+    text = extract_pdf_text(sample_pdf, max_characters=2000, ranked=ranked)
+    assert 0 < len(text) <= 2000
+    assert text.startswith('1.1 ')
+
+
+def test_first_pages_stop_at_the_budget(sample_pdf):
+    text = extract_pdf_text(sample_pdf, max_characters=1000)
+    assert text == extract_pdf_text(sample_pdf, max_characters=None)[:1000]
+
+
+def test_ranking_is_off_by_default(monkeypatch):
+    monkeypatch.delenv('BIOSIM_PDF_RANKING', raising=False)
+    assert not get_pdf_ranking()
+    monkeypatch.setenv('BIOSIM_PDF_RANKING', '1')
+    assert get_pdf_ranking()
+
+
+def test_repeated_upload_is_served_from_the_cache(sample_pdf):
+    provider = FakeProvider()
+    first = asyncio.run(process_pdf_file(sample_pdf, provider=provider))
+    calls = provider.call_count
+    second = asyncio.run(process_pdf_file(sample_pdf, provider=provider))
+    assert first == second
+    assert first[0]
+    assert provider.call_count == calls == 2
+
+
+class OtherBackend(FakeProvider):
+    pass
+
+
+def keys(provider=None, max_characters=5000, mode='sequential', ranked=False):
+    return pdf_digest_keys('0' * 64, provider or FakeProvider(), max_characters, None, mode, ranked)
+
+
+def test_digest_keys_change_with_prompts_schemas_and_backend(monkeypatch):
+    text_key, digest_key = keys()
+    assert keys() == (text_key, digest_key)
+    # speculative runs issue the same calls as sequential ones
+    assert keys(mode='speculative') == (text_key, digest_key)
+
+    changed = [
+        keys(provider=OtherBackend()),
+        keys(mode='combined'),
+    ]
+    monkeypatch.setattr(pdf_digest, 'VALIDATION_PROMPT', PromptTemplate('Is this about invasions? {{pdf_text}}'))
+    changed.append(keys())
+    monkeypatch.undo()
+
+    class CaseModel(pdf_digest.CaseModel):
+        study_years: int = 1
+
+    monkeypatch.setattr(pdf_digest, 'CaseModel', CaseModel)
+    changed.append(keys())
+    monkeypatch.undo()
+    monkeypatch.setattr(pdf_digest, 'PDF_MODEL', 'another-model')
+    changed.append(keys())
+
+    # the extracted text does not depend on any of them
+    assert all(text == text_key for text, _ in changed)
+    assert len({digest for _, digest in changed} | {digest_key}) == len(changed) + 1
+
+
+def test_text_keys_change_with_the_budget_and_selection():
+    text_key, digest_key = keys()
+    for other in (keys(max_characters=2000), keys(ranked=True)):
+        assert other[0] != text_key and other[1] != digest_key
+
+
+def test_changed_prompt_misses_the_cache(sample_pdf, monkeypatch):
+    provider = FakeProvider()
+    asyncio.run(process_pdf_file(sample_pdf, provider=provider))
+    assert provider.call_count == 2
+    monkeypatch.setattr(
+        pdf_digest, 'EXTRACTION_PROMPT', PromptTemplate(pdf_digest.EXTRACTION_PROMPT.text + '\nBe concise.')
+    )
+    asyncio.run(process_pdf_file(sample_pdf, provider=provider))
+    assert provider.call_count == 4
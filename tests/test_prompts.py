@@ -0,0 +1,55 @@
+import pytest
+
+from simulator.prompts import PromptTemplate, compact_json, delta_table, estimate_tokens, fit_to_budget
+
+
+def test_template_renders_every_field():
+    template = PromptTemplate('''
+        Hello {{name}},
+        you are {{role}}.
+    ''')
+    assert template.fields == ['name', 'role']
+    assert template.render(name='Ada', role='native', unused=1) == 'Hello Ada,\nyou are native.'
+    with pytest.raises(KeyError):
+        template.render(name='Ada')
+
+
+def test_delta_table_writes_changes_only():
+    records = [
+        {'specie_num': 100, 'climate': {'temperature': 12.5, 'season': 'spring'}},
+        {'specie_num': 110, 'climate': {'temperature': 12.5, 'season': 'spring'}},
+        {'specie_num': 95, 'climate': {'temperature': 14.0, 'season': 'summer'}},
+    ]
+    assert delta_table(records, start=3).split('\n') == [
+        'month|specie_num|climate.temperature|climate.season',
+        '3|100|12.5|spring',
+        '4|+10|=|=',
+        '5|-15|+1.5|summer',
+    ]
+    assert delta_table([]) == '(none)'
+
+
+def test_compact_json_has_no_padding():
+    assert compact_json({'a': [1, 2], 'b': 'é'}) == '{"a":[1,2],"b":"é"}'
+
+
+def test_fit_to_budget_drops_the_oldest_records_of_the_longest_history():
+    histories = {'own': list(range(20)), 'other': list(range(5))}
+    kept = {}
+
+    def render(trimmed):
+        kept.update(trimmed)
+        return ' '.join(f'record {record}' for records in trimmed.values() for record in records)
+
+    budget = estimate_tokens(render({'own': list(range(15, 20)), 'other': list(range(5))}))
+    prompt = fit_to_budget(render, histories, budget=budget)
+    assert estimate_tokens(prompt) <= budget
+    # the newest records stay, the short history is untouched
+    assert kept['own'][-1] == 19 and len(kept['own']) < 20
+    assert kept['other'] == list(range(5))
+
+
+def test_fit_to_budget_keeps_the_minimum():
+    prompt = fit_to_budget(lambda trimmed: 'x' * 1000 * len(trimmed['own']), {'own': [1, 2, 3]}, budget=1, min_records=2)
+    assert prompt == 'x' * 2000
+    assert fit_to_budget(lambda trimmed: str(trimmed['own']), {'own': [1, 2]}) == '[1, 2]'
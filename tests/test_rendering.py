@@ -0,0 +1,61 @@
+import asyncio
+import os
+import threading
+
+from simulator import rendering
+from simulator.rendering import new_run_id, render_result_plots, result_paths
+from simulator.simulation import cases, run_simulation
+from simulator.types import CaseModel
+
+CASE = CaseModel(**cases['setting-1'])
+PNG = b'\x89PNG'
+
+
+def plot_data(n):
+    native = [1000 - 10 * i for i in range(n)]
+    invasive = [100 + 20 * i for i in range(n)]
+    return (
+        CASE, list(range(1, n + 1)), native, invasive, [10] * (n + 1), [2] * (n + 1), [int(i == 3) for i in range(n)]
+    )
+
+
+def test_run_ids_are_unique():
+    assert len({new_run_id() for _ in range(100)}) == 100
+
+
+def test_concurrent_runs_render_into_their_own_directories(tmp_path, monkeypatch):
+    main_thread = threading.get_ident()
+    threads = []
+    save = rendering.save_result_plots
+
+    def tracked(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return save(*args, **kwargs)
+
+    monkeypatch.setattr(rendering, 'save_result_plots', tracked)
+    run_ids = ('run-a', 'run-b', 'run-c')
+
+    async def main():
+        return await asyncio.gather(*(
+            render_result_plots(*plot_data(6), run_id=run_id, output_dir=str(tmp_path)) for run_id in run_ids
+        ))
+
+    results = asyncio.run(main())
+    assert results == [result_paths(run_id, str(tmp_path)) for run_id in run_ids]
+    for paths in results:
+        for path in paths.values():
+            with open(path, 'rb') as f:
+                assert f.read(4) == PNG
+    # rendered off the event loop
+    assert main_thread not in threads
+
+
+def test_simulation_saves_its_plots_under_its_run_id():
+    async def main():
+        return [step async for step in run_simulation(time_steps=4, mode='numeric', run_id='numeric-run')]
+
+    asyncio.run(main())
+    paths = result_paths('numeric-run')
+    assert os.path.dirname(paths['population']) == os.path.join(rendering.get_output_dir(), 'numeric-run')
+    assert all(os.path.exists(path) for path in paths.values())
+    assert result_paths()['population'] == os.path.join(rendering.get_output_dir(), rendering.POPULATION_PLOT)
@@ -0,0 +1,52 @@
+from simulator.prompts import estimate_tokens
+from simulator.retrieval import BM25Index, NUMBER, PERCENT, select_relevant_text, split_chunks, tokenize
+
+TITLE = 'Crayfish invasion in Lake X. Abstract: we study invasive and native crayfish. '
+INTRODUCTION = 'Introduction. Invasive species are a global concern for ecologists. ' * 40
+RESULTS = (
+    'Results. The density of the invasive crayfish Procambarus clarkii increased from 3 to 12 individuals per m2, '
+    'a monthly growth rate of 8%. Native noble crayfish abundance declined by 4% per month, from 2,000 individuals. '
+)
+DISCUSSION = 'Discussion. Further work on policy and funding frameworks is needed in many countries. ' * 40
+PAPER = TITLE + INTRODUCTION + RESULTS + DISCUSSION
+
+
+def test_tokenize_folds_numbers_and_percentages():
+    assert tokenize('Density rose 12.5% to 340 in the plot') == [
+        'density', 'rose', NUMBER, PERCENT, NUMBER, 'plot'
+    ]
+
+
+def test_chunks_are_bounded_and_keep_all_text():
+    chunks = split_chunks(PAPER, chunk_characters=300)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert ''.join(chunks).replace(' ', '') == PAPER.replace(' ', '')
+
+
+def test_bm25_prefers_matching_documents():
+    scores = BM25Index(['invasive crayfish density', 'policy funding', 'crayfish']).scores(['density', 'crayfish'])
+    assert scores[0] > scores[2] > scores[1] == 0
+
+
+def test_text_within_budget_is_returned_unchanged():
+    assert select_relevant_text('A short abstract.', max_characters=5000) == 'A short abstract.'
+
+
+def test_packing_respects_the_character_budget_and_finds_results():
+    text = select_relevant_text(PAPER, max_characters=1500)
+    assert len(text) <= 1500
+    # the title leads, the numbers from the results section made it in
+    assert text.startswith('Crayfish invasion')
+    assert 'Procambarus clarkii increased from 3 to 12' in text
+    assert PAPER[:len(text)] != text
+
+
+def test_packing_respects_the_token_budget():
+    text = select_relevant_text(PAPER, max_characters=None, max_tokens=300)
+    assert estimate_tokens(text) <= 300 + text.count('\n')
+    assert 'Procambarus' in text
+
+
+def test_chunks_keep_document_order():
+    text = select_relevant_text(PAPER, max_characters=3000)
+    assert text.index('Crayfish invasion') < text.index('Procambarus')
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from simulator.runs import RunRegistry
+from simulator.simulation import cases
+from simulator.types import CaseModel
+
+CASE = CaseModel(**cases['setting-1'])
+
+
+async def steps(count, fail_at=None):
+    for step in range(count):
+        if step == fail_at:
+            raise RuntimeError('agent failed')
+        yield {'step': step, 'native_population': 100 - step}
+
+
+def consume(registry, run_id, source, limit=None, session_id='session'):
+    async def main():
+        seen = []
+        recorded = registry.record_run(run_id, source, CASE, {'mode': 'numeric'}, 'setting-1', session_id)
+        async for step_data in recorded:
+            seen.append(step_data)
+            if limit is not None and len(seen) == limit:
+                await recorded.aclose()
+                break
+        return seen
+    return asyncio.run(main())
+
+
+def test_completed_run_is_stored_with_its_steps(tmp_path):
+    registry = RunRegistry(str(tmp_path / 'runs.sqlite'))
+    consume(registry, 'run-1', steps(3))
+    run = registry.get_run('run-1')
+    assert run['status'] == 'complete'
+    assert run['case']['invasive_specie_name'] == CASE.invasive_specie_name
+    stored = registry.get_steps('run-1')
+    assert [step['native_population'] for step in stored] == [100, 99, 98]
+    assert all(step['wall_time'] is not None for step in stored)
+
+
+def test_failed_and_cancelled_runs(tmp_path):
+    registry = RunRegistry(str(tmp_path / 'runs.sqlite'))
+    with pytest.raises(RuntimeError):
+        consume(registry, 'failed', steps(3, fail_at=1))
+    consume(registry, 'cancelled', steps(5), limit=2)
+
+    failed = registry.get_run('failed')
+    assert (failed['status'], failed['error']) == ('failed', 'agent failed')
+    assert registry.get_run('cancelled')['status'] == 'cancelled'
+    assert len(registry.get_steps('cancelled')) == 2
+
+
+def test_runs_are_listed_per_session(tmp_path):
+    registry = RunRegistry(str(tmp_path / 'runs.sqlite'))
+    consume(registry, 'a-1', steps(1), session_id='a')
+    consume(registry, 'b-1', steps(1), session_id='b')
+    consume(registry, 'a-2', steps(1), session_id='a')
+    assert [run['run_id'] for run in registry.list_runs(session_id='a')] == ['a-2', 'a-1']
+    assert registry.list_runs(session_id='c') == []
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+
+from pydantic import BaseModel
+
+from simulator.providers import factory, get_provider
+from simulator.providers.errors import RateLimitedError
+from simulator.providers.fake_provider import FakeProvider
+from simulator.providers.scheduler import (
+    AdaptiveConcurrency,
+    RequestScheduler,
+    ScheduledProvider,
+    SlotLimiter,
+    TokenBucket,
+)
+
+
+class Answer(BaseModel):
+    value: int
+
+
+MESSAGES = [{'role': 'user', 'content': 'hello'}]
+
+
+def test_providers_share_one_budget(monkeypatch):
+    monkeypatch.setattr(factory, '_schedulers', {})
+    monkeypatch.setenv('BIOSIM_RPM', '2')
+    first = get_provider('fake', cache=False, schedule=True)
+    second = get_provider('fake', cache=False, schedule=True)
+    assert first is not second
+    assert first.scheduler is second.scheduler
+
+    # the first provider spends the whole burst, the second has to wait for it
+    first.parse(MESSAGES, 'model', Answer)
+    first.parse(MESSAGES, 'model', Answer)
+    assert second.requests.reserve(1) > 0
+
+
+def test_providers_share_request_slots(monkeypatch):
+    monkeypatch.setattr(factory, '_schedulers', {})
+    monkeypatch.setenv('BIOSIM_FAKE_LATENCY', '0.05')
+    providers = [get_provider('fake', cache=False, schedule=True) for _ in range(4)]
+    scheduler = providers[0].scheduler
+    scheduler.concurrency = AdaptiveConcurrency(initial=1, maximum=1)
+
+    async def main():
+        await asyncio.gather(*(provider.aparse(MESSAGES, 'model', Answer) for provider in providers))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    # one slot for all four providers, so the calls ran one after the other
+    assert time.perf_counter() - started >= 4 * 0.05
+
+
+def test_token_bucket_waits_in_reservation_order():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert 0.9 < bucket.reserve(1) <= 1.0
+    assert 1.9 < bucket.reserve(1) <= 2.0
+
+
+def test_rate_limits_are_retried_and_shrink_concurrency():
+    class Flaky(FakeProvider):
+        failures = 2
+
+        async def aparse(self, messages, model, response_format):
+            if self.failures:
+                self.failures -= 1
+                raise RateLimitedError('slow down', retry_after=0)
+            return await super().aparse(messages, model, response_format)
+
+    concurrency = AdaptiveConcurrency(initial=8, cooldown=0)
+    provider = ScheduledProvider(Flaky(), concurrency=concurrency, backoff_base=0)
+    answer = asyncio.run(provider.aparse(MESSAGES, 'model', Answer))
+    assert isinstance(answer, Answer)
+    assert concurrency.limit < 8
+
+
+class InFlight(FakeProvider):
+    """
+    Tracks the most calls in flight at once, across threads and loops
+    """
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.current = self.peak = 0
+        self.lock = threading.Lock()
+
+    def _enter(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def _exit(self):
+        with self.lock:
+            self.current -= 1
+
+    def parse(self, messages, model, response_format):
+        self._enter()
+        try:
+            return super().parse(messages, model, response_format)
+        finally:
+            self._exit()
+
+    async def aparse(self, messages, model, response_format):
+        self._enter()
+        try:
+            return await super().aparse(messages, model, response_format)
+        finally:
+            self._exit()
+
+
+def test_slots_are_shared_by_threads_and_event_loops():
+    backend = InFlight(latency=0.02)
+    scheduler = RequestScheduler(concurrency=AdaptiveConcurrency(initial=2, maximum=2))
+    provider = ScheduledProvider(backend, scheduler=scheduler)
+
+    def run_loop():
+        async def main():
+            await asyncio.gather(*(provider.aparse(MESSAGES, 'model', Answer) for _ in range(6)))
+        asyncio.run(main())
+
+    def run_sync():
+        for _ in range(3):
+            provider.parse(MESSAGES, 'model', Answer)
+
+    threads = [threading.Thread(target=target) for target in (run_loop, run_loop, run_sync, run_sync)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert backend.call_count == 18
+    assert backend.peak == 2
+    assert scheduler.slots.in_flight == 0
+
+
+def test_a_new_event_loop_keeps_the_count():
+    slots = SlotLimiter(1)
+
+    async def hold():
+        await slots.aacquire()
+
+    asyncio.run(hold())
+    # the slot taken on the first loop is still taken on the second one
+    released = []
+
+    async def wait_on_second_loop():
+        threading.Timer(0.05, lambda: released.append(True) or slots.release()).start()
+        await slots.aacquire()
+        assert released
+        slots.release()
+
+    asyncio.run(asyncio.wait_for(wait_on_second_loop(), timeout=5))
+    assert slots.in_flight == 0
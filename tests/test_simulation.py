@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from simulator.providers import FakeProvider
+from simulator.simulation import is_keyframe, run_simulation
+
+
+def simulate(**kwargs):
+    async def main():
+        return [step_data async for step_data in run_simulation(render=False, **kwargs)]
+    return asyncio.run(main())
+
+
+def test_keyframes():
+    assert [is_keyframe(step, 3, {7}) for step in range(8)] == [True, False, False, True, False, False, True, True]
+
+
+def test_hybrid_run_asks_the_agents_only_at_keyframes():
+    provider = FakeProvider()
+    steps = simulate(time_steps=7, provider=provider, mode='hybrid', keyframe_interval=3)
+    sources = [step['source'] for step in steps]
+    # steps 0, 3 and 6 are keyframes, 6 being the environment change as well
+    assert sources == ['llm', 'interpolated', 'interpolated', 'llm', 'interpolated', 'interpolated', 'llm']
+    assert all(step['native_population'] > 0 and step['invasive_population'] > 0 for step in steps)
+
+    llm_provider = FakeProvider()
+    simulate(time_steps=7, provider=llm_provider)
+    assert provider.call_count < llm_provider.call_count
+
+
+def test_hybrid_arguments_are_checked():
+    with pytest.raises(ValueError):
+        simulate(time_steps=3, provider=FakeProvider(), mode='hybrid', keyframe_interval=0)
+    with pytest.raises(ValueError):
+        simulate(time_steps=3, mode='quantum')
+
+
+def test_joint_step_makes_one_call_per_step():
+    separate, joint = FakeProvider(), FakeProvider()
+    simulate(time_steps=2, provider=separate)
+    simulate(time_steps=4, provider=joint, joint_step=True)
+    calls = FakeProvider()
+    steps = simulate(time_steps=2, provider=calls, joint_step=True)
+    # the same start-up calls, then one joint call instead of three per step
+    assert joint.call_count - calls.call_count == 2
+    assert calls.call_count < separate.call_count
+    assert [step['source'] for step in steps] == ['llm', 'llm']
+    assert all(step['native_population'] > 0 and step['invasive_population'] > 0 for step in steps)
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from simulator.providers import FakeProvider
+from simulator.simulation import run_simulation
+from simulator.trace import TraceWriter, read_trace
+
+
+class FailingProvider(FakeProvider):
+    """
+    Raises once ``calls`` requests went through
+    """
+
+    def __init__(self, calls):
+        super().__init__()
+        self.remaining = calls
+
+    async def aparse(self, messages, model, response_format):
+        if self.remaining <= 0:
+            raise RuntimeError('backend down')
+        self.remaining -= 1
+        return await super().aparse(messages, model, response_format)
+
+
+def simulate(**kwargs):
+    async def main():
+        return [step_data async for step_data in run_simulation(render=False, **kwargs)]
+    return asyncio.run(main())
+
+
+def test_trace_replays_the_recorded_steps(tmp_path):
+    trace_path = str(tmp_path / 'run.trace.jsonl.gz')
+    recorded = simulate(time_steps=3, provider=FakeProvider(), trace_path=trace_path, run_id='run-1')
+    records = list(read_trace(trace_path))
+    assert [record['type'] for record in records] == ['header', 'init', 'step', 'step', 'step', 'end']
+    assert records[0]['run_id'] == 'run-1'
+    steps = [record for record in records if record['type'] == 'step']
+    assert [record['step_data'] for record in steps] == recorded
+    assert all(record['calls'] for record in steps)
+
+    assert simulate(replay_path=trace_path) == recorded
+
+
+def test_one_run_per_trace_file(tmp_path):
+    trace_path = str(tmp_path / 'run.trace.jsonl')
+    simulate(time_steps=1, provider=FakeProvider(), trace_path=trace_path)
+    with pytest.raises(FileExistsError):
+        simulate(time_steps=1, provider=FakeProvider(), trace_path=trace_path)
+    assert sum(record['type'] == 'header' for record in read_trace(trace_path)) == 1
+
+
+def test_trace_of_a_stopped_run_is_closed_and_marked(tmp_path, monkeypatch):
+    closed = []
+    close = TraceWriter.close
+    monkeypatch.setattr(TraceWriter, 'close', lambda self: closed.append(self.path) or close(self))
+    trace_path = str(tmp_path / 'stopped.jsonl')
+
+    async def stop_after_first_step():
+        steps = run_simulation(time_steps=3, provider=FakeProvider(), trace_path=trace_path, render=False)
+        await anext(steps)
+        await steps.aclose()
+
+    asyncio.run(stop_after_first_step())
+    records = list(read_trace(trace_path))
+    assert [record['type'] for record in records] == ['header', 'init', 'step', 'aborted']
+    assert records[-1]['reason'] == 'GeneratorExit'
+    assert closed == [trace_path]
+
+
+def test_trace_of_a_failed_run_is_marked(tmp_path):
+    trace_path = str(tmp_path / 'failed.jsonl')
+    # start-up makes three calls, the first step fails
+    with pytest.raises(RuntimeError):
+        simulate(time_steps=3, provider=FailingProvider(calls=3), trace_path=trace_path)
+    records = list(read_trace(trace_path))
+    assert [record['type'] for record in records] == ['header', 'init', 'aborted']
+    assert records[-1]['reason'] == 'RuntimeError'
@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from simulator.dynamics import parameters_from_case, simulate
+from simulator.simulation import cases, run_simulation
+from simulator.trajectories import TRAJECTORY_VARIABLES, TrajectoryStore, numeric_trajectories
+from simulator.types import CaseModel
+
+
+def test_runs_start_as_nan_and_survive_reopening(tmp_path):
+    store = TrajectoryStore(str(tmp_path / 'store'), time_steps=4)
+    runs = store.add_runs(3)
+    assert list(runs) == [0, 1, 2]
+    assert np.isnan(store.data).all()
+
+    store.run(1).record(0, {'specie_num': 10, 'specie_density': 2}, {'specie_num': 5, 'specie_density': 1})
+    store.flush()
+
+    reopened = TrajectoryStore(str(tmp_path / 'store'), readonly=True)
+    assert reopened.n_runs == 3
+    assert reopened.variables == TRAJECTORY_VARIABLES
+    assert reopened.variable('native.specie_num')[1, 0] == 10
+    assert np.isnan(reopened.variable('native.specie_num')[0, 0])
+    with pytest.raises(PermissionError):
+        reopened.add_runs(1)
+    with pytest.raises(ValueError):
+        TrajectoryStore(str(tmp_path / 'store'), time_steps=5)
+
+
+def test_aggregates_ignore_unfinished_runs(tmp_path):
+    store = TrajectoryStore(str(tmp_path / 'store'), time_steps=2, variables=('x',))
+    store.append_runs(np.array([[[1.0], [2.0], [3.0]], [[3.0], [4.0], [np.nan]]]))
+    assert store.summary('x', 1)['mean'] == 3.0
+    assert store.summary('x', 2) == {'mean': 3.0, 'p5': 3.0, 'p50': 3.0, 'p95': 3.0}
+    np.testing.assert_allclose(store.percentiles('x', q=(50,))[0], [2.0, 3.0, 3.0])
+
+
+def test_write_all_and_clear(tmp_path):
+    case = CaseModel(**cases['setting-1'])
+    populations, densities = simulate(parameters_from_case(case), 4)
+    store = TrajectoryStore(str(tmp_path / 'store'), time_steps=4)
+    run = store.run(store.add_runs(1)[0])
+    run.write_all(numeric_trajectories(populations, densities)[0])
+    np.testing.assert_allclose(store.variable('native.specie_num')[0], populations[0, :, 0])
+
+    run.clear(2)
+    assert not np.isnan(store.variable('native.specie_num')[0, :2]).any()
+    assert np.isnan(store.data[0, 2:]).all()
+
+
+def test_numeric_runs_fill_their_trajectory(tmp_path):
+    store = TrajectoryStore(str(tmp_path / 'store'), time_steps=5)
+    run = store.run(store.add_runs(1)[0])
+
+    async def main():
+        return [step async for step in run_simulation(time_steps=5, mode='numeric', render=False, trajectory=run)]
+
+    steps = asyncio.run(main())
+    assert [step['native_population'] for step in steps] == store.variable('native.specie_num')[0, 1:].round().tolist()
+
+
+def test_numeric_runs_refuse_traces(tmp_path):
+    async def main():
+        async for _ in run_simulation(mode='numeric', render=False, trace_path=str(tmp_path / 'trace.jsonl')):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def _append_from_process(path, value):
+    store = TrajectoryStore(path, time_steps=2, variables=('x',))
+    for _ in range(20):
+        runs = store.append_runs(np.full((1, 3, 1), value))
+        assert len(runs) == 1
+
+
+def test_processes_appending_to_one_store_keep_their_runs(tmp_path):
+    path = str(tmp_path / 'store')
+    TrajectoryStore(path, time_steps=2, variables=('x',))
+    processes = [multiprocessing.Process(target=_append_from_process, args=(path, value)) for value in (1.0, 2.0)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    store = TrajectoryStore(path, readonly=True)
+    assert store.n_runs == 40
+    values = store.variable('x')[:, 0]
+    assert (values == 1.0).sum() == (values == 2.0).sum() == 20